@@ -0,0 +1,4 @@
+"""
+离线基准测试
+使用模拟搜索、本地夹具网站和兼容OpenAI的模拟LLM接口，测量爬取、财务补充流水线和各存储后端的吞吐量、延迟和内存峰值
+"""
@@ -0,0 +1,141 @@
+"""
+离线基准测试入口
+    python -m benchmarks --suite storage --sizes 1k,10k --backends excel,parquet
+    python -m benchmarks --suite search,enrich --pages 200 --llm-latency 0.3 --llm-error-rate 0.02
+    python -m benchmarks --suite startup --startup-runs 20
+    python -m benchmarks --output bench.json --baseline baseline.json --max-regression 0.2
+"""
+
+import argparse
+import json
+import logging
+import shutil
+import sys
+import tempfile
+from dataclasses import asdict
+from src.config.settings import config, StorageMode
+from benchmarks.datasets import make_records, parse_size
+from benchmarks.fixtures import FixtureServer
+from benchmarks.harness import BenchmarkResult, bench_enrich, bench_search, bench_startup, bench_storage, check_backend, compare, configure
+
+SUITES = ('storage', 'search', 'enrich', 'startup')
+# 需要夹具服务和存储后端的测试项
+BACKEND_SUITES = ('storage', 'search', 'enrich')
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='离线基准测试（本地搜索、网站和LLM夹具）')
+    parser.add_argument('--suite', default=','.join(SUITES), help=f"逗号分隔的测试项：{', '.join(SUITES)}")
+    parser.add_argument('--backends', default='excel,parquet', help='逗号分隔的存储后端：excel、parquet、mysql')
+    parser.add_argument('--sizes', default='1k,10k,100k', help='存储测试的数据集规模，逗号分隔，如 1k,10k,100k 或具体行数')
+    parser.add_argument('--batch-size', type=int, default=1000, help='存储测试每批写入的行数')
+    parser.add_argument('--pages', type=int, default=200, help='搜索流水线爬取的网页数')
+    parser.add_argument('--companies', type=int, default=100, help='财务补充流水线写入的公司数（约一半缺少营业额）')
+    parser.add_argument('--startup-runs', type=int, default=10, help='启动测试的进程启动次数')
+    parser.add_argument('--site-latency', type=float, default=0.05, help='夹具网页的平均延迟秒数')
+    parser.add_argument('--site-error-rate', type=float, default=0.0, help='夹具网页返回503的比例')
+    parser.add_argument('--llm-latency', type=float, default=0.2, help='模拟LLM接口的平均延迟秒数')
+    parser.add_argument('--llm-error-rate', type=float, default=0.0, help='模拟LLM接口返回429的比例')
+    parser.add_argument('--search-latency', type=float, default=0.0, help='模拟搜索的延迟秒数')
+    parser.add_argument('--llm-batch-pages', type=int, help='覆盖 LLM_BATCH_MAX_PAGES')
+    parser.add_argument('--workers', type=int, help='覆盖 SCRAPER_MAX_WORKERS')
+    parser.add_argument('--keep-rate-limits', action='store_true', help='保留 RATE_LIMIT_* 限流配置（默认关闭限流）')
+    parser.add_argument('--no-memory', action='store_true', help='不记录内存峰值')
+    parser.add_argument('--workdir', help='工作目录，默认使用临时目录并在结束后删除')
+    parser.add_argument('--output', help='结果JSON文件路径')
+    parser.add_argument('--baseline', help='基线结果JSON文件，吞吐量下降超过 --max-regression 时返回非零退出码')
+    parser.add_argument('--max-regression', type=float, default=0.2, help='允许的最大吞吐量下降比例')
+    parser.add_argument('--log-level', default='WARNING', help='日志级别')
+    return parser.parse_args(argv)
+
+def split(value):
+    return [item.strip().lower() for item in value.split(',') if item.strip()]
+
+def print_table(results):
+    """输出结果表格"""
+    header = f"{'benchmark':<16}{'backend':<9}{'rows':>8}{'seconds':>10}{'rows/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'peak MB':>9}  latency/skip"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        print(
+            f"{result.benchmark:<16}{result.backend:<9}{result.rows:>8}{result.seconds:>10.2f}"
+            f"{result.rows_per_second:>11.1f}{result.p50_ms:>9.1f}{result.p95_ms:>9.1f}"
+            f"{result.peak_memory_mb:>9.1f}  {result.skipped or result.latency_of}"
+        )
+        if result.heavy_modules:
+            print(f"  启动时已导入: {', '.join(result.heavy_modules)}")
+
+def run_backend_suites(args, suites, backends, root, track_memory):
+    """启动夹具服务，在每个存储后端上运行存储、搜索和财务补充测试"""
+    results = []
+    server = FixtureServer(args.site_latency, args.site_error_rate, args.llm_latency, args.llm_error_rate)
+    with server:
+        configure(server.base_url, server.llm_base_url, args.search_latency, args.keep_rate_limits)
+        for backend in backends:
+            reason = check_backend(backend)
+            if reason:
+                results.append(BenchmarkResult(benchmark=','.join(s for s in suites if s in BACKEND_SUITES), backend=backend, skipped=reason))
+                continue
+            if 'storage' in suites:
+                for size in split(args.sizes):
+                    results.extend(bench_storage(root, backend, make_records(parse_size(size)), args.batch_size, track_memory))
+            if 'search' in suites:
+                results.extend(bench_search(root, backend, args.pages, track_memory))
+            if 'enrich' in suites:
+                results.extend(bench_enrich(root, backend, args.companies, args.batch_size, track_memory))
+    return results
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format='%(asctime)s - %(levelname)s - %(message)s')
+
+    suites = split(args.suite)
+    backends = split(args.backends)
+    for backend in backends:
+        if not StorageMode.is_valid(backend):
+            print(f"无效的存储后端: {backend}", file=sys.stderr)
+            return 2
+    if args.llm_batch_pages:
+        config.scraper.llm_batch_max_pages = args.llm_batch_pages
+    if args.workers:
+        config.scraper.max_workers = args.workers
+    track_memory = not args.no_memory
+
+    results = []
+    if 'startup' in suites:
+        results.extend(bench_startup(args.startup_runs))
+    if any(suite in BACKEND_SUITES for suite in suites):
+        root = args.workdir or tempfile.mkdtemp(prefix='company_bench_')
+        try:
+            results.extend(run_backend_suites(args, suites, backends, root, track_memory))
+        finally:
+            if not args.workdir:
+                shutil.rmtree(root, ignore_errors=True)
+
+    print_table(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump([asdict(result) for result in results], f, ensure_ascii=False, indent=2)
+
+    # 导入命令行入口时不应加载重量级依赖
+    slow_imports = sorted({name for result in results for name in result.heavy_modules})
+    if slow_imports:
+        print(f"启动时导入了重量级依赖: {', '.join(slow_imports)}", file=sys.stderr)
+        return 1
+
+    # 没有产出任何行的测试说明流水线本身失败（如提取全部失败），吞吐量没有意义
+    empty = [result.key for result in results if not result.skipped and not result.rows]
+    if empty:
+        print(f"没有产出数据的测试: {', '.join(empty)}", file=sys.stderr)
+        return 1
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        for key, before, after in regressions:
+            print(f"吞吐量下降: {key} {before:.1f} -> {after:.1f} 行/秒", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+合成数据集
+按序号确定性地生成公司数据，同一序号在数据集、夹具网站和模拟LLM接口中得到相同的内容
+"""
+
+import random
+import re
+from datetime import datetime
+from src.config.settings import FIELDS
+
+# 预设的数据集规模
+SIZES = {'1k': 1000, '10k': 10000, '100k': 100000}
+
+# 公司名称中带有序号，模拟LLM接口据此从提示词中找回对应的公司
+COMPANY_NAME = "Benchmark Company {:06d}"
+COMPANY_NAME_RE = re.compile(r'Benchmark Company (\d{6})')
+
+COUNTRIES = ['中国', '美国', '德国', '日本', '新加坡', '英国']
+COMPANY_TYPES = ['有限责任公司', '股份有限公司', 'Private', 'Public']
+ESTABLISH_FORMATS = ['{y}-{m:02d}-{d:02d}', '{y}/{m}/{d}', '{y}年{m}月{d}日', '{y}', '未知']
+EMPLOYEE_FORMATS = ['{n}', '约{n}人', '{n}-{m}', '{k}k', '{n}+ employees', '未知']
+
+def parse_size(value):
+    """
+    解析数据集规模
+    :param value: '1k'/'10k'/'100k' 或整数字符串
+    :return: 行数
+    """
+    return SIZES.get(value.lower(), None) or int(value)
+
+def make_record(index):
+    """
+    生成一条公司数据
+    :param index: 序号
+    :return: 包含全部 FIELDS 的字典，约一半公司缺少营业额
+    """
+    rng = random.Random(index)
+    year, month, day = rng.randint(1950, 2023), rng.randint(1, 12), rng.randint(1, 28)
+    employees = rng.choice([10, 50, 120, 500, 1200, 8000])
+    domain = f"company{index}.example.com"
+    record = {
+        "公司名称": COMPANY_NAME.format(index),
+        "公司网址": f"https://{domain}",
+        "公司简介": f"Benchmark Company {index:06d} 提供工业设备和技术服务。" * rng.randint(1, 4),
+        "公司邮箱": f"info@{domain}",
+        "公司电话": f"+86 21 5{index % 10000000:07d}",
+        "公司地址": f"上海市浦东新区测试路 {index % 1000} 号",
+        "国家/地区": rng.choice(COUNTRIES),
+        "成立时间": rng.choice(ESTABLISH_FORMATS).format(y=year, m=month, d=day),
+        "员工人数": rng.choice(EMPLOYEE_FORMATS).format(n=employees, m=employees * 2, k=employees / 1000),
+        "公司类型": rng.choice(COMPANY_TYPES),
+        "近3年营业额": make_revenue(index) if rng.random() < 0.5 else "未知",
+        "谷歌地图链接": f"https://maps.google.com/?q={domain}",
+        "主要联系人姓名": f"Contact {index}",
+        "主要联系人职位": rng.choice(['CEO', 'CTO', '销售总监']),
+        "主要联系人邮箱": f"contact@{domain}",
+        "主要联系人电话": f"+86 138 {index % 100000000:08d}",
+        "主要联系人LinkedIn": f"https://www.linkedin.com/in/contact-{index}",
+        "主要联系人Twitter": "未知",
+        "主要联系人Facebook": "未知",
+        "数据来源": f"https://{domain}/about",
+        "数据获取时间": datetime.now().strftime('%Y-%m-%d'),
+        "备注": "未知",
+    }
+    return {field: record[field] for field in FIELDS}
+
+def make_revenue(index):
+    """生成营业额字符串，格式与财务数据提取提示词要求一致"""
+    rng = random.Random(-index - 1)
+    base = rng.randint(1, 500) * 1000000
+    return '; '.join(f"{year}: {base * (1 + 0.1 * offset):.0f}" for offset, year in enumerate((2021, 2022, 2023)))
+
+def make_records(count, start=0):
+    """
+    生成公司数据列表
+    :param count: 行数
+    :param start: 起始序号
+    :return: 字典列表
+    """
+    return [make_record(index) for index in range(start, start + count)]
+
+def iter_batches(records, batch_size):
+    """按固定大小切分数据"""
+    for start in range(0, len(records), batch_size):
+        yield records[start:start + batch_size]
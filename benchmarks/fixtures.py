@@ -0,0 +1,229 @@
+"""
+本地夹具
+- 夹具网站：/company/<序号> 为公司介绍页，/financial/<序号> 为财务数据页
+- 模拟LLM接口：/v1/chat/completions，兼容OpenAI接口，按提示词中的公司名称返回合成数据
+- 模拟搜索：作为搜索服务（SearchProvider）返回夹具网站的网址
+网站和LLM接口可以分别配置延迟和错误率；服务在独立进程中运行，不计入基准测试进程的内存和CPU
+"""
+
+import json
+import multiprocessing
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.utils.search_providers import SearchProvider, merge_urls
+from benchmarks.datasets import COMPANY_NAME_RE, make_record, make_revenue
+
+PAGE_PATH_RE = re.compile(r'^/(company|financial)/(\d+)$')
+
+# 财务数据提取提示词中的标志文字（见 financial_enricher.FINANCIAL_PROMPT）
+FINANCIAL_PROMPT_MARK = '营业额信息'
+# 批量提取提示词中的网页标题（见 prompts.build_batch_prompt）
+BATCH_PROMPT_MARK = '### 网页'
+
+# 夹具网站页面中展示的字段，其余字段交给LLM"提取"
+PAGE_FIELDS = ['公司简介', '公司地址', '国家/地区', '成立时间', '员工人数', '公司类型']
+
+def render_company_page(index):
+    """生成公司介绍页，邮箱、电话和社交链接可以被规则提取"""
+    record = make_record(index)
+    rows = ''.join(f"<p><b>{field}</b>: {record[field]}</p>" for field in PAGE_FIELDS)
+    return f"""<!DOCTYPE html>
+<html><head><title>{record['公司名称']}</title></head>
+<body>
+<nav><a href="/">首页</a> <a href="/products">产品</a></nav>
+<main>
+<h1>{record['公司名称']}</h1>
+{rows}
+<section class="contact">
+<a href="mailto:{record['公司邮箱']}">{record['公司邮箱']}</a>
+<a href="tel:{record['公司电话']}">{record['公司电话']}</a>
+<a href="{record['主要联系人LinkedIn']}">LinkedIn</a>
+</section>
+</main>
+<footer>Copyright {record['公司名称']}</footer>
+</body></html>"""
+
+def render_financial_page(index):
+    """生成财务数据页"""
+    return f"""<!DOCTYPE html>
+<html><head><title>Annual report</title></head>
+<body><main>
+<h1>{make_record(index)['公司名称']} annual report</h1>
+<p>Revenue: {make_revenue(index)}</p>
+</main></body></html>"""
+
+def completion_content(prompt, base_url):
+    """
+    按提示词生成LLM回复内容
+    :param prompt: 提示词
+    :param base_url: 夹具网站地址，批量回复中的 url 字段使用
+    :return: 回复内容字符串
+    """
+    indexes = [int(value) for value in COMPANY_NAME_RE.findall(prompt)]
+    indexes = list(dict.fromkeys(indexes))
+    if FINANCIAL_PROMPT_MARK in prompt:
+        return make_revenue(indexes[0]) if indexes else "未找到"
+    if BATCH_PROMPT_MARK in prompt:
+        return json.dumps(
+            [dict(make_record(index), url=f"{base_url}/company/{index}") for index in indexes],
+            ensure_ascii=False
+        )
+    return json.dumps(make_record(indexes[0]) if indexes else {}, ensure_ascii=False)
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """夹具网站和模拟LLM接口的请求处理器"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        """不输出访问日志"""
+
+    def _delay_or_fail(self, latency, error_rate, error_status):
+        """模拟延迟，按错误率返回错误状态码；返回错误时返回True"""
+        if latency:
+            time.sleep(random.uniform(0.5, 1.5) * latency)
+        if error_rate and random.random() < error_rate:
+            self._send(error_status, 'text/plain', b'injected error')
+            return True
+        return False
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        options = self.server.options
+        match = PAGE_PATH_RE.match(self.path.split('?', 1)[0])
+        if match is None:
+            self._send(404, 'text/plain', b'not found')
+            return
+        if self._delay_or_fail(options['site_latency'], options['site_error_rate'], 503):
+            return
+        kind, index = match.group(1), int(match.group(2))
+        html = render_company_page(index) if kind == 'company' else render_financial_page(index)
+        self._send(200, 'text/html; charset=utf-8', html.encode('utf-8'))
+
+    def do_POST(self):
+        options = self.server.options
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send(404, 'text/plain', b'not found')
+            return
+        if self._delay_or_fail(options['llm_latency'], options['llm_error_rate'], 429):
+            return
+
+        request = json.loads(body or b'{}')
+        prompt = '\n'.join(str(message.get('content', '')) for message in request.get('messages', []))
+        content = completion_content(prompt, options['base_url'])
+        prompt_tokens = len(prompt) // 2 + 1
+        completion_tokens = len(content) // 2 + 1
+        response = {
+            'id': 'chatcmpl-benchmark',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', 'benchmark'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+            },
+        }
+        self._send(200, 'application/json', json.dumps(response, ensure_ascii=False).encode('utf-8'))
+
+def _serve(options, port_queue):
+    """子进程入口：启动服务并回传端口"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+    server.daemon_threads = True
+    options['base_url'] = f"http://127.0.0.1:{server.server_port}"
+    server.options = options
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+class FixtureServer:
+    """在独立进程中运行的夹具网站和模拟LLM接口，支持 with 语句"""
+
+    def __init__(self, site_latency=0.0, site_error_rate=0.0, llm_latency=0.0, llm_error_rate=0.0):
+        """
+        :param site_latency: 网页平均延迟秒数（实际延迟在0.5到1.5倍之间随机）
+        :param site_error_rate: 网页返回503的比例
+        :param llm_latency: LLM接口平均延迟秒数
+        :param llm_error_rate: LLM接口返回429的比例
+        """
+        self.options = {
+            'site_latency': site_latency,
+            'site_error_rate': site_error_rate,
+            'llm_latency': llm_latency,
+            'llm_error_rate': llm_error_rate,
+        }
+        self.base_url = None
+        self._process = None
+
+    def start(self):
+        """启动服务进程，返回夹具网站地址"""
+        context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else multiprocessing
+        port_queue = context.Queue()
+        self._process = context.Process(target=_serve, args=(dict(self.options), port_queue), daemon=True)
+        self._process.start()
+        self.base_url = f"http://127.0.0.1:{port_queue.get(timeout=30)}"
+        return self.base_url
+
+    @property
+    def llm_base_url(self):
+        """模拟LLM接口地址，对应 OPENAI_API_BASE"""
+        return f"{self.base_url}/v1"
+
+    def stop(self):
+        """停止服务进程"""
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+        return False
+
+class FakeSearch(SearchProvider):
+    """
+    模拟搜索服务
+    公司财务查询返回该公司的财务数据页和介绍页，其他关键词按 stop 返回连续序号的公司介绍页
+    """
+
+    name = 'fake'
+
+    def __init__(self, base_url, latency=0.0, start=0):
+        """
+        :param base_url: 夹具网站地址
+        :param latency: 每次搜索的延迟秒数
+        :param start: 公司介绍页的起始序号
+        """
+        self.base_url = base_url
+        self.latency = latency
+        self.start = start
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def search(self, query, num=10, stop=None):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        match = COMPANY_NAME_RE.search(query)
+        if match is not None:
+            index = int(match.group(1))
+            urls = [f"{self.base_url}/financial/{index}", f"{self.base_url}/company/{index}"]
+        else:
+            count = stop if stop is not None else num
+            urls = [f"{self.base_url}/company/{index}" for index in range(self.start, self.start + count)]
+        return merge_urls([urls], stop)
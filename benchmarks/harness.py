@@ -0,0 +1,330 @@
+"""
+基准测试执行
+每项基准测试在独立的工作目录中运行，记录行数/秒、p50/p95延迟和内存峰值
+"""
+
+import gc
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from src.config.settings import config
+from src.utils.search_providers import set_search_provider
+from src.utils.metrics import get_metrics, percentile, reset_metrics
+from src.utils.storage_factory import StorageFactory
+from src.utils.url_filter import KnownSourceIndex
+from src.core.scraper import search_and_scrape
+from src.core.financial_enricher import enrich_financial_data
+from benchmarks.datasets import iter_batches, make_records
+from benchmarks.fixtures import FakeSearch
+
+# 常驻内存的采样间隔秒数
+MEMORY_SAMPLE_INTERVAL = 0.01
+
+# 项目根目录（main.py 所在目录）
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 导入较慢、应只在对应模式或存储后端实际使用时才导入的依赖
+HEAVY_MODULES = ('pandas', 'pyarrow', 'openpyxl', 'pymysql', 'scrapegraphai', 'googlesearch')
+
+# 启动测试在子进程中运行的脚本：导入命令行入口，输出已导入的重量级依赖
+STARTUP_SCRIPT = (
+    "import json, sys\n"
+    "import main\n"
+    "print(json.dumps([name for name in {modules!r} if name in sys.modules]))\n"
+)
+
+@dataclass
+class BenchmarkResult:
+    """单项基准测试结果"""
+    benchmark: str
+    backend: str
+    rows: int = 0
+    seconds: float = 0.0
+    rows_per_second: float = 0.0
+    p50_ms: float = 0.0
+    p95_ms: float = 0.0
+    peak_memory_mb: float = 0.0
+    latency_of: str = ''
+    stages: dict = field(default_factory=dict)
+    counters: dict = field(default_factory=dict)
+    heavy_modules: list = field(default_factory=list)
+    skipped: str = ''
+
+    @property
+    def key(self):
+        """与基线结果对比时使用的标识"""
+        return f"{self.benchmark}/{self.backend}/{self.rows}"
+
+def configure(fixture_base_url, llm_base_url, search_latency=0.0, keep_rate_limits=False):
+    """
+    将全局配置指向本地夹具：关闭缓存，搜索、网页和LLM都使用本地服务
+    夹具网站的所有网址都在同一主机上，因此保留同域名的全部网址，并默认关闭限流
+    :return: 模拟搜索对象
+    """
+    config.cache.enabled = False
+    config.api.base_url = llm_base_url
+    os.environ['OPENAI_API_BASE'] = llm_base_url
+    config.scraper.domain_policy = 'all'
+    config.scraper.skip_known = 'none'
+    if not keep_rate_limits:
+        config.rate_limit.search_rate = 0
+        config.rate_limit.host_rate = 0
+        config.rate_limit.llm_rate = 0
+    config.rate_limit.search_pause = 0
+    fake_search = FakeSearch(fixture_base_url, latency=search_latency)
+    set_search_provider(fake_search)
+    return fake_search
+
+@contextmanager
+def workspace(root, name, backend):
+    """切换到单项基准测试的工作目录（Excel输出目录和Parquet数据集都在其中）"""
+    directory = os.path.join(root, name)
+    os.makedirs(directory, exist_ok=True)
+    previous = os.getcwd(), config.storage_mode, config.parquet.dataset_dir
+    os.chdir(directory)
+    config.storage_mode = backend
+    config.parquet.dataset_dir = os.path.join(directory, 'data', 'dataset')
+    try:
+        yield directory
+    finally:
+        os.chdir(previous[0])
+        config.storage_mode, config.parquet.dataset_dir = previous[1], previous[2]
+
+def check_backend(backend):
+    """
+    检查存储后端是否可用
+    :return: 不可用的原因，可用时返回空字符串
+    """
+    if backend != 'mysql':
+        return ''
+    from src.utils.db_handler import DatabaseHandler
+    handler = DatabaseHandler()
+    if not handler.connect():
+        return '无法连接MySQL（检查 MYSQL_* 配置）'
+    handler.close()
+    return ''
+
+class PeakMemory:
+    """
+    记录运行期间内存峰值相对开始时的增量
+    Linux 下在后台线程中采样常驻内存（包括 pandas/pyarrow 的原生内存，开销很小），
+    其他平台退回 tracemalloc（只统计Python对象，且会明显降低运行速度）
+    """
+
+    STATM_PATH = '/proc/self/statm'
+
+    def __init__(self):
+        self.use_rss = os.path.exists(self.STATM_PATH)
+        self.baseline = 0
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _rss(self):
+        with open(self.STATM_PATH) as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+    def _sample(self):
+        while not self._stop.wait(MEMORY_SAMPLE_INTERVAL):
+            self.peak = max(self.peak, self._rss())
+
+    def start(self):
+        if not self.use_rss:
+            tracemalloc.start()
+            return
+        self.baseline = self.peak = self._rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        :return: 内存峰值增量（字节）
+        """
+        if not self.use_rss:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return peak
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._rss())
+        return self.peak - self.baseline
+
+def measure(benchmark, backend, fn, latency_stage=None, track_memory=True):
+    """
+    运行并测量一项基准测试
+    :param fn: 被测函数，返回 (行数, 每项延迟秒数列表或None, 输出)
+    :param latency_stage: fn 不返回延迟列表时，使用该阶段在运行指标中的分位数
+    :param track_memory: 是否记录内存峰值
+    :return: (BenchmarkResult, fn 的输出)
+    """
+    gc.collect()
+    reset_metrics()
+    memory = PeakMemory() if track_memory else None
+    if memory is not None:
+        memory.start()
+    peak = 0
+    start = time.perf_counter()
+    try:
+        rows, latencies, output = fn()
+        seconds = time.perf_counter() - start
+    finally:
+        if memory is not None:
+            peak = memory.stop()
+
+    summary = get_metrics().snapshot()
+    result = BenchmarkResult(
+        benchmark=benchmark,
+        backend=backend,
+        rows=rows,
+        seconds=round(seconds, 3),
+        rows_per_second=round(rows / seconds, 1) if seconds else 0.0,
+        peak_memory_mb=round(peak / 1024 / 1024, 1),
+        stages=summary['stages'],
+        counters=summary['counters'],
+    )
+    if latencies:
+        result.latency_of = 'item'
+        result.p50_ms = round(percentile(latencies, 50) * 1000, 1)
+        result.p95_ms = round(percentile(latencies, 95) * 1000, 1)
+    elif latency_stage in summary['stages']:
+        stats = summary['stages'][latency_stage]
+        result.latency_of = latency_stage
+        result.p50_ms = round(stats['p50_seconds'] * 1000, 1)
+        result.p95_ms = round(stats['p95_seconds'] * 1000, 1)
+    return result, output
+
+def write_records(records, batch_size, filename, latencies=None):
+    """
+    通过 StorageFactory 的增量写入器分批写入数据
+    :param latencies: 可选的列表，记录每批的写入耗时
+    :return: 存储结果（Excel/Parquet为文件路径，MySQL为是否成功）
+    """
+    with StorageFactory.open_writer(task_type='search', filename=filename) as writer:
+        for batch in iter_batches(records, batch_size):
+            start = time.perf_counter()
+            writer.write(batch)
+            if latencies is not None:
+                latencies.append(time.perf_counter() - start)
+    return writer.result
+
+def bench_storage(root, backend, records, batch_size, track_memory=True):
+    """
+    存储写入：分批写入合成数据集，延迟为每批写入耗时（结束时生成最终文件的耗时计入总时间）
+    写入后再流式扫描缺少营业额的公司，延迟为每块的读取耗时
+    :return: [写入结果, 扫描结果]
+    """
+    rows = len(records)
+    with workspace(root, f"storage_{backend}_{rows}", backend):
+        def write():
+            latencies = []
+            source = write_records(records, batch_size, f"bench_{rows}.xlsx", latencies)
+            return rows, latencies, source
+
+        write_result, source = measure('storage_write', backend, write, track_memory=track_memory)
+
+        def scan():
+            # 行数按扫描的数据集大小计算，而不是其中缺少营业额的公司数
+            latencies = []
+            chunks = StorageFactory.iter_pending_companies(source if config.is_excel_mode else None, batch_size)
+            start = time.perf_counter()
+            for _ in chunks:
+                latencies.append(time.perf_counter() - start)
+                start = time.perf_counter()
+            return rows, latencies, None
+
+        scan_result, _ = measure('pending_scan', backend, scan, track_memory=track_memory)
+    return [write_result, scan_result]
+
+def bench_search(root, backend, pages, track_memory=True):
+    """
+    搜索爬取流水线：模拟搜索返回 pages 个夹具网页，经获取、规则提取、LLM提取后写入存储
+    延迟为LLM阶段的耗时
+    """
+    with workspace(root, f"search_{backend}_{pages}", backend):
+        def run():
+            results, storage_result = search_and_scrape(
+                'benchmark companies',
+                num_results=pages,
+                known_index=KnownSourceIndex(),
+                filename=f"bench_search_{pages}.xlsx"
+            )
+            return len(results), None, storage_result
+
+        result, _ = measure('search_pipeline', backend, run, latency_stage='llm', track_memory=track_memory)
+    return [result]
+
+def bench_enrich(root, backend, companies, batch_size, track_memory=True):
+    """
+    财务数据补充流水线：先写入 companies 家公司（不计时），再补充其中缺少营业额的公司
+    只处理本次写入的公司，MySQL中已有的其他数据不受影响；延迟为单家公司的处理耗时，
+    行数只计找到营业额的公司，未找到或提取失败的公司不计入吞吐量
+    """
+    records = make_records(companies)
+    names = [record['公司名称'] for record in records]
+    with workspace(root, f"enrich_{backend}_{companies}", backend):
+        source = write_records(records, batch_size, f"bench_enrich_{companies}.xlsx")
+
+        def run():
+            storage_result = enrich_financial_data(source if config.is_excel_mode else None, companies=names)
+            enriched = get_metrics().snapshot()['counters'].get('companies_enriched', 0)
+            return enriched, None, storage_result
+
+        result, _ = measure('enrich_pipeline', backend, run, latency_stage='enrich_company', track_memory=track_memory)
+    return [result]
+
+def bench_startup(runs):
+    """
+    启动耗时：在新的Python进程中导入命令行入口 main，重复 runs 次
+    每个进程的耗时包括解释器启动和导入，相当于调度器每次启动短时任务的固定开销；
+    同时记录导入入口时已加载的重量级依赖（HEAVY_MODULES），正常情况下应为空
+    """
+    script = STARTUP_SCRIPT.format(modules=HEAVY_MODULES)
+    latencies = []
+    heavy_modules = set()
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, '-c', script], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        latencies.append(time.perf_counter() - start)
+        heavy_modules.update(json.loads(output.strip().splitlines()[-1]))
+
+    seconds = sum(latencies)
+    return [BenchmarkResult(
+        benchmark='startup',
+        backend='cli',
+        rows=runs,
+        seconds=round(seconds, 3),
+        rows_per_second=round(runs / seconds, 1) if seconds else 0.0,
+        p50_ms=round(percentile(latencies, 50) * 1000, 1),
+        p95_ms=round(percentile(latencies, 95) * 1000, 1),
+        latency_of='process',
+        heavy_modules=sorted(heavy_modules),
+    )]
+
+def compare(results, baseline, max_regression):
+    """
+    与基线结果对比吞吐量
+    :param results: BenchmarkResult 列表
+    :param baseline: 基线结果字典列表（run 输出的JSON）
+    :param max_regression: 允许的最大下降比例，如0.2表示吞吐量下降超过20%视为退化
+    :return: 退化的 (标识, 基线吞吐量, 当前吞吐量) 列表
+    """
+    previous = {
+        f"{item['benchmark']}/{item['backend']}/{item['rows']}": item['rows_per_second']
+        for item in baseline if not item.get('skipped')
+    }
+    regressions = []
+    for result in results:
+        before = previous.get(result.key)
+        if result.skipped or not before:
+            continue
+        if result.rows_per_second < before * (1 - max_regression):
+            regressions.append((result.key, before, result.rows_per_second))
+    return regressions
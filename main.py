@@ -1,70 +1,366 @@
-import os
-from dotenv import load_dotenv
+import sys
+import argparse
 import json
-import pandas as pd
-from googlesearch import search
 from datetime import datetime
-import logging
 from src.utils.logger import setup_logging
-from src.core.scraper import search_and_scrape
+from src.core.scraper import prefetch_searches, search_and_scrape
 from src.core.financial_enricher import enrich_financial_data
-from src.config.settings import config
-from src.utils.excel_handler import save_to_excel
+from src.config.settings import config, StorageMode
+from src.utils.checkpoint import JobCheckpoint
+from src.utils.url_filter import KnownSourceIndex
+from src.utils.metrics import write_run_summary
+from src.core.sharding import get_queue, plan_search_job, plan_enrich_job, run_sharded_job, run_workers
+from src.utils.work_queue import SHARD_FAILED
 
-# 环境配置
-load_dotenv()  # 加载环境变量
+# 环境变量由 src.config.settings 加载；存储模式相关的处理模块（pandas、openpyxl、pymysql、pyarrow）
+# 和 scrapegraphai、googlesearch 在首次使用时才导入，--help 和只用到一种存储模式的运行启动更快
 
-# 设置 OpenAI API 基础 URL
-os.environ['OPENAI_API_BASE'] = "http://localhost:1234/v1"
+def parse_args(argv=None):
+    """
+    解析命令行参数
+    不指定子命令时进入交互模式；search/enrich 子命令用于无人值守的批量运行（如定时任务）
+    """
+    parser = argparse.ArgumentParser(description="DeepSeekAI 企业信息爬虫")
+    parser.add_argument('--resume', metavar='JOB_ID', help="从检查点继续运行中断的任务")
 
-def main():
-    # 设置日志
-    logger = setup_logging()
-    
-    logger.info("程序启动")
-    logger.info(f"当前存储模式: {config.storage_mode}")
-    
+    # 各子命令共用的运行参数
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--storage', choices=[StorageMode.EXCEL, StorageMode.MYSQL, StorageMode.PARQUET], help="存储模式，默认使用配置 STORAGE_MODE")
+    common.add_argument('--workers', type=int, help="同时处理的网址数或公司数")
+    common.add_argument('--fetch-concurrency', type=int, help="网页获取并发数")
+    common.add_argument('--llm-concurrency', type=int, help="LLM调用并发数")
+    common.add_argument('--no-cache', action='store_true', help="不使用搜索、网页和提取结果缓存")
+    common.add_argument('--search-provider', choices=['google', 'searxng', 'file'], help="搜索服务，默认使用配置 SEARCH_PROVIDER")
+
+    # 分片执行参数
+    shard = argparse.ArgumentParser(add_help=False)
+    shard.add_argument('--processes', type=int, help="本机工作进程数，指定后以分片方式运行")
+    shard.add_argument('--shard-size', type=int, help="每个分片的网址数或公司数，默认使用配置 SHARD_SIZE")
+    shard.add_argument('--queue', help="工作队列文件路径，默认使用配置 WORK_QUEUE_PATH，多节点运行时指向共享位置")
+
+    subparsers = parser.add_subparsers(dest='command', metavar='{search,enrich,worker,shard-resume,export,import}')
+
+    search_parser = subparsers.add_parser('search', parents=[common, shard], help="搜索关键词并爬取公司信息")
+    search_parser.add_argument('-k', '--keyword', action='append', default=[], help="搜索关键词，可重复指定")
+    search_parser.add_argument('-f', '--keywords-file', help="关键词文件，每行一个，#开头的行为注释")
+    search_parser.add_argument('-n', '--num-results', type=int, help="每个关键词的结果数量上限，默认不限制")
+    search_parser.add_argument('-o', '--output', help="输出文件名（仅Excel模式），所有关键词的结果追加到同一文件")
+
+    enrich_parser = subparsers.add_parser('enrich', parents=[common, shard], help="补充公司财务数据")
+    enrich_parser.add_argument('-i', '--input', action='append', default=[], help="要处理的Excel文件（Excel模式必填），可重复指定")
+    enrich_parser.add_argument('-c', '--companies-file', help="公司名称文件，每行一个，只处理其中的公司")
+
+    worker_parser = subparsers.add_parser('worker', parents=[common, shard], help="领取并处理分片任务（可在其他节点运行）")
+    worker_parser.add_argument('job_id', help="分片任务ID")
+
+    resume_parser = subparsers.add_parser('shard-resume', parents=[common, shard], help="继续协调中断的分片任务并合并结果")
+    resume_parser.add_argument('job_id', help="分片任务ID")
+
+    export_parser = subparsers.add_parser('export', parents=[common], help="将Parquet数据集导出为Excel文件")
+    export_parser.add_argument('-o', '--output', help="输出文件名，默认按时间生成")
+
+    import_parser = subparsers.add_parser('import', parents=[common], help="将Excel文件中的公司数据导入MySQL数据库")
+    import_parser.add_argument('files', nargs='+', help="要导入的Excel文件")
+    import_parser.add_argument('--upsert-key', choices=['company_name', 'company_website'], help="去重字段，默认使用配置 MYSQL_UPSERT_KEY")
+
+    return parser.parse_args(argv)
+
+def read_lines(path):
+    """读取列表文件，忽略空行和#开头的注释行，按首次出现顺序去重"""
+    with open(path, encoding='utf-8-sig') as f:
+        lines = [line.strip() for line in f]
+    return list(dict.fromkeys(line for line in lines if line and not line.startswith('#')))
+
+def apply_overrides(args):
+    """用命令行参数覆盖配置，需要在创建共享会话和并发槽位之前调用"""
+    if args.storage:
+        config.storage_mode = args.storage
+    if args.workers:
+        config.scraper.max_workers = args.workers
+        config.scraper.enrich_workers = args.workers
+    if args.fetch_concurrency:
+        config.scraper.fetch_concurrency = args.fetch_concurrency
+    if args.llm_concurrency:
+        config.scraper.llm_concurrency = args.llm_concurrency
+    if args.no_cache:
+        config.cache.enabled = False
+    if args.search_provider:
+        config.search.provider = args.search_provider
+
+def search_filename():
+    """生成搜索结果文件名，固定后恢复任务时可以追加到同一文件"""
+    return f"company_search_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+
+def create_search_job(logger, keyword, num_results, filename=None):
+    """创建搜索任务检查点"""
+    params = {'keyword': keyword, 'num_results': num_results}
+    if config.is_excel_mode:
+        params['filename'] = filename or search_filename()
+    job = JobCheckpoint.create('search', params)
+    logger.info(f"任务ID: {job.job_id}，中断后可使用 --resume {job.job_id} 继续")
+    return job
+
+def create_enrich_job(logger, filename, companies=None):
+    """创建财务数据补充任务检查点"""
+    job = JobCheckpoint.create('financial', {'filename': filename, 'companies': companies})
+    logger.info(f"任务ID: {job.job_id}，中断后可使用 --resume {job.job_id} 继续")
+    return job
+
+def run_search(logger, keyword, num_results, job, known_index=None, prefetched=None):
+    """
+    运行新数据搜索任务，prefetched 为可选的 prefetch_searches 结果
+    只有搜索成功且结果已保存时才标记任务完成，否则保留检查点，可使用 --resume 继续
+    :return: 是否成功，搜索或保存失败时返回False
+    """
+    logger.info(f"开始搜索和爬取数据... 关键词: {keyword}, 数量: {'不限' if num_results is None else num_results}")
+    try:
+        results, storage_result = search_and_scrape(
+            keyword, num_results, known_index=known_index, job=job, filename=job.params.get('filename'),
+            prefetched=prefetched
+        )
+    except RuntimeError as e:
+        logger.error(str(e))
+        return False
+
+    # 显示爬取完成信息
+    logger.info(f"爬取完成，共获取 {len(results)} 条数据")
+    if results and not storage_result:
+        logger.error(f"数据保存失败，可使用 --resume {job.job_id} 继续")
+        return False
+    if storage_result:
+        if config.is_mysql_mode:
+            logger.info("数据已成功保存到数据库")
+        else:
+            logger.info(f"数据已保存到：{storage_result}")
+    job.finish()
+    return True
+
+def run_enrich(logger, filename, job, companies=None):
+    """
+    运行财务数据补充任务
+    :return: 是否更新成功，没有需要更新的公司时也返回True
+    """
+    storage_result = enrich_financial_data(filename, job=job, companies=companies)
+
+    if storage_result:
+        if storage_result is True and not config.is_mysql_mode:
+            logger.info("财务数据补充完成，没有需要保存的更新")
+        elif config.is_mysql_mode:
+            logger.info("财务数据已成功更新到数据库")
+        else:
+            logger.info(f"财务数据更新完成，结果已保存到：{storage_result}")
+        job.finish()
+        return True
+    logger.error("财务数据更新失败")
+    return False
+
+def run_sharded(logger, job_id, args):
+    """
+    处理分片任务，等待全部分片完成后合并结果
+    :return: 是否成功，有分片失败或结果保存失败时返回False
+    """
+    try:
+        storage_result = run_sharded_job(job_id, args.processes, args.queue)
+    except TimeoutError as e:
+        logger.error(f"{str(e)}，可稍后使用 shard-resume {job_id} 继续")
+        return False
+    if not storage_result:
+        return False
+    logger.info(f"分片任务 {job_id} 完成，存储结果：{storage_result}")
+    failed_shards = get_queue(args.queue).progress(job_id).get(SHARD_FAILED, 0)
+    if failed_shards:
+        logger.error(f"分片任务 {job_id} 有 {failed_shards} 个分片失败")
+        return False
+    return True
+
+def run_search_command(logger, args):
+    """
+    批量搜索：依次处理所有关键词，共用已保存数据来源的索引，单个关键词失败不影响其余关键词
+    :return: 退出码
+    """
+    keywords = list(dict.fromkeys(args.keyword + (read_lines(args.keywords_file) if args.keywords_file else [])))
+    if not keywords:
+        logger.error("请通过 --keyword 或 --keywords-file 指定搜索关键词")
+        return 2
+
+    filename = args.output or search_filename()
+    if args.processes:
+        job_id = plan_search_job(keywords, args.num_results, filename, args.shard_size, get_queue(args.queue))
+        logger.info(f"分片任务ID: {job_id}，其他节点可使用 worker {job_id} 参与处理")
+        succeeded = run_sharded(logger, job_id, args)
+        failed_keywords = get_queue(args.queue).get_job(job_id)['params'].get('failed_keywords')
+        logger.info(f"分片搜索完成，共 {len(keywords)} 个关键词，搜索失败 {len(failed_keywords or [])} 个")
+        return 0 if succeeded and not failed_keywords else 1
+
+    known_index = KnownSourceIndex.load()
+    # 所有关键词先并发搜索，再依次爬取
+    prefetched = prefetch_searches(keywords, args.num_results) if len(keywords) > 1 else None
+    failed = []
+    for number, keyword in enumerate(keywords, 1):
+        logger.info(f"关键词 {number}/{len(keywords)}: {keyword}")
+        try:
+            job = create_search_job(logger, keyword, args.num_results, filename)
+            if not run_search(logger, keyword, args.num_results, job, known_index, prefetched):
+                failed.append(keyword)
+        except Exception as e:
+            logger.error(f"处理关键词 {keyword} 时发生错误: {str(e)}")
+            failed.append(keyword)
+
+    logger.info(f"批量搜索完成，共 {len(keywords)} 个关键词，失败 {len(failed)} 个")
+    return 1 if failed else 0
+
+def run_enrich_command(logger, args):
+    """
+    批量补充财务数据：Excel模式依次处理每个输入文件，MySQL模式处理数据库中的记录
+    :return: 退出码
+    """
+    companies = read_lines(args.companies_file) if args.companies_file else None
+    if not config.is_excel_mode:
+        filenames = [None]
+    elif args.input:
+        filenames = args.input
+    else:
+        logger.error("Excel模式下必须通过 --input 指定输入文件")
+        return 2
+
+    failed = 0
+    for filename in filenames:
+        if args.processes:
+            job_id = plan_enrich_job(filename, companies, args.shard_size, get_queue(args.queue))
+            if job_id is None:
+                failed += 1
+                continue
+            logger.info(f"分片任务ID: {job_id}，其他节点可使用 worker {job_id} 参与处理")
+            if not run_sharded(logger, job_id, args):
+                failed += 1
+            continue
+
+        job = create_enrich_job(logger, filename, companies)
+        if not run_enrich(logger, filename, job, companies):
+            failed += 1
+    return 1 if failed else 0
+
+def run_worker_command(logger, args):
+    """
+    工作节点：在本机启动工作进程处理分片，不合并结果
+    :return: 退出码
+    """
+    processed = run_workers(args.job_id, args.processes, args.queue)
+    logger.info(f"本节点共处理 {processed} 个分片")
+    return 0
+
+def run_shard_resume(logger, args):
+    """
+    继续协调中断的分片任务：处理剩余分片，等待完成后合并结果
+    :return: 退出码
+    """
+    return 0 if run_sharded(logger, args.job_id, args) else 1
+
+def run_export_command(logger, args):
+    """
+    导出Parquet数据集为Excel文件
+    :return: 退出码
+    """
+    if not config.is_parquet_mode:
+        logger.error("只有Parquet存储模式需要导出，请使用 --storage parquet 或配置 STORAGE_MODE=parquet")
+        return 2
+    from src.utils.parquet_handler import export_to_excel
+    return 0 if export_to_excel(args.output) else 1
+
+def run_import_command(logger, args):
+    """
+    将Excel文件导入MySQL数据库，单个文件失败不影响其余文件
+    :return: 退出码
+    """
+    if not config.is_mysql_mode:
+        logger.error("只能导入到MySQL数据库，请使用 --storage mysql 或配置 STORAGE_MODE=mysql")
+        return 2
+    from src.utils.storage_factory import StorageFactory
+    failed = [filename for filename in args.files if not StorageFactory.import_excel_to_database(filename, args.upsert_key)]
+    logger.info(f"导入完成，共 {len(args.files)} 个文件，失败 {len(failed)} 个")
+    return 1 if failed else 0
+
+def run_resume(logger, job_id):
+    """
+    恢复中断的任务
+    :return: 退出码
+    """
+    job = JobCheckpoint.load(job_id)
+    if job.finished:
+        logger.info(f"任务 {job.job_id} 已完成，无需恢复")
+        return 0
+    logger.info(f"恢复任务 {job.job_id}，参数: {json.dumps(job.params, ensure_ascii=False)}")
+    if job.job_type == 'search':
+        return 0 if run_search(logger, job.params['keyword'], job.params.get('num_results'), job) else 1
+    return 0 if run_enrich(logger, job.params.get('filename'), job, job.params.get('companies')) else 1
+
+def run_interactive(logger):
+    """交互模式，按提示输入模式和参数"""
     # 选择模式
     mode = input("请选择模式（1: 新数据搜索, 2: 财务数据补充）：")
-    
+
     if mode == "1":
         keyword = input("请输入搜索关键词：")
         num_results_input = input("请输入需要搜索的结果数量（直接回车表示不限制）：")
         num_results = int(num_results_input) if num_results_input else None
-        
-        logger.info(f"开始搜索和爬取数据... 关键词: {keyword}, 数量: {'不限' if num_results is None else num_results}")
-        results, storage_result = search_and_scrape(keyword, num_results)
-        
-        # 显示爬取完成信息
-        logger.info(f"爬取完成，共获取 {len(results)} 条数据")
-        if storage_result:
-            if config.is_mysql_mode:
-                logger.info("数据已成功保存到数据库")
-            else:
-                logger.info(f"数据已保存到：{storage_result}")
-    
+
+        job = create_search_job(logger, keyword, num_results)
+        return 0 if run_search(logger, keyword, num_results, job) else 1
+
     elif mode == "2":
-        if config.is_mysql_mode:
-            storage_result = enrich_financial_data()
-        else:
+        filename = None
+        if config.is_excel_mode:
             filename = input("请输入要处理的Excel文件名：")
             if not filename:
                 logger.error("Excel模式下必须指定输入文件名")
-                return
-            storage_result = enrich_financial_data(filename)
-        
-        if storage_result:
-            if config.is_mysql_mode:
-                logger.info("财务数据已成功更新到数据库")
-            else:
-                logger.info(f"财务数据更新完成，结果已保存到：{storage_result}")
-        else:
-            logger.error("财务数据更新失败")
-    
+                return 2
+
+        job = create_enrich_job(logger, filename)
+        return 0 if run_enrich(logger, filename, job) else 1
+
     else:
         logger.error("无效的模式选择")
-    
+        return 2
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command:
+        apply_overrides(args)
+
+    # 设置日志
+    logger = setup_logging()
+
+    logger.info("程序启动")
+    logger.info(f"当前存储模式: {config.storage_mode}")
+
+    # 合并上次异常中断时遗留的日志文件
+    if config.is_excel_mode:
+        from src.utils.excel_handler import recover_journals
+        recover_journals()
+    elif config.is_parquet_mode:
+        from src.utils.parquet_handler import recover_parquet_journals
+        recover_parquet_journals()
+
+    if args.resume:
+        exit_code = run_resume(logger, args.resume)
+    elif args.command == 'search':
+        exit_code = run_search_command(logger, args)
+    elif args.command == 'enrich':
+        exit_code = run_enrich_command(logger, args)
+    elif args.command == 'worker':
+        exit_code = run_worker_command(logger, args)
+    elif args.command == 'shard-resume':
+        exit_code = run_shard_resume(logger, args)
+    elif args.command == 'export':
+        exit_code = run_export_command(logger, args)
+    elif args.command == 'import':
+        exit_code = run_import_command(logger, args)
+    else:
+        exit_code = run_interactive(logger)
+
+    write_run_summary(args.command or ('resume' if args.resume else 'interactive'))
     logger.info("程序结束")
+    return exit_code
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
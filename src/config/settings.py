@@ -32,16 +32,121 @@ class DatabaseConfig:
     database: str = os.getenv('MYSQL_DATABASE', 'web-deepseekai')
     table: str = os.getenv('MYSQL_TABLE', 'company_info')
     charset: str = 'utf8mb4'
+    pool_size: int = int(os.getenv('MYSQL_POOL_SIZE', 5))
+    pool_recycle: int = int(os.getenv('MYSQL_POOL_RECYCLE', 3600))
+    pool_ping_interval: int = int(os.getenv('MYSQL_POOL_PING_INTERVAL', 30))
+    pool_timeout: int = int(os.getenv('MYSQL_POOL_TIMEOUT', 30))
+    batch_size: int = int(os.getenv('MYSQL_BATCH_SIZE', 1000))
+    upsert_key: str = os.getenv('MYSQL_UPSERT_KEY', '')
+
+@dataclass
+class ScraperConfig:
+    """爬虫并发配置类"""
+    max_workers: int = int(os.getenv('SCRAPER_MAX_WORKERS', 4))
+    fetch_concurrency: int = int(os.getenv('SCRAPER_FETCH_CONCURRENCY', 8))
+    llm_concurrency: int = int(os.getenv('SCRAPER_LLM_CONCURRENCY', 2))
+    fetch_timeout: int = int(os.getenv('SCRAPER_FETCH_TIMEOUT', 30))
+    html_trim: bool = os.getenv('HTML_TRIM', 'true').lower() == 'true'
+    html_max_chars: int = int(os.getenv('HTML_MAX_CHARS', 20000))
+    rule_extraction: bool = os.getenv('RULE_EXTRACTION', 'true').lower() == 'true'
+    rule_skip_min_fields: int = int(os.getenv('RULE_SKIP_MIN_FIELDS', 0))
+    llm_batch_max_pages: int = int(os.getenv('LLM_BATCH_MAX_PAGES', 1))
+    llm_batch_token_budget: int = int(os.getenv('LLM_BATCH_TOKEN_BUDGET', 12000))
+    enrich_workers: int = int(os.getenv('ENRICH_MAX_WORKERS', 4))
+    enrich_url_concurrency: int = int(os.getenv('ENRICH_URL_CONCURRENCY', 3))
+    enrich_chunk_size: int = int(os.getenv('ENRICH_CHUNK_SIZE', 5000))
+    domain_policy: str = os.getenv('URL_DOMAIN_POLICY', 'first').lower()
+    skip_known: str = os.getenv('URL_SKIP_KNOWN', 'domain').lower()
+
+@dataclass
+class CacheConfig:
+    """缓存配置类"""
+    enabled: bool = os.getenv('CACHE_ENABLED', 'true').lower() == 'true'
+    path: str = os.getenv('CACHE_PATH', os.path.join('data', 'cache', 'cache.sqlite3'))
+    search_ttl: int = int(os.getenv('SEARCH_CACHE_TTL', 7 * 24 * 3600))
+    search_max_entries: int = int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', 10000))
+    page_fresh_ttl: int = int(os.getenv('PAGE_CACHE_FRESH_TTL', 24 * 3600))
+    page_ttl: int = int(os.getenv('PAGE_CACHE_TTL', 30 * 24 * 3600))
+    page_max_entries: int = int(os.getenv('PAGE_CACHE_MAX_ENTRIES', 2000))
+    extraction_ttl: int = int(os.getenv('EXTRACTION_CACHE_TTL', 30 * 24 * 3600))
+    extraction_max_entries: int = int(os.getenv('EXTRACTION_CACHE_MAX_ENTRIES', 50000))
+
+@dataclass
+class RateLimitConfig:
+    """限流与重试配置类，速率单位为每秒请求数"""
+    search_rate: float = float(os.getenv('RATE_LIMIT_SEARCH', 0.5))
+    host_rate: float = float(os.getenv('RATE_LIMIT_HOST', 2))
+    llm_rate: float = float(os.getenv('RATE_LIMIT_LLM', 5))
+    burst: int = int(os.getenv('RATE_LIMIT_BURST', 2))
+    min_rate_ratio: float = float(os.getenv('RATE_LIMIT_MIN_RATIO', 0.05))
+    decrease_factor: float = float(os.getenv('RATE_LIMIT_DECREASE', 0.5))
+    increase_ratio: float = float(os.getenv('RATE_LIMIT_INCREASE', 0.05))
+    search_pause: float = float(os.getenv('SEARCH_PAUSE', 2.0))
+    max_retries: int = int(os.getenv('RETRY_MAX_ATTEMPTS', 3))
+    retry_base_delay: float = float(os.getenv('RETRY_BASE_DELAY', 1.0))
+    retry_max_delay: float = float(os.getenv('RETRY_MAX_DELAY', 60.0))
+    retry_budget_ratio: float = float(os.getenv('RETRY_BUDGET_RATIO', 0.2))
+    retry_budget_min: int = int(os.getenv('RETRY_BUDGET_MIN', 5))
+
+@dataclass
+class SearchConfig:
+    """搜索服务配置类"""
+    # 搜索服务：google（googlesearch）、searxng（自建 SearxNG）、file（本地JSON文件）
+    provider: str = os.getenv('SEARCH_PROVIDER', 'google').lower()
+    # 多个关键词同时搜索的数量
+    concurrency: int = int(os.getenv('SEARCH_CONCURRENCY', 4))
+    timeout: int = int(os.getenv('SEARCH_TIMEOUT', 30))
+    searxng_url: str = os.getenv('SEARXNG_URL', 'http://localhost:8080')
+    searxng_page_size: int = int(os.getenv('SEARXNG_PAGE_SIZE', 10))
+    searxng_max_pages: int = int(os.getenv('SEARXNG_MAX_PAGES', 5))
+    searxng_engines: str = os.getenv('SEARXNG_ENGINES', '')
+    results_file: str = os.getenv('SEARCH_RESULTS_FILE', os.path.join('data', 'search_results.json'))
+
+@dataclass
+class ShardConfig:
+    """分片执行配置类"""
+    queue_path: str = os.getenv('WORK_QUEUE_PATH', os.path.join('data', 'jobs', 'queue.sqlite3'))
+    processes: int = int(os.getenv('SHARD_PROCESSES', os.cpu_count() or 1))
+    shard_size: int = int(os.getenv('SHARD_SIZE', 50))
+    lease_seconds: int = int(os.getenv('SHARD_LEASE_SECONDS', 600))
+    max_attempts: int = int(os.getenv('SHARD_MAX_ATTEMPTS', 3))
+    poll_interval: float = float(os.getenv('SHARD_POLL_INTERVAL', 5))
+    # 协调进程等待分片完成的最长秒数，0表示不限制
+    wait_timeout: float = float(os.getenv('SHARD_WAIT_TIMEOUT', 0))
+
+@dataclass
+class ExcelConfig:
+    """Excel存储配置类"""
+    # 财务数据写回方式：inplace 覆盖原文件，version 另存为新版本文件
+    financial_update_mode: str = os.getenv('EXCEL_FINANCIAL_UPDATE_MODE', 'inplace').lower()
+
+@dataclass
+class ParquetConfig:
+    """Parquet存储配置类"""
+    dataset_dir: str = os.getenv('PARQUET_DIR', os.path.join('data', 'dataset'))
+    row_group_size: int = int(os.getenv('PARQUET_ROW_GROUP_SIZE', 10000))
+    compression: str = os.getenv('PARQUET_COMPRESSION', 'snappy')
+
+@dataclass
+class MetricsConfig:
+    """运行指标配置类"""
+    enabled: bool = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    output_dir: str = os.getenv('METRICS_DIR', os.path.join('data', 'metrics'))
+    # 每次运行的汇总格式，逗号分隔：json、csv
+    formats: str = os.getenv('METRICS_FORMATS', 'json')
+    # Prometheus textfile 路径（供 node_exporter 的 textfile collector 读取），为空时不输出
+    prometheus_file: str = os.getenv('METRICS_PROMETHEUS_FILE', '')
 
 class StorageMode:
     """存储模式枚举"""
     EXCEL = 'excel'
     MYSQL = 'mysql'
+    PARQUET = 'parquet'
 
     @staticmethod
     def is_valid(mode: str) -> bool:
         """验证存储模式是否有效"""
-        return mode.lower() in [StorageMode.EXCEL, StorageMode.MYSQL]
+        return mode.lower() in [StorageMode.EXCEL, StorageMode.MYSQL, StorageMode.PARQUET]
 
 # 字段映射关系
 FIELD_MAPPING: Dict[str, str] = {
@@ -78,6 +183,14 @@ class Config:
     def __init__(self):
         self.api = APIConfig()
         self.db = DatabaseConfig()
+        self.scraper = ScraperConfig()
+        self.cache = CacheConfig()
+        self.rate_limit = RateLimitConfig()
+        self.search = SearchConfig()
+        self.shard = ShardConfig()
+        self.excel = ExcelConfig()
+        self.parquet = ParquetConfig()
+        self.metrics = MetricsConfig()
         self.storage_mode = os.getenv('STORAGE_MODE', StorageMode.EXCEL).lower()
         
         # 验证存储模式
@@ -111,6 +224,11 @@ class Config:
         """是否为Excel存储模式"""
         return self.storage_mode == StorageMode.EXCEL
 
+    @property
+    def is_parquet_mode(self) -> bool:
+        """是否为Parquet存储模式"""
+        return self.storage_mode == StorageMode.PARQUET
+
 # 创建全局配置实例
 config = Config()
 
@@ -0,0 +1,124 @@
+"""
+批量提取模块
+将多个精简后的网页合并到一次LLM请求中，直接调用 OPENAI_API_BASE 上兼容OpenAI的接口
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from src.config.settings import config
+from src.utils.concurrency import llm_slot
+from src.utils.fetcher import create_session
+from src.utils.metrics import incr, record_tokens, timer
+from src.utils.rate_limiter import call_with_retry
+from src.utils.url_filter import canonicalize_url
+from src.core.prompts import build_batch_prompt
+
+CODE_FENCE_RE = re.compile(r'^```(?:json)?\s*|\s*```$', re.IGNORECASE)
+
+_llm_session = None
+_llm_session_pid = None
+_llm_session_lock = threading.Lock()
+
+def get_llm_session():
+    """
+    获取进程内共享的LLM接口会话
+    与网页获取的会话分开，连接池大小与LLM并发数一致，LLM请求不会占用网页获取的连接；子进程中会重新创建
+    """
+    global _llm_session, _llm_session_pid
+    with _llm_session_lock:
+        if _llm_session is None or _llm_session_pid != os.getpid():
+            _llm_session = create_session(config.scraper.llm_concurrency)
+            _llm_session_pid = os.getpid()
+        return _llm_session
+
+def estimate_tokens(text):
+    """
+    粗略估算文本的token数（中文约1字1个token，英文约4字符1个token，这里取偏保守的折中）
+    :param text: 文本
+    :return: token数
+    """
+    return len(text) // 2 + 1
+
+def chat_completion(prompt):
+    """
+    调用兼容OpenAI的聊天补全接口
+    :param prompt: 提示词
+    :return: (回复内容, token用量字典)
+    """
+    model = config.api.model.split('/', 1)[-1] if config.api.model.startswith('openai/') else config.api.model
+    response = get_llm_session().post(
+        f"{config.api.base_url.rstrip('/')}/chat/completions",
+        headers={'Authorization': f"Bearer {config.api.api_key}"},
+        json={
+            'model': model,
+            'messages': [{'role': 'user', 'content': prompt}],
+            'temperature': config.api.temperature,
+            'max_tokens': config.api.max_tokens * config.scraper.llm_batch_max_pages,
+            'top_p': config.api.top_p,
+        },
+        timeout=config.api.request_timeout
+    )
+    response.raise_for_status()
+    data = response.json()
+    return data['choices'][0]['message']['content'], data.get('usage', {})
+
+def parse_batch_response(content, urls):
+    """
+    解析批量提取返回的JSON数组
+    按 url 字段对应网页；只有所有元素都不带 url 且数组长度与网页数相同时才按顺序对应，
+    否则丢弃对应不上的元素，这些网页退回逐个提取，避免把一个网页的数据记到另一个网页下
+    :param content: LLM回复内容
+    :param urls: 本批网页的网址列表
+    :return: {网址: 提取结果}
+    :raises ValueError: 回复不是JSON数组
+    """
+    text = CODE_FENCE_RE.sub('', content.strip())
+    start, end = text.find('['), text.rfind(']')
+    if start < 0 or end < start:
+        raise ValueError("返回内容中没有JSON数组")
+    items = json.loads(text[start:end + 1])
+    if not isinstance(items, list):
+        raise ValueError("返回内容不是JSON数组")
+
+    by_canonical = {canonicalize_url(url): url for url in urls}
+    results = {}
+    unmatched = []
+    has_urls = False
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        item_url = item.pop('url', None)
+        has_urls = has_urls or bool(item_url)
+        url = by_canonical.get(canonicalize_url(item_url)) if isinstance(item_url, str) and item_url else None
+        if url is not None and url not in results:
+            results[url] = item
+        else:
+            unmatched.append((position, item))
+
+    if not has_urls and len(unmatched) == len(items) == len(urls):
+        return {urls[position]: item for position, item in unmatched}
+    if unmatched:
+        logging.warning(f"批量提取结果中有 {len(unmatched)} 项无法对应网页，已丢弃")
+    return results
+
+def extract_batch(fields, pages):
+    """
+    在一次LLM请求中提取多个网页
+    :param fields: 需要提取的字段列表
+    :param pages: [(网址, 网页内容)]
+    :return: {网址: 提取结果}，未能对应的网页不在结果中
+    :raises Exception: 请求失败或返回内容无法解析
+    """
+    prompt = build_batch_prompt(fields, pages)
+    def run():
+        with llm_slot(), timer('llm'):
+            return chat_completion(prompt)
+
+    content, usage = call_with_retry('llm', run)
+    incr('llm_pages', len(pages))
+    record_tokens(usage)
+    logging.info(f"批量提取 {len(pages)} 个网页，token用量: {json.dumps(usage, ensure_ascii=False)}")
+    return parse_batch_response(content, [url for url, _ in pages])
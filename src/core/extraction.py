@@ -0,0 +1,96 @@
+"""
+LLM提取模块
+统一运行 SmartScraperGraph，并按网页内容、提示词和模型参数缓存提取结果
+"""
+
+import hashlib
+import json
+import logging
+from src.config.settings import config
+from src.utils.cache import get_cache
+from src.utils.concurrency import llm_slot
+from src.utils.metrics import incr, record_tokens, timer
+from src.utils.rate_limiter import call_with_retry
+
+def get_extraction_cache():
+    """获取进程内共享的提取结果缓存"""
+    return get_cache('extractions', ttl=config.cache.extraction_ttl, max_entries=config.cache.extraction_max_entries)
+
+def extraction_key(content, prompt):
+    """
+    计算提取结果的缓存键
+    :param content: 网页内容
+    :param prompt: 提示词
+    :return: 内容、提示词、模型和温度的SHA-256摘要
+    """
+    payload = json.dumps(
+        [content, prompt, config.api.model, config.api.temperature],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def get_cached_extraction(content, prompt):
+    """
+    读取缓存的提取结果
+    :return: 提取结果，未命中或未启用缓存时返回None
+    """
+    if not content or not config.cache.enabled:
+        return None
+    cached = get_extraction_cache().get(extraction_key(content, prompt))
+    return cached['result'] if cached is not None else None
+
+def set_cached_extraction(content, prompt, result):
+    """缓存提取结果"""
+    if content and result and config.cache.enabled:
+        get_extraction_cache().set(extraction_key(content, prompt), {'result': result})
+
+def get_token_usage(scraper):
+    """
+    读取 SmartScraperGraph 本次运行的token用量
+    :return: token用量字典，读取失败时返回None
+    """
+    try:
+        for info in scraper.get_execution_info() or []:
+            if info.get('node_name') == 'TOTAL RESULT':
+                return info
+    except Exception as e:
+        logging.debug(f"读取token用量失败: {str(e)}")
+    return None
+
+def run_extraction(prompt, url, html=None, cancel_event=None):
+    """
+    运行LLM提取
+    :param prompt: 提示词
+    :param url: 网址
+    :param html: 已获取的网页内容，为空时交给爬虫自行加载网址（此时不使用缓存）
+    :param cancel_event: 可选的 threading.Event，获取到LLM槽位时已被设置则放弃调用
+    :return: 提取结果，放弃调用时返回None
+    """
+    cached = get_cached_extraction(html, prompt)
+    if cached is not None:
+        return cached
+
+    # scrapegraphai 导入较慢，只在缓存未命中、需要调用LLM时导入
+    from scrapegraphai.graphs import SmartScraperGraph
+    scraper = SmartScraperGraph(
+        prompt=prompt,
+        source=html or url,
+        config=config.GRAPH_CONFIG
+    )
+
+    def run():
+        with llm_slot():
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            with timer('llm'):
+                return scraper.run()
+
+    # 按LLM接口限流，被限流或超时时退避重试
+    result = call_with_retry('llm', run)
+    if result is None:
+        return None
+    incr('llm_pages')
+    record_tokens(get_token_usage(scraper))
+
+    set_cached_extraction(html, prompt, result)
+    return result
@@ -1,95 +1,193 @@
+import json
 import logging
-import pandas as pd
-from googlesearch import search
-from scrapegraphai.graphs import SmartScraperGraph
-from src.config.settings import config, StorageMode
+import threading
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.config.settings import config
 from src.utils.storage_factory import StorageFactory
-from src.utils.db_handler import DatabaseHandler
+from src.utils.cache import cache_report
+from src.utils.rate_limiter import rate_limit_report
+from src.utils.fetcher import fetch_clean_page
+from src.utils.search_cache import cached_search
+from src.utils.metrics import incr, timed
+from src.utils.checkpoint import STATUS_DONE, STATUS_FAILED
+from src.core.extraction import run_extraction
 
-def enrich_financial_data(filename=None):
+# 财务数据提取提示词
+FINANCIAL_PROMPT = """
+请提取近三年的营业额信息，格式为：
+"2021: XXX; 2022: XXX; 2023: XXX"
+如果找不到完整的三年数据，返回能找到的年份数据。
+如果金额单位不统一，请统一转换为人民币（元）。
+请确保返回格式正确的字符串，不要包含其他内容。
+当前时间为2025年。
+"""
+
+def build_financial_query(company_name):
+    """构建财务信息搜索关键词"""
+    return f'"{company_name}" AND ("revenue" OR "sales" OR "turnover" OR "financial results") AND ("annual report" OR "financial report" OR "investor relations") -job -career -forum -blog'
+
+def extract_revenue(url, found=None):
     """
-    补充公司财务数据
-    :param filename: 可选的输入文件名，如果不指定则使用最新的搜索结果文件
-    :return: 存储结果
+    从单个网址提取营业额
+    :param url: 网址
+    :param found: 可选的 threading.Event，已被设置时说明同一公司已找到数据，跳过LLM调用
+    :return: 营业额字符串，未找到时返回None
+    :raises Exception: 获取网页或LLM提取失败
     """
-    logging.info("开始补充财务数据模式")
-    try:
-        # 根据存储模式获取数据
-        if config.storage_mode == StorageMode.MYSQL.lower():
-            db = DatabaseHandler()
-            data = db.get_all_companies()
-            if not data:
-                logging.error("从数据库获取数据失败")
-                return None
-        else:
-            # Excel模式
-            if filename is None:
-                logging.error("Excel模式下必须指定输入文件名")
-                return None
-            data = pd.read_excel(filename).to_dict('records')
-            
-        logging.info(f"成功读取数据，共有 {len(data)} 条记录")
-        
-        # 用于存储更新的财务数据
-        updated_data = {}
-        
-        for index, row in enumerate(data):
+    # 财务数据多在正文中，只去掉无关内容，不按区域筛选
+    html = fetch_clean_page(url, sections=False)
+    if found is not None and found.is_set():
+        return None
+
+    logging.info(f"正在从 {url} 提取财务数据")
+    result = run_extraction(FINANCIAL_PROMPT, url, html, cancel_event=found)
+
+    if result and isinstance(result, str) and ":" in result:
+        return result
+    return None
+
+@timed('enrich_company')
+def enrich_company(company_name, url_executor):
+    """
+    查找单个公司的营业额，候选网址并行提取，取到第一个有效结果后取消其余任务
+    :param company_name: 公司名称
+    :param url_executor: 用于提取网址的线程池
+    :return: 营业额字符串，未找到时返回None
+    :raises Exception: 搜索失败，或所有候选网址都提取失败（与"未找到"区分，由调用方记录为失败以便恢复时重试）
+    """
+    # 搜索相关财务信息，搜索失败时抛出异常，由调用方记录为失败
+    search_results = cached_search(build_financial_query(company_name), num=3, stop=3)
+    logging.info(f"{company_name}: 找到 {len(search_results)} 个相关结果")
+
+    found = threading.Event()
+    futures = [url_executor.submit(extract_revenue, url, found) for url in search_results]
+    revenue = None
+    errors = 0
+    for future in as_completed(futures):
+        try:
+            result = future.result()
+        except Exception as e:
+            logging.error(f"{company_name}: 处理URL时发生错误: {str(e)}")
+            errors += 1
+            continue
+        if result:
+            revenue = result
+            found.set()
+            # 取消尚未开始的任务，正在运行的任务会在调用LLM前检查 found 后退出
+            for pending in futures:
+                pending.cancel()
+            break
+    if revenue is None and futures and errors == len(futures):
+        raise RuntimeError(f"{len(futures)} 个候选网址全部提取失败")
+    return revenue
+
+def iter_pending_company_names(filename=None, companies=None, chunk_size=None):
+    """
+    流式读取需要补充财务数据的公司名称，同名公司只返回一次
+    :param filename: 输入文件名（仅Excel模式使用）
+    :param companies: 可选的公司名称列表，指定时只返回这些公司
+    :param chunk_size: 每次读取的行数，默认使用配置 ENRICH_CHUNK_SIZE
+    :return: 生成器，按首次出现的顺序产生公司名称
+    """
+    selected = set(companies) if companies is not None else None
+    seen = set()
+    for chunk in StorageFactory.iter_pending_companies(filename, chunk_size):
+        for row in chunk:
             company_name = row['公司名称']
-            if company_name == "未知" or pd.isna(company_name):
-                logging.warning(f"第 {index + 1} 行公司名称为空或未知，跳过")
-                continue
-                
-            current_revenue = row['近3年营业额']
-            if current_revenue != "未知" and not pd.isna(current_revenue):
-                logging.info(f"公司 {company_name} 已有财务数据，跳过")
+            if company_name in seen or (selected is not None and company_name not in selected):
                 continue
-                
-            logging.info(f"开始处理第 {index + 1} 行：{company_name}")
-            
-            # 构建搜索关键词
-            search_query = f'"{company_name}" AND ("revenue" OR "sales" OR "turnover" OR "financial results") AND ("annual report" OR "financial report" OR "investor relations") -job -career -forum -blog'
-            
+            seen.add(company_name)
+            yield company_name
+
+def iter_pending_company_chunks(filename=None, companies=None, chunk_size=None):
+    """
+    按批产生需要补充财务数据的公司名称，处理完一批再读取下一批，内存占用与输入规模无关
+    :param chunk_size: 每批的公司数，默认使用配置 ENRICH_CHUNK_SIZE；其他参数见 iter_pending_company_names
+    :return: 生成器，每次产生一个公司名称列表
+    """
+    chunk_size = chunk_size or config.scraper.enrich_chunk_size
+    names = iter_pending_company_names(filename, companies, chunk_size)
+    while True:
+        chunk = list(islice(names, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def enrich_companies(company_names, max_workers=None, job=None):
+    """
+    并发查找一组公司的营业额
+    :param company_names: 公司名称列表
+    :param max_workers: 同时处理的公司数，默认使用配置 ENRICH_MAX_WORKERS
+    :param job: 可选的任务检查点，记录每家公司的处理结果
+    :return: {公司名称: 营业额}，只包含找到数据的公司
+    """
+    max_workers = max_workers or config.scraper.enrich_workers
+    url_workers = max_workers * max(1, config.scraper.enrich_url_concurrency)
+    logging.info(f"共 {len(company_names)} 家公司需要补充财务数据，最大并发数: {max_workers}")
+
+    updated_data = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='enricher') as company_executor, \
+            ThreadPoolExecutor(max_workers=url_workers, thread_name_prefix='enricher-url') as url_executor:
+        futures = [
+            company_executor.submit(enrich_company, company_name, url_executor)
+            for company_name in company_names
+        ]
+
+        for company_name, future in zip(company_names, futures):
             try:
-                # 搜索相关财务信息
-                search_results = list(search(search_query, num=3, stop=3, pause=2))
-                logging.info(f"找到 {len(search_results)} 个相关结果")
-                
-                for url in search_results:
-                    try:
-                        # 创建爬虫实例
-                        prompt = """
-                        请提取近三年的营业额信息，格式为：
-                        "2021: XXX; 2022: XXX; 2023: XXX"
-                        如果找不到完整的三年数据，返回能找到的年份数据。
-                        如果金额单位不统一，请统一转换为人民币（元）。
-                        请确保返回格式正确的字符串，不要包含其他内容。
-                        当前时间为2025年。
-                        """
-                        
-                        scraper = SmartScraperGraph(
-                            prompt=prompt,
-                            source=url,
-                            config=config.GRAPH_CONFIG
-                        )
-                        
-                        logging.info(f"正在从 {url} 提取财务数据")
-                        result = scraper.run()
-                        
-                        if result and isinstance(result, str) and ":" in result:
-                            # 更新数据
-                            updated_data[company_name] = result
-                            row['近3年营业额'] = result
-                            logging.info(f"成功更新 {company_name} 的财务数据：{result}")
-                            break  # 找到数据后就停止搜索
-                            
-                    except Exception as e:
-                        logging.error(f"处理URL {url} 时发生错误: {str(e)}")
-                        continue
-                        
+                result = future.result()
             except Exception as e:
                 logging.error(f"搜索公司 {company_name} 财务信息时发生错误: {str(e)}")
+                incr('companies_failed')
+                if job is not None:
+                    job.mark(company_name, STATUS_FAILED)
                 continue
-        
+
+            if job is not None:
+                job.mark(company_name, STATUS_DONE, result)
+            incr('companies_enriched' if result else 'companies_not_found')
+            if not result:
+                continue
+            updated_data[company_name] = result
+            logging.info(f"成功更新 {company_name} 的财务数据：{result}")
+    return updated_data
+
+def enrich_financial_data(filename=None, max_workers=None, job=None, companies=None):
+    """
+    补充公司财务数据
+    :param filename: 可选的输入文件名，如果不指定则使用最新的搜索结果文件
+    :param max_workers: 同时处理的公司数，默认使用配置 ENRICH_MAX_WORKERS
+    :param job: 可选的任务检查点（JobCheckpoint），已完成的公司直接复用记录的结果
+    :param companies: 可选的公司名称列表，指定时只处理这些公司
+    :return: 存储结果，没有需要更新的公司时返回True，失败时返回None
+    """
+    logging.info("开始补充财务数据模式")
+    try:
+        # 用于存储更新的财务数据
+        updated_data = {}
+        total = resumed = 0
+
+        # 根据存储模式分块读取缺少营业额的公司，每批处理完成后再读取下一批
+        for pending in iter_pending_company_chunks(filename, companies):
+            total += len(pending)
+            if job is not None:
+                # 复用检查点中已完成公司的结果
+                done = [name for name in pending if job.is_done(name)]
+                for company_name in done:
+                    if job.results.get(company_name):
+                        updated_data[company_name] = job.results[company_name]
+                resumed += len(done)
+                pending = [name for name in pending if not job.is_done(name)]
+            updated_data.update(enrich_companies(pending, max_workers, job))
+
+        logging.info(f"共有 {total} 家公司缺少财务数据")
+        if resumed:
+            logging.info(f"从检查点恢复任务 {job.job_id}：已完成 {resumed} 家公司")
+
+        logging.info(f"缓存命中统计: {json.dumps(cache_report(), ensure_ascii=False)}")
+        logging.info(f"限流统计: {json.dumps(rate_limit_report(), ensure_ascii=False)}")
+
         # 保存更新后的数据
         if updated_data:
             storage_result = StorageFactory.update_financial_data(updated_data, filename)
@@ -100,8 +198,8 @@ def enrich_financial_data(filename=None):
             return storage_result
         else:
             logging.info("没有需要更新的财务数据")
-            return None
-        
+            return True
+
     except Exception as e:
         logging.error(f"处理数据时发生错误: {str(e)}")
-        return None 
\ No newline at end of file
+        return None
@@ -0,0 +1,107 @@
+"""
+提示词模块
+按需要提取的字段生成公司信息提取提示词
+"""
+
+from src.config.settings import FIELDS
+
+# 提示词中各字段的说明，按分组排列；社交媒体一条说明对应三个字段
+PROMPT_SECTIONS = [
+    ("公司基本信息", [
+        (("公司名称",), "公司名称：寻找完整的法定名称"),
+        (("公司网址",), "公司网址：查找官方网站URL"),
+        (("公司简介",), "公司简介：提取简短的业务描述（100-200字）"),
+        (("公司类型",), "公司类型：如私营、国企、上市公司等"),
+        (("成立时间",), "成立时间：优先查找精确日期（YYYY-MM-DD格式）"),
+        (("员工人数",), "员工人数：寻找最新数据"),
+    ]),
+    ("联系方式", [
+        (("公司邮箱",), "公司邮箱：查找官方联系邮箱"),
+        (("公司电话",), "公司电话：包含国际区号的完整号码"),
+        (("公司地址",), "公司地址：完整的实际办公地址"),
+        (("谷歌地图链接",), "谷歌地图链接：如果有的话"),
+    ]),
+    ("主要联系人信息", [
+        (("主要联系人姓名",), "姓名：优先找管理层或部门负责人"),
+        (("主要联系人职位",), "职位：准确的职务头衔"),
+        (("主要联系人邮箱",), "邮箱：个人工作邮箱"),
+        (("主要联系人电话",), "电话：直线或手机号码"),
+        (("主要联系人LinkedIn", "主要联系人Twitter", "主要联系人Facebook"), "社交媒体：LinkedIn/Twitter/Facebook链接"),
+    ]),
+    ("其他信息", [
+        (("国家/地区",), "国家/地区：公司总部所在地"),
+        (("近3年营业额",), "近3年营业额：按年份列出（如有）"),
+        (("备注",), "备注：任何其他重要信息"),
+    ]),
+]
+
+# 提取时的注意事项
+PROMPT_NOTES = """请注意：
+1. 如果某项信息未找到，填写"未知"
+2. 确保数据的准确性和完整性
+3. 优先提取官方信息源的数据
+4. 注意区分总部和分支机构信息
+5. 金额单位统一使用人民币（元）"""
+
+def build_field_hints(fields):
+    """
+    按分组生成字段说明
+    :param fields: 字段列表
+    :return: 字段说明文本
+    """
+    sections = []
+    for title, entries in PROMPT_SECTIONS:
+        hints = [hint for entry_fields, hint in entries if any(field in fields for field in entry_fields)]
+        if hints:
+            lines = '\n'.join(f"- {hint}" for hint in hints)
+            sections.append(f"{len(sections) + 1}. {title}：\n{lines}")
+    return '\n\n'.join(sections)
+
+def build_prompt(fields):
+    """
+    构建公司信息提取提示词，只包含需要LLM提取的字段
+    :param fields: 字段列表
+    :return: 提示词
+    """
+    return f"""
+请仔细分析网页内容，提取以下信息，以JSON格式返回。对于每个字段：
+
+{build_field_hints(fields)}
+
+{PROMPT_NOTES}
+
+请以标准JSON格式返回，包含以下字段：
+{', '.join(fields)}
+
+不要包含任何其他内容，只返回JSON数据。
+"""
+
+def build_batch_prompt(fields, pages):
+    """
+    构建多网页批量提取提示词
+    :param fields: 字段列表
+    :param pages: [(网址, 网页内容)]
+    :return: 提示词
+    """
+    contents = '\n\n'.join(
+        f"### 网页 {number}：{url}\n{page}" for number, (url, page) in enumerate(pages, 1)
+    )
+    return f"""
+下面是 {len(pages)} 个网页的内容，每个网页以"### 网页 N：网址"开头。请分别分析每个网页，提取以下信息。对于每个字段：
+
+{build_field_hints(fields)}
+
+{PROMPT_NOTES}
+6. 每个网页只使用该网页自身的内容，不要混用其他网页的信息
+
+请以标准JSON数组格式返回，数组中每个元素对应一个网页，顺序与网页编号一致，
+每个元素包含 "url" 字段（网页网址）以及以下字段：
+{', '.join(fields)}
+
+不要包含任何其他内容，只返回JSON数组。
+
+{contents}
+"""
+
+# 完整的公司信息提取提示词
+SCRAPE_PROMPT = build_prompt(FIELDS)
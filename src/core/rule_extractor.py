@@ -0,0 +1,94 @@
+"""
+规则提取模块
+用正则和链接解析直接从网页中提取邮箱、电话、地图和社交媒体链接等字段，
+这些字段不再交给LLM提取；公司网址只在网页明显是公司自己的网站时填充，目录、新闻、百科等网页交给LLM提取
+"""
+
+import re
+from urllib.parse import urlsplit, unquote
+from bs4 import BeautifulSoup
+from src.utils.url_filter import registrable_domain
+
+EMAIL_RE = re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}')
+PHONE_TEXT_RE = re.compile(
+    r'(?:\b(?:tel|phone|telephone|call)\b|电话|联系电话|手机)\s*[:：.]?\s*(\+?[\d(][\d\s().-]{6,}\d)',
+    re.IGNORECASE
+)
+MAPS_RE = re.compile(r'^https?://(?:(?:www\.)?google\.[a-z.]+/maps|maps\.google\.[a-z.]+|maps\.app\.goo\.gl|goo\.gl/maps)', re.IGNORECASE)
+LINKEDIN_PERSON_RE = re.compile(r'^https?://(?:[a-z]{2,3}\.)?linkedin\.com/in/', re.IGNORECASE)
+TWITTER_RE = re.compile(r'^https?://(?:www\.)?(?:twitter|x)\.com/(?!intent|share|home)[A-Za-z0-9_]+', re.IGNORECASE)
+FACEBOOK_RE = re.compile(r'^https?://(?:www\.|[a-z]{2}-[a-z]{2}\.)?facebook\.com/(?!sharer|share|dialog|plugins)[^/?#]+', re.IGNORECASE)
+
+# 看起来像邮箱但实际是图片等资源文件名
+NON_EMAIL_SUFFIXES = ('.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp')
+# 不作为公司邮箱的地址
+NON_CONTACT_EMAIL_PREFIXES = ('noreply', 'no-reply', 'donotreply', 'example')
+
+# 规则提取可以填充的字段
+RULE_FIELDS = (
+    "公司网址", "公司邮箱", "公司电话", "谷歌地图链接",
+    "主要联系人LinkedIn", "主要联系人Twitter", "主要联系人Facebook",
+)
+
+def _first(candidates):
+    """返回第一个非空候选值"""
+    for candidate in candidates:
+        if candidate:
+            return candidate
+    return None
+
+def _valid_email(email):
+    """过滤资源文件名和无效的联系邮箱"""
+    email = email.strip('.').lower()
+    return not email.endswith(NON_EMAIL_SUFFIXES) and not email.startswith(NON_CONTACT_EMAIL_PREFIXES)
+
+def extract_rule_fields(page, url):
+    """
+    用规则从网页中提取字段
+    :param page: 网页HTML（可以是精简后的内容）
+    :param url: 网页地址
+    :return: {字段名: 值}，只包含提取到的字段
+    """
+    soup = BeautifulSoup(page, 'html.parser')
+    hrefs = [a.get('href', '').strip() for a in soup.find_all('a', href=True)]
+    text = soup.get_text(' ', strip=True)
+    fields = {}
+
+    # 邮箱：优先使用 mailto 链接，其次从正文中匹配
+    mailto = [unquote(href[7:].split('?')[0]) for href in hrefs if href.lower().startswith('mailto:')]
+    emails = [email for email in mailto + EMAIL_RE.findall(text) if _valid_email(email)]
+    if emails:
+        fields["公司邮箱"] = emails[0]
+
+    # 公司网址：网页上的联系邮箱与网页同属一个域名时，网页是公司自己的网站，取站点根地址
+    parts = urlsplit(url)
+    if parts.scheme and parts.netloc:
+        domain = registrable_domain(url)
+        if any(registrable_domain(f"http://{email.rsplit('@', 1)[-1]}") == domain for email in emails):
+            fields["公司网址"] = f"{parts.scheme}://{parts.netloc}"
+
+    # 电话：优先使用 tel 链接，其次匹配"电话/Tel"等标签后的号码
+    phones = [unquote(href[4:]).strip() for href in hrefs if href.lower().startswith('tel:')]
+    phones += [match.strip() for match in PHONE_TEXT_RE.findall(text)]
+    phone = _first(phones)
+    if phone:
+        fields["公司电话"] = phone
+
+    maps_link = _first(href for href in hrefs if MAPS_RE.match(href))
+    if maps_link:
+        fields["谷歌地图链接"] = maps_link
+
+    # 只使用个人主页；公司主页不是联系人的主页，不填充该字段
+    linkedin = _first(href for href in hrefs if LINKEDIN_PERSON_RE.match(href))
+    if linkedin:
+        fields["主要联系人LinkedIn"] = linkedin
+
+    twitter = _first(href for href in hrefs if TWITTER_RE.match(href))
+    if twitter:
+        fields["主要联系人Twitter"] = twitter
+
+    facebook = _first(href for href in hrefs if FACEBOOK_RE.match(href))
+    if facebook:
+        fields["主要联系人Facebook"] = facebook
+
+    return fields
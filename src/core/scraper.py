@@ -1,110 +1,307 @@
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from googlesearch import search
-from scrapegraphai.graphs import SmartScraperGraph
+from functools import partial
 from src.config.settings import FIELDS, config
+from src.utils.records import CompanyRecord
 from src.utils.storage_factory import StorageFactory
+from src.utils.cache import cache_report
+from src.utils.rate_limiter import rate_limit_report
+from src.utils.concurrency import BatchDispatcher, chain, chain_batched
+from src.utils.metrics import gauge_add, incr, timed
+from src.utils.fetcher import fetch_clean_page
+from src.utils.search_cache import cached_search, search_many
+from src.utils.url_filter import KnownSourceIndex, filter_urls
+from src.utils.checkpoint import STATUS_DONE, STATUS_FAILED
+from src.core.extraction import run_extraction, get_cached_extraction, set_cached_extraction
+from src.core.batch_extractor import estimate_tokens, extract_batch
+from src.core.rule_extractor import extract_rule_fields
+from src.core.prompts import SCRAPE_PROMPT, build_prompt
 
-def search_and_scrape(keyword, num_results=None):
+# 搜索时每页的结果数
+SEARCH_PAGE_SIZE = 100
+
+@timed('validate')
+def finalize_result(url, result, rule_fields):
     """
-    搜索和爬取公司信息
+    合并规则提取的字段，添加数据来源和获取时间
+    缺失的字段保存为None，写入文件时再统一填充为"未知"
+    :param url: 网址
+    :param result: LLM提取结果
+    :param rule_fields: 规则提取的字段
+    :return: CompanyRecord，结果格式不正确时返回None
     """
-    results = []
-    storage_result = None
-    
-    logging.info(f"开始搜索关键词: {keyword}")
+    # 数据验证和清理
+    if not isinstance(result, dict):
+        logging.error(f"URL {url} 返回的数据格式不正确")
+        return None
+    record = CompanyRecord.from_dict(result)
+    record.update(rule_fields)
+
+    # 添加数据来源和获取时间
+    record['数据来源'] = url
+    record['数据获取时间'] = datetime.now().strftime('%Y-%m-%d')
+    return record
+
+@timed('rules')
+def get_rule_fields(url, page):
+    """
+    用规则提取邮箱、电话、链接等字段
+    :return: (规则提取的字段, 是否可以跳过LLM调用)
+    """
+    rule_fields = {}
+    if page and config.scraper.rule_extraction:
+        rule_fields = extract_rule_fields(page, url)
+    min_fields = config.scraper.rule_skip_min_fields
+    return rule_fields, bool(min_fields) and len(rule_fields) >= min_fields
+
+def llm_fields(rule_fields):
+    """规则未提取到、需要交给LLM的字段"""
+    return [field for field in FIELDS if field not in rule_fields]
+
+def extract_company(url, page, index=None, total=None):
+    """
+    从已获取的网页中提取公司信息（LLM提取阶段）
+    :param url: 网址
+    :param page: 精简后的网页内容，为None时交给爬虫自行加载网址
+    :param index: 当前序号（仅用于日志）
+    :param total: 总数（仅用于日志）
+    :return: 公司信息（CompanyRecord），失败时返回None
+    """
+    if index is not None:
+        logging.info(f"正在处理第 {index}/{total} 个网址: {url}")
     try:
-        search_results = list(search(
-            keyword, 
-            num=100,  # 每页结果数
-            stop=None if num_results is None else num_results,
-            pause=2
-        ))
-        logging.info(f"搜索到 {len(search_results)} 个结果")
-    except Exception as e:
-        logging.error(f"搜索过程发生错误: {str(e)}")
-        return results, None
-    
-    for index, url in enumerate(search_results, 1):
-        logging.info(f"正在处理第 {index}/{len(search_results)} 个网址: {url}")
-        try:
-            # 创建爬虫实例，优化提示词
-            prompt = f"""
-            请仔细分析网页内容，提取以下信息，以JSON格式返回。对于每个字段：
-
-            1. 公司基本信息：
-            - 公司名称：寻找完整的法定名称
-            - 公司网址：查找官方网站URL
-            - 公司简介：提取简短的业务描述（100-200字）
-            - 公司类型：如私营、国企、上市公司等
-            - 成立时间：优先查找精确日期（YYYY-MM-DD格式）
-            - 员工人数：寻找最新数据
-
-            2. 联系方式：
-            - 公司邮箱：查找官方联系邮箱
-            - 公司电话：包含国际区号的完整号码
-            - 公司地址：完整的实际办公地址
-            - 谷歌地图链接：如果有的话
-
-            3. 主要联系人信息：
-            - 姓名：优先找管理层或部门负责人
-            - 职位：准确的职务头衔
-            - 邮箱：个人工作邮箱
-            - 电话：直线或手机号码
-            - 社交媒体：LinkedIn/Twitter/Facebook链接
-
-            4. 其他信息：
-            - 国家/地区：公司总部所在地
-            - 近3年营业额：按年份列出（如有）
-            - 备注：任何其他重要信息
-
-            请注意：
-            1. 如果某项信息未找到，填写"未知"
-            2. 确保数据的准确性和完整性
-            3. 优先提取官方信息源的数据
-            4. 注意区分总部和分支机构信息
-            5. 金额单位统一使用人民币（元）
-
-            请以标准JSON格式返回，包含以下字段：
-            {', '.join(FIELDS)}
-            
-            不要包含任何其他内容，只返回JSON数据。
-            """
-            
-            scraper = SmartScraperGraph(
-                prompt=prompt,
-                source=url,
-                config=config.GRAPH_CONFIG
-            )
-            
+        # 先用规则提取邮箱、电话、链接等字段，剩余字段再交给LLM
+        rule_fields, skip_llm = get_rule_fields(url, page)
+        if skip_llm:
+            logging.info(f"规则已提取 {len(rule_fields)} 个字段，跳过LLM调用: {url}")
+            result = {}
+        else:
+            prompt = build_prompt(llm_fields(rule_fields)) if rule_fields else SCRAPE_PROMPT
+
             # 运行爬虫
             logging.info(f"开始爬取网址: {url}")
-            logging.info(f"发送给 GPT 的提示词: {prompt}")
-            result = scraper.run()
-            logging.info(f"GPT 返回结果: {json.dumps(result, ensure_ascii=False)}")
-            
-            # 数据验证和清理
-            if isinstance(result, dict):
-                # 确保所有字段都存在
-                for field in FIELDS:
-                    if field not in result or not result[field]:
-                        result[field] = "未知"
-                
-                # 添加数据来源和获取时间
-                result['数据来源'] = url
-                result['数据获取时间'] = datetime.now().strftime('%Y-%m-%d')
-                
-                results.append(result)
-                
-                # 每爬取一个网站就保存一次
-                logging.info(f"成功爬取网址: {url}")
-                storage_result = StorageFactory.save_data(result, task_type='search', is_append=True)
-            else:
-                logging.error(f"URL {url} 返回的数据格式不正确")
-            
+            logging.debug(f"发送给 GPT 的提示词: {prompt}")
+            result = run_extraction(prompt, url, page)
+            logging.debug(f"GPT 返回结果: {json.dumps(result, ensure_ascii=False)}")
+
+        result = finalize_result(url, result, rule_fields)
+        if result is not None:
+            logging.info(f"成功爬取网址: {url}")
+        return result
+
+    except Exception as e:
+        logging.error(f"爬取 {url} 时发生错误: {str(e)}")
+        return None
+
+def extract_company_batch(items):
+    """
+    在一次LLM请求中提取多个网页的公司信息（批量LLM提取阶段）
+    获取失败、批量请求失败或结果中缺少的网页退回逐个提取
+    :param items: [(网址, 精简后的网页内容, 序号, 总数)]
+    :return: 与 items 一一对应的 CompanyRecord 列表，失败的为None
+    """
+    results = [None] * len(items)
+    pending = []  # (位置, 网址, 网页内容, 规则字段, 单页提示词)
+    for position, (url, page, index, total) in enumerate(items):
+        if not page:
+            results[position] = extract_company(url, page, index, total)
+            continue
+        logging.info(f"正在处理第 {index}/{total} 个网址: {url}")
+        try:
+            rule_fields, skip_llm = get_rule_fields(url, page)
+            if skip_llm:
+                logging.info(f"规则已提取 {len(rule_fields)} 个字段，跳过LLM调用: {url}")
+                results[position] = finalize_result(url, {}, rule_fields)
+                continue
+            prompt = build_prompt(llm_fields(rule_fields)) if rule_fields else SCRAPE_PROMPT
+            cached = get_cached_extraction(page, prompt)
+            if cached is not None:
+                results[position] = finalize_result(url, cached, rule_fields)
+                continue
+            pending.append((position, url, page, rule_fields, prompt))
         except Exception as e:
             logging.error(f"爬取 {url} 时发生错误: {str(e)}")
-            continue
-    
-    return results, storage_result 
\ No newline at end of file
+
+    if len(pending) == 1:
+        # 只剩一个网页时直接单独提取
+        position, url, page, _, _ = pending[0]
+        results[position] = extract_company(url, page)
+    elif pending:
+        # 各网页规则提取到的字段不同，批量请求取所有网页需要字段的并集
+        needed = set()
+        for _, _, _, rule_fields, _ in pending:
+            needed.update(llm_fields(rule_fields))
+        fields = [field for field in FIELDS if field in needed]
+        try:
+            extracted = extract_batch(fields, [(url, page) for _, url, page, _, _ in pending])
+        except Exception as e:
+            logging.error(f"批量提取 {len(pending)} 个网页失败，改为逐个提取: {str(e)}")
+            extracted = {}
+
+        for position, url, page, rule_fields, prompt in pending:
+            result = extracted.get(url)
+            if not isinstance(result, dict):
+                results[position] = extract_company(url, page)
+                continue
+            result = {field: value for field, value in result.items() if field in FIELDS}
+            set_cached_extraction(page, prompt, dict(result))
+            results[position] = finalize_result(url, result, rule_fields)
+            logging.info(f"成功爬取网址: {url}")
+
+    return results
+
+def scrape_url(url, index=None, total=None):
+    """
+    爬取单个网址的公司信息（获取网页并提取）
+    :param url: 网址
+    :param index: 当前序号（仅用于日志）
+    :param total: 总数（仅用于日志）
+    :return: 公司信息（CompanyRecord），失败时返回None
+    """
+    return extract_company(url, fetch_clean_page(url), index, total)
+
+def prefetch_searches(keywords, num_results=None):
+    """
+    并发搜索多个关键词，结果交给 search_urls/search_and_scrape 使用
+    :param keywords: 关键词列表
+    :param num_results: 每个关键词的结果数量上限，None表示不限制
+    :return: {关键词: 网址列表}，搜索失败的关键词为None
+    """
+    logging.info(f"并发搜索 {len(keywords)} 个关键词")
+    return search_many(keywords, num=SEARCH_PAGE_SIZE, stop=num_results)
+
+def search_urls(keyword, num_results=None, known_index=None, prefetched=None):
+    """
+    搜索关键词并过滤出待爬取的网址
+    :param keyword: 搜索关键词
+    :param num_results: 结果数量上限，None表示不限制
+    :param known_index: 已保存数据来源的索引
+    :param prefetched: 可选的 prefetch_searches 结果，包含该关键词时不再重新搜索
+    :return: 网址列表，搜索失败时返回None
+    """
+    if prefetched is not None and keyword in prefetched:
+        search_results = prefetched[keyword]
+        if search_results is None:
+            return None
+    else:
+        logging.info(f"开始搜索关键词: {keyword}")
+        try:
+            search_results = cached_search(keyword, num=SEARCH_PAGE_SIZE, stop=num_results)
+        except Exception as e:
+            logging.error(f"搜索过程发生错误: {str(e)}")
+            return None
+    logging.info(f"关键词 {keyword} 搜索到 {len(search_results)} 个结果")
+
+    # 规范化去重，并跳过已保存过的网址
+    return filter_urls(search_results, known_index)
+
+def iter_scrape(urls, max_workers=None):
+    """
+    并发获取和提取一组网址，按输入顺序逐个返回结果
+    :param urls: 网址列表
+    :param max_workers: 同时进行提取的网址数，默认使用配置 SCRAPER_MAX_WORKERS
+    :return: 生成器，依次产生 (网址, CompanyRecord)，失败的结果为None
+    """
+    total = len(urls)
+    max_workers = max_workers or config.scraper.max_workers
+    fetch_workers = config.scraper.fetch_concurrency
+    logging.info(f"并发爬取 {total} 个网址，获取并发数: {fetch_workers}，提取并发数: {max_workers}")
+
+    batched = config.scraper.llm_batch_max_pages > 1
+
+    def dequeue(fn):
+        """提取开始时更新已获取、等待提取的网页数（extract_queue）"""
+        def wrapper(arg):
+            gauge_add('extract_queue', -(len(arg) if batched else 1))
+            return fn(arg)
+        return wrapper
+
+    # 获取网页和LLM提取分为两个阶段，获取阶段可以领先于较慢的提取阶段
+    with ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix='fetcher') as fetch_executor, \
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scraper') as extract_executor:
+        fetch_futures = [fetch_executor.submit(fetch_clean_page, url) for url in urls]
+        for fetch_future in fetch_futures:
+            fetch_future.add_done_callback(lambda _: gauge_add('extract_queue', 1))
+        if batched:
+            # 多个网页合并到一次LLM请求中，按网页数和估算的token数分批
+            dispatcher = BatchDispatcher(
+                extract_executor,
+                dequeue(extract_company_batch),
+                max_items=config.scraper.llm_batch_max_pages,
+                budget=config.scraper.llm_batch_token_budget,
+                weight=lambda item: estimate_tokens(item[1] or '')
+            )
+            futures = chain_batched(
+                fetch_futures,
+                dispatcher,
+                lambda position, page: (urls[position], page, position + 1, total)
+            )
+        else:
+            futures = [
+                chain(
+                    fetch_future,
+                    extract_executor,
+                    dequeue(partial(extract_company, url, index=index, total=total))
+                )
+                for index, (url, fetch_future) in enumerate(zip(urls, fetch_futures), 1)
+            ]
+
+        for url, future in zip(urls, futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                logging.error(f"爬取 {url} 时发生错误: {str(e)}")
+                result = None
+            incr('pages_succeeded' if result is not None else 'pages_failed')
+            yield url, result
+
+def search_and_scrape(keyword, num_results=None, max_workers=None, known_index=None, job=None, filename=None, prefetched=None):
+    """
+    搜索和爬取公司信息
+    :param keyword: 搜索关键词
+    :param num_results: 结果数量上限，None表示不限制
+    :param max_workers: 同时进行提取的网址数，默认使用配置 SCRAPER_MAX_WORKERS
+    :param known_index: 已保存数据来源的索引（KnownSourceIndex），多个关键词共用时传入，
+                        为None时从当前存储中加载
+    :param job: 可选的任务检查点（JobCheckpoint），已记录网址列表时只处理未完成的网址
+    :param filename: 输出文件名（仅Excel模式使用），恢复任务时追加到原文件
+    :param prefetched: 可选的 prefetch_searches 结果，包含该关键词时不再重新搜索
+    :return: (结果列表, 存储结果)
+    :raises RuntimeError: 搜索失败
+    """
+    results = []
+
+    if job is not None and job.items is not None:
+        search_results = job.pending_items()
+        logging.info(f"从检查点恢复任务 {job.job_id}：共 {len(job.items)} 个网址，剩余 {len(search_results)} 个")
+    else:
+        if known_index is None:
+            known_index = KnownSourceIndex.load()
+        search_results = search_urls(keyword, num_results, known_index, prefetched)
+        if search_results is None:
+            raise RuntimeError(f"关键词 {keyword} 搜索失败")
+        if job is not None:
+            job.set_items(search_results)
+
+    # 按搜索结果顺序依次保存，与逐个爬取时的输出顺序一致
+    with StorageFactory.open_writer(task_type='search', filename=filename) as writer:
+        for url, result in iter_scrape(search_results, max_workers):
+            if result is None:
+                if job is not None:
+                    job.mark(url, STATUS_FAILED)
+                continue
+
+            results.append(result)
+            if known_index is not None:
+                known_index.add(url)
+
+            # 每爬取一个网站就保存一次，保存成功后再记录检查点
+            if writer.write(result) and job is not None:
+                job.mark(url, STATUS_DONE)
+
+    storage_result = writer.result
+    logging.info(f"缓存命中统计: {json.dumps(cache_report(), ensure_ascii=False)}")
+    logging.info(f"限流统计: {json.dumps(rate_limit_report(), ensure_ascii=False)}")
+    return results, storage_result
@@ -0,0 +1,258 @@
+"""
+分片执行模块
+协调进程把网址或公司名称切分为分片写入工作队列，由本机的多个工作进程（以及其他节点上
+运行 worker 命令的进程）领取处理，全部完成后由协调进程统一通过 StorageFactory 合并保存
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from itertools import islice
+from src.config.settings import config
+from src.utils.storage_factory import StorageFactory
+from src.utils.metrics import write_run_summary
+from src.utils.url_filter import KnownSourceIndex
+from src.utils.work_queue import WorkQueue, SHARD_DONE, SHARD_FAILED
+from src.core.scraper import iter_scrape, prefetch_searches, search_urls
+from src.core.financial_enricher import iter_pending_company_names, enrich_companies
+
+def get_queue(path=None):
+    """打开工作队列，默认使用配置 WORK_QUEUE_PATH"""
+    return WorkQueue(path or config.shard.queue_path)
+
+def split_shards(items, shard_size=None):
+    """
+    按固定大小切分分片
+    :param items: 列表或迭代器，按需读取
+    :param shard_size: 每个分片的项数，默认使用配置 SHARD_SIZE
+    :return: 生成器，每次产生一个分片列表
+    """
+    shard_size = max(1, shard_size or config.shard.shard_size)
+    items = iter(items)
+    while True:
+        shard = list(islice(items, shard_size))
+        if not shard:
+            return
+        yield shard
+
+def plan_search_job(keywords, num_results=None, filename=None, shard_size=None, queue=None):
+    """
+    创建分片搜索任务
+    搜索在协调进程中进行（搜索接口需要统一限流），多个关键词并发搜索后依次过滤，去重后的网址切分为分片，
+    搜索失败的关键词记录在任务参数 failed_keywords 中
+    :param keywords: 关键词列表
+    :param num_results: 每个关键词的结果数量上限
+    :param filename: 输出文件名（仅Excel模式使用）
+    :param shard_size: 每个分片的网址数
+    :param queue: 工作队列
+    :return: 任务ID
+    """
+    queue = queue or get_queue()
+    known_index = KnownSourceIndex.load()
+    prefetched = prefetch_searches(keywords, num_results)
+    urls = []
+    failed_keywords = []
+    for keyword in keywords:
+        keyword_urls = search_urls(keyword, num_results, known_index, prefetched)
+        if keyword_urls is None:
+            failed_keywords.append(keyword)
+            continue
+        # 后续关键词按域名策略跳过已加入本任务的网址
+        for url in keyword_urls:
+            known_index.add(url)
+        urls.extend(keyword_urls)
+
+    params = {'keywords': keywords, 'num_results': num_results, 'filename': filename, 'failed_keywords': failed_keywords}
+    job_id = queue.create_job('search', params, split_shards(urls, shard_size))
+    logging.info(f"创建分片任务 {job_id}：{len(keywords)} 个关键词，{len(urls)} 个网址")
+    if failed_keywords:
+        logging.error(f"分片任务 {job_id} 有 {len(failed_keywords)} 个关键词搜索失败: {', '.join(failed_keywords)}")
+    return job_id
+
+def plan_enrich_job(filename=None, companies=None, shard_size=None, queue=None):
+    """
+    创建分片财务数据补充任务
+    :param filename: 输入文件名（仅Excel模式使用）
+    :param companies: 可选的公司名称列表，指定时只处理这些公司
+    :param shard_size: 每个分片的公司数
+    :param queue: 工作队列
+    :return: 任务ID，读取数据失败时返回None
+    """
+    queue = queue or get_queue()
+    try:
+        # 分片直接从流式读取的公司名称生成，不需要先读出全部公司
+        names = iter_pending_company_names(filename, companies)
+        job_id = queue.create_job('financial', {'filename': filename}, split_shards(names, shard_size))
+    except Exception as e:
+        logging.error(f"读取待补充的公司失败: {str(e)}")
+        return None
+    logging.info(f"创建分片任务 {job_id}：{sum(queue.progress(job_id).values())} 个分片")
+    return job_id
+
+def process_shard(kind, payload):
+    """
+    处理一个分片，结果写回队列，不直接写入存储
+    :param kind: 任务类型
+    :param payload: 分片内容（网址列表或公司名称列表）
+    :return: 搜索任务为公司信息行列表（按 FIELDS 顺序，比字典更紧凑），财务任务为 {公司名称: 营业额}
+    """
+    if kind == 'search':
+        return [result.values() for _, result in iter_scrape(payload) if result is not None]
+    return enrich_companies(payload)
+
+def run_worker(job_id, queue_path=None):
+    """
+    领取并处理分片，直到队列中没有可领取的分片
+    处理期间定期延长租约，异常退出时租约到期后分片会被其他工作进程重新领取
+    :param job_id: 任务ID
+    :param queue_path: 工作队列路径
+    :return: 处理完成的分片数
+    """
+    queue = get_queue(queue_path)
+    job = queue.get_job(job_id)
+    if job is None:
+        raise ValueError(f"分片任务 {job_id} 不存在")
+
+    worker = f"{socket.gethostname()}-{os.getpid()}"
+    lease = config.shard.lease_seconds
+    processed = 0
+    while True:
+        claimed = queue.claim(job_id, worker, lease, config.shard.max_attempts)
+        if claimed is None:
+            return processed
+        shard_no, payload = claimed
+        logging.info(f"{worker} 开始处理分片 {job_id}#{shard_no}（{len(payload)} 项）")
+
+        stop = threading.Event()
+
+        def heartbeat():
+            while not stop.wait(lease / 3):
+                queue.renew(job_id, shard_no, worker, lease)
+
+        renewer = threading.Thread(target=heartbeat, daemon=True)
+        renewer.start()
+        try:
+            result = process_shard(job['kind'], payload)
+        except Exception as e:
+            logging.error(f"处理分片 {job_id}#{shard_no} 时发生错误: {str(e)}")
+            queue.fail(job_id, shard_no, str(e), config.shard.max_attempts)
+            continue
+        finally:
+            stop.set()
+            renewer.join()
+
+        queue.complete(job_id, shard_no, result)
+        processed += 1
+        logging.info(f"{worker} 完成分片 {job_id}#{shard_no}")
+
+def _worker_process(job_id, queue_path=None, processes=1):
+    """
+    工作进程入口：处理分片，结束后输出本进程的运行指标
+    限流状态只在进程内共享，网页主机和LLM接口的速率按本机进程数平分，本机的总速率不超过 RATE_LIMIT_* 配置
+    """
+    config.rate_limit = replace(
+        config.rate_limit,
+        host_rate=config.rate_limit.host_rate / processes,
+        llm_rate=config.rate_limit.llm_rate / processes
+    )
+    try:
+        return run_worker(job_id, queue_path)
+    finally:
+        write_run_summary(f"worker_{job_id}", prometheus=False)
+
+def run_workers(job_id, processes=None, queue_path=None):
+    """
+    在本机启动多个工作进程处理分片
+    :param processes: 进程数，默认使用配置 SHARD_PROCESSES
+    :return: 各进程处理完成的分片数之和
+    """
+    processes = max(1, processes or config.shard.processes)
+    logging.info(f"启动 {processes} 个工作进程处理分片任务 {job_id}")
+    # 优先使用 fork 启动，工作进程继承命令行覆盖后的配置和日志设置；
+    # 连接池和缓存连接会在子进程中按进程号重新创建
+    context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+        futures = [executor.submit(_worker_process, job_id, queue_path, processes) for _ in range(processes)]
+        return sum(future.result() for future in futures)
+
+def wait_for_job(job_id, queue=None, processes=None, queue_path=None, timeout=None):
+    """
+    等待其他节点上仍在处理的分片完成
+    其他节点的工作进程异常退出后，租约到期的分片只有重新领取才会继续处理，此时在本机重新启动工作进程
+    :param processes: 重新启动的工作进程数，默认使用配置 SHARD_PROCESSES
+    :param queue_path: 工作队列路径
+    :param timeout: 最长等待秒数，默认使用配置 SHARD_WAIT_TIMEOUT，0表示不限制
+    :raises TimeoutError: 超时仍有分片未完成
+    """
+    queue = queue or get_queue(queue_path)
+    timeout = config.shard.wait_timeout if timeout is None else timeout
+    deadline = time.monotonic() + timeout if timeout else None
+    while not queue.is_finished(job_id):
+        if queue.has_claimable(job_id):
+            logging.warning(f"分片任务 {job_id} 有租约到期或未领取的分片，在本机重新处理")
+            run_workers(job_id, processes, queue_path)
+            continue
+        if deadline is not None and time.monotonic() >= deadline:
+            raise TimeoutError(
+                f"等待分片任务 {job_id} 超时: {json.dumps(queue.progress(job_id), ensure_ascii=False)}"
+            )
+        logging.info(f"等待分片任务 {job_id} 完成: {json.dumps(queue.progress(job_id), ensure_ascii=False)}")
+        time.sleep(config.shard.poll_interval)
+
+def merge_job(job_id, queue=None):
+    """
+    将已完成分片的结果通过 StorageFactory 合并保存，每个任务只合并一次
+    保存失败时不标记为已合并，可使用 shard-resume 重新合并
+    :return: 存储结果，没有需要保存的数据或已合并过时返回True，保存失败时返回None
+    """
+    queue = queue or get_queue()
+    job = queue.get_job(job_id)
+    if job['merged']:
+        logging.info(f"分片任务 {job_id} 的结果已合并，跳过")
+        return True
+
+    progress = queue.progress(job_id)
+    if progress.get(SHARD_FAILED):
+        logging.error(f"分片任务 {job_id} 有 {progress[SHARD_FAILED]} 个分片失败，只合并已完成的分片")
+
+    params = job['params']
+    if job['kind'] == 'search':
+        rows = 0
+        with StorageFactory.open_writer(task_type='search', filename=params.get('filename')) as writer:
+            for results in queue.results(job_id):
+                if results:
+                    writer.write(results)
+                    rows += len(results)
+        storage_result = writer.result if rows else True
+    else:
+        updated_data = {}
+        for results in queue.results(job_id):
+            updated_data.update(results)
+        if not updated_data:
+            logging.info("没有需要更新的财务数据")
+            storage_result = True
+        else:
+            storage_result = StorageFactory.update_financial_data(updated_data, params.get('filename'))
+
+    if not storage_result:
+        logging.error(f"分片任务 {job_id} 的结果保存失败，可使用 shard-resume {job_id} 重新合并")
+        return None
+    queue.mark_merged(job_id)
+    logging.info(f"分片任务 {job_id} 合并完成，已完成分片 {progress.get(SHARD_DONE, 0)} 个")
+    return storage_result
+
+def run_sharded_job(job_id, processes=None, queue_path=None):
+    """
+    协调进程：在本机处理分片，等待所有分片完成后合并结果
+    :return: 存储结果，参见 merge_job
+    """
+    queue = get_queue(queue_path)
+    run_workers(job_id, processes, queue_path)
+    wait_for_job(job_id, queue, processes, queue_path)
+    return merge_job(job_id, queue)
@@ -0,0 +1,145 @@
+"""
+持久化缓存模块
+基于SQLite的键值缓存，支持TTL过期和按最近访问时间淘汰
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from src.config.settings import config
+
+class SQLiteCache:
+    """SQLite键值缓存，值以JSON格式存储，可在多线程、多进程间共享同一文件"""
+
+    def __init__(self, path, table, ttl=None, max_entries=None):
+        """
+        :param path: SQLite文件路径
+        :param table: 表名，同一文件中的不同缓存使用不同的表
+        :param ttl: 过期秒数，None或0表示不过期
+        :param max_entries: 最大条目数，超出时淘汰最久未访问的条目，None或0表示不限制
+        """
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        """获取数据库连接，子进程中重新打开"""
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """)
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_accessed ON {self.table} (accessed_at)")
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key):
+        """
+        读取缓存
+        :param key: 键
+        :return: 缓存的值，不存在或已过期时返回None
+        """
+        try:
+            with self._lock:
+                conn = self._connection()
+                row = conn.execute(
+                    f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+                now = time.time()
+                if row is None or (self.ttl and now - row[1] > self.ttl):
+                    if row is not None:
+                        conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                    self.misses += 1
+                    return None
+                conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+                self.hits += 1
+                return json.loads(row[0])
+        except Exception as e:
+            logging.warning(f"读取缓存 {self.table} 失败: {str(e)}")
+            return None
+
+    def set(self, key, value):
+        """
+        写入缓存
+        :param key: 键
+        :param value: 可JSON序列化的值
+        """
+        try:
+            with self._lock:
+                conn = self._connection()
+                now = time.time()
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), now, now)
+                )
+                self._evict(conn, now)
+        except Exception as e:
+            logging.warning(f"写入缓存 {self.table} 失败: {str(e)}")
+
+    def _evict(self, conn, now):
+        """清理过期条目，并按最近访问时间淘汰超出上限的条目"""
+        if self.ttl:
+            conn.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (now - self.ttl,))
+        if self.max_entries:
+            count = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            if count > self.max_entries:
+                conn.execute(f"""
+                DELETE FROM {self.table} WHERE key IN (
+                    SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?
+                )
+                """, (count - self.max_entries,))
+
+    def stats(self):
+        """
+        获取命中统计
+        :return: {'hits': 命中数, 'misses': 未命中数, 'hit_rate': 命中率}
+        """
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_cache(name, ttl=None, max_entries=None):
+    """
+    获取进程内共享的命名缓存，所有缓存存放在配置 CACHE_PATH 指定的文件中
+    :param name: 缓存名称（即表名）
+    :param ttl: 过期秒数
+    :param max_entries: 最大条目数
+    :return: SQLiteCache
+    """
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = SQLiteCache(config.cache.path, name, ttl=ttl, max_entries=max_entries)
+        return _caches[name]
+
+def cache_report():
+    """
+    汇总本进程内各缓存的命中统计
+    :return: {缓存名称: 命中统计}
+    """
+    with _caches_lock:
+        return {name: cache.stats() for name, cache in _caches.items()}
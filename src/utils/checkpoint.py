@@ -0,0 +1,126 @@
+"""
+任务检查点模块
+以追加写入的JSONL文件记录任务参数、待处理列表和每一项的处理状态，
+任务中断后可根据记录从断点继续
+"""
+
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+
+JOBS_DIR = os.path.join("data", "jobs")
+
+# 处理状态
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+class JobCheckpoint:
+    """任务检查点"""
+
+    def __init__(self, job_id, job_type=None, params=None):
+        """
+        :param job_id: 任务ID
+        :param job_type: 任务类型（'search' 或 'financial'）
+        :param params: 任务参数，恢复任务时按原参数继续运行
+        """
+        self.job_id = job_id
+        self.job_type = job_type
+        self.params = params or {}
+        self.items = None
+        self.statuses = {}
+        self.results = {}
+        self.finished = False
+        self.path = os.path.join(JOBS_DIR, f"{job_id}.jsonl")
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, job_type, params=None):
+        """
+        创建新任务
+        :param job_type: 任务类型
+        :param params: 任务参数
+        :return: JobCheckpoint
+        """
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        job_id = f"{job_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        job = cls(job_id, job_type, params)
+        job._append({'event': 'meta', 'job_type': job_type, 'params': job.params,
+                     'created_at': datetime.now().isoformat(timespec='seconds')})
+        return job
+
+    @classmethod
+    def load(cls, job_id):
+        """
+        读取已有任务并回放其记录
+        :param job_id: 任务ID
+        :return: JobCheckpoint
+        """
+        job = cls(job_id)
+        if not os.path.exists(job.path):
+            raise FileNotFoundError(f"任务 {job_id} 的检查点文件不存在: {job.path}")
+
+        with open(job.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 中断时最后一行可能不完整
+                    continue
+                event = record.get('event')
+                if event == 'meta':
+                    job.job_type = record['job_type']
+                    job.params = record.get('params', {})
+                elif event == 'items':
+                    job.items = record['items']
+                elif event == 'status':
+                    job.statuses[record['item']] = record['status']
+                    if 'result' in record:
+                        job.results[record['item']] = record['result']
+                elif event == 'finished':
+                    job.finished = True
+        return job
+
+    def _append(self, record):
+        """追加一条记录并立即落盘"""
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    def set_items(self, items):
+        """
+        记录待处理列表（如搜索结果网址、待补充的公司名称）
+        :param items: 列表
+        """
+        self.items = list(items)
+        self._append({'event': 'items', 'items': self.items})
+
+    def mark(self, item, status, result=None):
+        """
+        记录单项的处理状态
+        :param item: 处理项
+        :param status: STATUS_DONE 或 STATUS_FAILED
+        :param result: 可选的处理结果，恢复任务时可直接复用
+        """
+        self.statuses[item] = status
+        record = {'event': 'status', 'item': item, 'status': status}
+        if result is not None:
+            self.results[item] = result
+            record['result'] = result
+        self._append(record)
+
+    def is_done(self, item):
+        """是否已处理完成"""
+        return self.statuses.get(item) == STATUS_DONE
+
+    def pending_items(self):
+        """未完成（未处理或处理失败）的项，保持原有顺序"""
+        return [item for item in (self.items or []) if not self.is_done(item)]
+
+    def finish(self):
+        """标记任务完成"""
+        self.finished = True
+        self._append({'event': 'finished', 'finished_at': datetime.now().isoformat(timespec='seconds')})
@@ -0,0 +1,175 @@
+"""
+并发控制模块
+为网页获取和LLM调用提供进程内共享的并发上限，以及多阶段流水线的衔接
+"""
+
+import threading
+from concurrent.futures import Future
+from src.config.settings import config
+from src.utils.metrics import gauge_add
+
+_semaphores = {}
+_lock = threading.Lock()
+
+def get_semaphore(name, limit):
+    """
+    获取指定名称的共享信号量，首次调用时按给定上限创建
+    :param name: 信号量名称
+    :param limit: 最大并发数
+    :return: threading.BoundedSemaphore
+    """
+    with _lock:
+        if name not in _semaphores:
+            _semaphores[name] = threading.BoundedSemaphore(max(1, limit))
+        return _semaphores[name]
+
+class Slot:
+    """并发槽位，记录等待中和占用中的数量（见 metrics 中的 <名称>_waiting/<名称>_active）"""
+
+    def __init__(self, name, semaphore):
+        self.name = name
+        self.semaphore = semaphore
+
+    def __enter__(self):
+        gauge_add(f"{self.name}_waiting", 1)
+        try:
+            self.semaphore.acquire()
+        finally:
+            gauge_add(f"{self.name}_waiting", -1)
+        gauge_add(f"{self.name}_active", 1)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        gauge_add(f"{self.name}_active", -1)
+        self.semaphore.release()
+        return False
+
+def fetch_slot():
+    """网页获取并发槽位"""
+    return Slot('fetch', get_semaphore('fetch', config.scraper.fetch_concurrency))
+
+def llm_slot():
+    """LLM调用并发槽位"""
+    return Slot('llm', get_semaphore('llm', config.scraper.llm_concurrency))
+
+def _forward(source, target):
+    """source 完成后把结果或异常转交给 target"""
+    def callback(done):
+        if done.cancelled():
+            target.cancel()
+        elif done.exception() is not None:
+            target.set_exception(done.exception())
+        else:
+            target.set_result(done.result())
+    source.add_done_callback(callback)
+
+def chain(future, executor, fn):
+    """
+    前一阶段完成后，将其结果交给下一阶段的线程池继续处理
+    :param future: 前一阶段的 Future
+    :param executor: 下一阶段的线程池
+    :param fn: 下一阶段的处理函数，参数为前一阶段的结果
+    :return: 代表下一阶段结果的 Future
+    """
+    result = Future()
+
+    def submit(done):
+        try:
+            _forward(executor.submit(fn, done.result()), result)
+        except BaseException as e:
+            result.set_exception(e)
+
+    future.add_done_callback(submit)
+    return result
+
+class BatchDispatcher:
+    """把逐个到达的任务按数量和权重预算分批，每批作为一个任务提交到线程池"""
+
+    def __init__(self, executor, fn, max_items, budget=None, weight=None):
+        """
+        :param executor: 执行批次的线程池
+        :param fn: 批处理函数，参数为任务列表，返回与之一一对应的结果列表
+        :param max_items: 每批最多任务数
+        :param budget: 每批的权重预算，None表示不限制
+        :param weight: 计算单个任务权重的函数
+        """
+        self.executor = executor
+        self.fn = fn
+        self.max_items = max(1, max_items)
+        self.budget = budget
+        self.weight = weight or (lambda item: 0)
+        self._pending = []
+        self._pending_weight = 0
+        self._lock = threading.Lock()
+
+    def add(self, item):
+        """
+        加入一个任务，达到批次上限时提交
+        :return: 代表该任务结果的 Future
+        """
+        future = Future()
+        item_weight = self.weight(item)
+        with self._lock:
+            if self._pending and self.budget and self._pending_weight + item_weight > self.budget:
+                self._submit()
+            self._pending.append((item, future))
+            self._pending_weight += item_weight
+            if len(self._pending) >= self.max_items:
+                self._submit()
+        return future
+
+    def flush(self):
+        """提交未满的批次"""
+        with self._lock:
+            if self._pending:
+                self._submit()
+
+    def _submit(self):
+        """提交当前批次（调用方需持有锁）"""
+        batch, self._pending, self._pending_weight = self._pending, [], 0
+        try:
+            self.executor.submit(self._run, batch)
+        except BaseException as e:
+            for _, future in batch:
+                future.set_exception(e)
+
+    def _run(self, batch):
+        """执行一个批次并分发结果"""
+        try:
+            results = self.fn([item for item, _ in batch])
+        except BaseException as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+def chain_batched(futures, dispatcher, make_item):
+    """
+    前一阶段的每个任务完成后加入批处理器，全部完成后提交剩余的批次
+    :param futures: 前一阶段的 Future 列表
+    :param dispatcher: BatchDispatcher
+    :param make_item: 根据序号和前一阶段结果生成批处理任务的函数
+    :return: 与 futures 一一对应的结果 Future 列表
+    """
+    results = [Future() for _ in futures]
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def make_callback(position):
+        def callback(done):
+            try:
+                _forward(dispatcher.add(make_item(position, done.result())), results[position])
+            except BaseException as e:
+                results[position].set_exception(e)
+            finally:
+                with lock:
+                    remaining[0] -= 1
+                    is_last = remaining[0] == 0
+                if is_last:
+                    dispatcher.flush()
+        return callback
+
+    for position, future in enumerate(futures):
+        future.add_done_callback(make_callback(position))
+    return results
@@ -1,7 +1,12 @@
 import logging
-import pymysql
-from datetime import datetime
-from src.config.settings import config, FIELDS, FIELD_MAPPING
+import pymysql.cursors
+from src.config.settings import config
+from src.utils.db_pool import get_pool
+from src.utils.normalizer import normalize_records
+from src.utils.records import DB_COLUMNS, FIELD_BY_COLUMN
+
+# 支持去重写入的字段（需要在表上建立对应的唯一索引）
+UPSERT_KEYS = ('company_name', 'company_website')
 
 class DatabaseHandler:
     def __init__(self):
@@ -11,109 +16,72 @@ class DatabaseHandler:
         self.cursor = None
 
     def connect(self):
-        """建立数据库连接"""
+        """从连接池获取数据库连接"""
         try:
-            self.conn = pymysql.connect(
-                host=self.db_config.host,
-                port=self.db_config.port,
-                user=self.db_config.user,
-                password=self.db_config.password,
-                database=self.db_config.database,
-                charset=self.db_config.charset
-            )
+            self.conn = get_pool().acquire()
             self.cursor = self.conn.cursor()
             return True
         except Exception as e:
             logging.error(f"数据库连接失败: {str(e)}")
             return False
 
-    def _process_field_value(self, field_name, value):
+    def _build_insert_sql(self, upsert_key=None):
         """
-        处理字段值，确保其符合数据库字段类型要求
-        :param field_name: 字段名（中文）
-        :param value: 字段值
-        :return: 处理后的值
+        构建插入语句
+        :param upsert_key: 去重字段（数据库字段名），指定时生成 INSERT ... ON DUPLICATE KEY UPDATE，
+                           已有记录只用非空的新值覆盖
+        :return: SQL语句
         """
-        db_field = FIELD_MAPPING.get(field_name)
-        
-        # 处理日期字段
-        if db_field == 'establish_time':
-            if value == "未知" or not value:
-                return None
-            try:
-                # 尝试解析日期
-                if isinstance(value, str):
-                    # 尝试多种日期格式
-                    date_formats = [
-                        '%Y-%m-%d',
-                        '%Y/%m/%d',
-                        '%Y年%m月%d日',
-                        '%Y.%m.%d',
-                        '%Y'  # 如果只有年份
-                    ]
-                    for date_format in date_formats:
-                        try:
-                            return datetime.strptime(value.strip(), date_format).strftime('%Y-%m-%d')
-                        except ValueError:
-                            continue
-                return None
-            except Exception:
-                return None
-        
-        # 处理数值字段（如员工人数）
-        elif db_field == 'employee_count':
-            if value == "未知" or not value:
-                return None
-            try:
-                # 移除可能的文本描述，只保留数字
-                value = ''.join(filter(str.isdigit, str(value)))
-                return int(value) if value else None
-            except ValueError:
-                return None
-        
-        # 其他字段
-        return value if value != "未知" else None
-
-    def save_data(self, data, task_type=None):
+        placeholders = ', '.join(['%s'] * len(DB_COLUMNS))
+        insert_sql = f"""
+        INSERT INTO {self.db_config.table}
+        ({', '.join(DB_COLUMNS)})
+        VALUES ({placeholders})
+        """
+
+        if upsert_key:
+            if upsert_key not in UPSERT_KEYS:
+                raise ValueError(f"无效的去重字段: {upsert_key}，可选值: {', '.join(UPSERT_KEYS)}")
+            updates = [
+                f"{db_field} = COALESCE(VALUES({db_field}), {db_field})"
+                for db_field in DB_COLUMNS if db_field != upsert_key
+            ]
+            updates.append("updated_at = CURRENT_TIMESTAMP")
+            insert_sql += f"ON DUPLICATE KEY UPDATE {', '.join(updates)}"
+
+        return insert_sql
+
+    def save_data(self, data, task_type=None, upsert_key=None, chunk_size=None):
         """
         保存数据到数据库
-        :param data: 字典或字典列表
+        :param data: 一条或多条数据（CompanyRecord、字典或按 FIELDS 顺序的序列），或 RecordBatch
         :param task_type: 任务类型（'search' 或 'financial'）
+        :param upsert_key: 去重字段（'company_name' 或 'company_website'），
+                           默认使用配置 MYSQL_UPSERT_KEY，传入空字符串表示直接插入
+        :param chunk_size: 每批写入的行数，默认使用配置 MYSQL_BATCH_SIZE
         :return: 是否保存成功
         """
         if not self.connect():
             return False
 
         try:
-            # 确保data是列表形式
-            if isinstance(data, dict):
-                data = [data]
-
-            for item in data:
-                # 确保所有字段都存在
-                for field in FIELDS:
-                    if field not in item or not item[field]:
-                        item[field] = "未知"
-
-                # 构建SQL语句
-                db_fields = [FIELD_MAPPING[field] for field in FIELDS]
-                placeholders = ', '.join(['%s'] * len(db_fields))
-                
-                insert_sql = f"""
-                INSERT INTO {self.db_config.table} 
-                ({', '.join(db_fields)}) 
-                VALUES ({placeholders})
-                """
-
-                # 处理并准备数据
-                values = [self._process_field_value(field, item.get(field, "未知")) for field in FIELDS]
-
-                # 执行SQL
-                self.cursor.execute(insert_sql, values)
+            if upsert_key is None:
+                upsert_key = self.db_config.upsert_key
+            chunk_size = max(1, chunk_size or self.db_config.batch_size)
+
+            # SQL语句只构建一次
+            insert_sql = self._build_insert_sql(upsert_key)
+
+            # 整批规范化字段值，缺失、为空或无法解析的字段写入NULL
+            rows = normalize_records(data).values.tolist()
+
+            # 分批执行，pymysql 会将 executemany 合并为多行 VALUES
+            for start in range(0, len(rows), chunk_size):
+                self.cursor.executemany(insert_sql, rows[start:start + chunk_size])
 
             # 提交事务
             self.conn.commit()
-            logging.info(f"成功保存 {len(data)} 条数据到数据库")
+            logging.info(f"成功保存 {len(rows)} 条数据到数据库")
             return True
 
         except Exception as e:
@@ -161,6 +129,109 @@ class DatabaseHandler:
         finally:
             self.close()
 
+    def bulk_update_financial_data(self, updates, chunk_size=None):
+        """
+        在一个事务中批量更新公司财务数据
+        :param updates: {公司名称: 财务数据}
+        :param chunk_size: 每批处理的公司数，默认使用配置 MYSQL_BATCH_SIZE
+        :return: {公司名称: 匹配的记录数}，失败时返回None
+        """
+        if not updates:
+            return {}
+        if not self.connect():
+            return None
+
+        try:
+            chunk_size = max(1, chunk_size or self.db_config.batch_size)
+            names = list(updates)
+            match_counts = dict.fromkeys(names, 0)
+            # 数据库比较忽略大小写和尾部空格，返回的名称按同样规则对应回输入
+            lookup = {name.strip().lower(): name for name in names}
+
+            # 统计每个公司匹配的记录数
+            for start in range(0, len(names), chunk_size):
+                chunk = names[start:start + chunk_size]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                self.cursor.execute(f"""
+                SELECT company_name, COUNT(*) FROM {self.db_config.table}
+                WHERE company_name IN ({placeholders})
+                GROUP BY company_name
+                """, chunk)
+                for company_name, count in self.cursor.fetchall():
+                    key = company_name if company_name in match_counts else lookup.get(company_name.strip().lower())
+                    if key is not None:
+                        match_counts[key] += count
+
+            update_sql = f"""
+            UPDATE {self.db_config.table}
+            SET revenue_3years = %s,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE company_name = %s
+            """
+            rows = [(updates[name], name) for name in names if match_counts[name]]
+            for start in range(0, len(rows), chunk_size):
+                self.cursor.executemany(update_sql, rows[start:start + chunk_size])
+
+            self.conn.commit()
+
+            missing = [name for name in names if not match_counts[name]]
+            logging.info(f"成功更新 {len(rows)} 家公司的财务数据，共 {sum(match_counts.values())} 条记录")
+            if missing:
+                logging.warning(f"未找到 {len(missing)} 家公司的记录: {', '.join(missing)}")
+            return match_counts
+
+        except Exception as e:
+            logging.error(f"批量更新财务数据失败: {str(e)}")
+            self.conn.rollback()
+            return None
+
+        finally:
+            self.close()
+
+    def get_data_sources(self):
+        """
+        获取所有已保存的数据来源网址
+        :return: 网址列表
+        """
+        if not self.connect():
+            return []
+
+        try:
+            self.cursor.execute(f"SELECT data_source FROM {self.db_config.table} WHERE data_source IS NOT NULL")
+            return [row[0] for row in self.cursor.fetchall()]
+
+        except Exception as e:
+            logging.error(f"获取数据来源失败: {str(e)}")
+            return []
+
+        finally:
+            self.close()
+
+    def iter_pending_companies(self, chunk_size=None):
+        """
+        使用服务端游标分块读取缺少营业额的公司，筛选条件在查询中完成
+        :param chunk_size: 每块的行数，默认使用配置 ENRICH_CHUNK_SIZE
+        :return: 生成器，每次产生一个 [{'公司名称', '近3年营业额'}] 列表
+        :raises Exception: 连接或查询失败
+        """
+        chunk_size = chunk_size or config.scraper.enrich_chunk_size
+        self.conn = get_pool().acquire()
+        try:
+            # 服务端游标逐块从服务器读取结果，不会一次性加载整个结果集
+            self.cursor = self.conn.cursor(pymysql.cursors.SSCursor)
+            self.cursor.execute(f"""
+            SELECT company_name, revenue_3years FROM {self.db_config.table}
+            WHERE company_name IS NOT NULL AND company_name NOT IN ('', '未知')
+              AND (revenue_3years IS NULL OR revenue_3years IN ('', '未知'))
+            """)
+            while True:
+                rows = self.cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield [{'公司名称': name, '近3年营业额': revenue} for name, revenue in rows]
+        finally:
+            self.close()
+
     def get_all_companies(self):
         """
         获取所有公司数据
@@ -171,24 +242,9 @@ class DatabaseHandler:
 
         try:
             self.cursor.execute(f"SELECT * FROM {self.db_config.table}")
-            columns = [col[0] for col in self.cursor.description]
-            results = []
-            
-            # 反向映射字段名
-            reverse_mapping = {v: k for k, v in FIELD_MAPPING.items()}
-            
-            for row in self.cursor.fetchall():
-                row_dict = dict(zip(columns, row))
-                # 转换字段名为中文
-                converted_dict = {}
-                for key, value in row_dict.items():
-                    if key in reverse_mapping:
-                        converted_dict[reverse_mapping[key]] = value
-                    else:
-                        converted_dict[key] = value
-                results.append(converted_dict)
-            
-            return results
+            # 字段名转换为中文，每次查询只按列转换一次，其他列（如 id）保留原名
+            columns = [FIELD_BY_COLUMN.get(col[0], col[0]) for col in self.cursor.description]
+            return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
 
         except Exception as e:
             logging.error(f"获取公司数据失败: {str(e)}")
@@ -198,8 +254,10 @@ class DatabaseHandler:
             self.close()
 
     def close(self):
-        """关闭数据库连接"""
+        """释放数据库连接，连接归还到连接池"""
         if self.cursor:
             self.cursor.close()
+            self.cursor = None
         if self.conn:
-            self.conn.close() 
\ No newline at end of file
+            get_pool().release(self.conn)
+            self.conn = None
@@ -0,0 +1,147 @@
+"""
+数据库连接池模块
+在进程内复用 pymysql 连接，支持健康检查和过期重连
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+import pymysql
+from src.config.settings import config
+
+class PoolExhaustedError(Exception):
+    """连接池在等待时间内没有可用连接"""
+
+class ConnectionPool:
+    """线程安全的 pymysql 连接池"""
+
+    def __init__(self, db_config, size=5, recycle=3600, ping_interval=30, timeout=30):
+        """
+        :param db_config: 数据库配置（DatabaseConfig）
+        :param size: 最大连接数
+        :param recycle: 连接最长存活秒数，超过后关闭重建
+        :param ping_interval: 连接空闲超过该秒数时，取出前先做健康检查
+        :param timeout: 等待可用连接的最长秒数
+        """
+        self.db_config = db_config
+        self.size = max(1, size)
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._created_at = {}
+        self._lock = threading.Lock()
+
+    def _create(self):
+        """新建数据库连接"""
+        conn = pymysql.connect(
+            host=self.db_config.host,
+            port=self.db_config.port,
+            user=self.db_config.user,
+            password=self.db_config.password,
+            database=self.db_config.database,
+            charset=self.db_config.charset
+        )
+        with self._lock:
+            self._created_at[conn] = time.monotonic()
+        return conn
+
+    def _discard(self, conn):
+        """关闭并丢弃连接"""
+        with self._lock:
+            self._created_at.pop(conn, None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        """
+        取出一个可用连接，没有空闲连接时新建
+        :return: pymysql 连接
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolExhaustedError(f"等待数据库连接超时（{self.timeout}秒），连接池大小: {self.size}")
+        try:
+            while True:
+                try:
+                    conn, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._create()
+
+                now = time.monotonic()
+                with self._lock:
+                    created_at = self._created_at.get(conn, now)
+                if self.recycle and now - created_at > self.recycle:
+                    self._discard(conn)
+                    continue
+                if now - last_used > self.ping_interval:
+                    try:
+                        conn.ping(reconnect=True)
+                    except Exception as e:
+                        logging.warning(f"数据库连接健康检查失败，重新建立连接: {str(e)}")
+                        self._discard(conn)
+                        continue
+                return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn):
+        """
+        归还连接，先回滚未提交的事务，避免下一个使用者继承未结束的事务和锁；已断开或回滚失败的连接直接丢弃
+        :param conn: 通过 acquire 取出的连接
+        """
+        try:
+            if conn.open:
+                conn.rollback()
+                self._idle.put((conn, time.monotonic()))
+            else:
+                self._discard(conn)
+        except Exception as e:
+            logging.warning(f"归还数据库连接时回滚失败，丢弃该连接: {str(e)}")
+            self._discard(conn)
+        finally:
+            self._slots.release()
+
+    def close_all(self):
+        """关闭所有空闲连接"""
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """
+    获取进程内共享的连接池
+    子进程中会重新创建连接池，避免与父进程共用连接
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ConnectionPool(
+                config.db,
+                size=config.db.pool_size,
+                recycle=config.db.pool_recycle,
+                ping_interval=config.db.pool_ping_interval,
+                timeout=config.db.pool_timeout
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+@atexit.register
+def close_pool():
+    """进程退出时关闭本进程创建的连接池中的空闲连接，不关闭从父进程继承的连接"""
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.close_all()
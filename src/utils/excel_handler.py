@@ -1,8 +1,16 @@
+import csv
 import os
 import pandas as pd
+try:
+    import fcntl
+except ImportError:  # Windows 没有 fcntl，不做进程间锁定
+    fcntl = None
 import logging
 from datetime import datetime
-from src.config.settings import FIELDS
+from src.config.settings import config, FIELDS
+from src.utils.metrics import timed
+from src.utils.normalizer import normalize_frame, normalize_records
+from src.utils.records import MISSING_TEXT, MISSING_VALUES, RecordBatch
 
 def get_output_filepath(task_type=None, filename=None):
     """
@@ -41,16 +49,8 @@ def save_to_excel(data, task_type=None, filename=None, is_append=False):
         # 获取完整的文件路径
         filepath = get_output_filepath(task_type, filename)
         
-        # 创建新的 DataFrame
-        new_df = pd.DataFrame([data] if isinstance(data, dict) else data)
-        
-        # 确保所有字段都存在
-        for field in FIELDS:
-            if field not in new_df.columns:
-                new_df[field] = "未知"
-        
-        # 重排列顺序
-        new_df = new_df[FIELDS]
+        # 创建新的 DataFrame，整批规范化字段值，缺失的字段按"未知"处理
+        new_df = normalize_records(data, missing=MISSING_TEXT, keep_unparsed=True)
         
         if is_append and os.path.exists(filepath):
             # 如果文件存在且需要追加，则读取现有文件并追加
@@ -67,4 +67,263 @@ def save_to_excel(data, task_type=None, filename=None, is_append=False):
         
     except Exception as e:
         logging.error(f"保存Excel时发生错误: {str(e)}")
-        return None 
\ No newline at end of file
+        return None 
+
+class ExcelAppendWriter:
+    """
+    Excel增量写入器
+    运行期间每条数据追加写入CSV日志文件并立即落盘，结束时一次性生成xlsx文件，
+    避免每保存一行都重新读写整个工作簿
+    """
+
+    def __init__(self, task_type=None, filename=None):
+        """
+        :param task_type: 任务类型（'search' 或 'financial'）
+        :param filename: 可选的指定文件名，文件已存在时追加到其末尾
+        """
+        self.filepath = get_output_filepath(task_type, filename)
+        self.journal_path = get_journal_path(self.filepath)
+        self.row_count = 0
+        self.result = None
+        self._file = None
+        self._writer = None
+
+    def _open(self):
+        """打开并锁定CSV日志文件，已有日志（如上次运行中断）时继续追加"""
+        self._file = open_journal(self.journal_path)
+        self._writer = csv.writer(self._file)
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._writer.writerow(FIELDS)
+            self._flush()
+
+    def _flush(self):
+        """将缓冲区写入磁盘"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    @timed('storage')
+    def write(self, data):
+        """
+        追加数据
+        :param data: 一条或多条数据（CompanyRecord、字典或按 FIELDS 顺序的序列），或 RecordBatch
+        :return: 是否写入成功
+        """
+        try:
+            if self._file is None:
+                self._open()
+            rows = RecordBatch.from_records(data).rows(missing=MISSING_TEXT)
+            self._writer.writerows(rows)
+            self._flush()
+            self.row_count += len(rows)
+            return True
+        except Exception as e:
+            logging.error(f"写入Excel日志文件时发生错误: {str(e)}")
+            return False
+
+    @timed('storage')
+    def close(self):
+        """
+        关闭日志文件并生成最终的xlsx文件
+        :return: xlsx文件路径，没有写入任何数据时返回None
+        """
+        if self._file is None:
+            return self.result
+        if fcntl is None:
+            # 没有文件锁时先关闭（Windows 无法删除打开的文件）
+            self._file.close()
+            self._file = None
+        try:
+            # 持有日志文件锁完成合并，其他进程不会同时把它当作遗留日志恢复
+            self.result = self._finalize()
+        finally:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        if self.result:
+            logging.info(f"共写入 {self.row_count} 条数据，已保存到 {self.result}")
+        return self.result
+
+    def _finalize(self):
+        """将日志文件合并到最终文件"""
+        return finalize_journal(self.journal_path, self.filepath)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+def _write_atomic(df, filepath):
+    """先写入临时文件再替换目标文件，写入失败时目标文件保持不变"""
+    tmp_path = os.path.splitext(filepath)[0] + '.tmp.xlsx'
+    try:
+        df.to_excel(tmp_path, index=False)
+        os.replace(tmp_path, filepath)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def get_version_path(filepath):
+    """生成源文件的新版本路径：<原文件名>_financial_YYYYMMDD_HHMMSS.xlsx"""
+    stem = os.path.splitext(filepath)[0]
+    return f"{stem}_financial_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+
+def merge_financial_updates(source_path, updates, mode=None):
+    """
+    将财务数据合并回源Excel文件
+    读取一次源文件，以公司名称为索引一次性更新所有匹配行的"近3年营业额"，再整体写回
+    :param source_path: 源Excel文件路径
+    :param updates: {公司名称: 营业额}
+    :param mode: 'inplace' 覆盖源文件，'version' 另存为新版本，默认使用配置 EXCEL_FINANCIAL_UPDATE_MODE
+    :return: 写入的文件路径，失败时返回None
+    """
+    mode = mode or config.excel.financial_update_mode
+    try:
+        df = pd.read_excel(source_path, dtype=object)
+        revenue = df['公司名称'].map(pd.Series(updates, dtype=object))
+        matched = revenue.notna()
+        df.loc[matched, '近3年营业额'] = revenue[matched]
+
+        unmatched = set(updates) - set(df.loc[matched, '公司名称'])
+        if unmatched:
+            logging.warning(f"{len(unmatched)} 家公司在 {source_path} 中未找到: {', '.join(sorted(map(str, unmatched))[:10])}")
+
+        filepath = source_path if mode == 'inplace' else get_version_path(source_path)
+        _write_atomic(df, filepath)
+        logging.info(f"已更新 {int(matched.sum())} 行财务数据，保存到 {filepath}")
+        return filepath
+
+    except Exception as e:
+        logging.error(f"合并财务数据到 {source_path} 时发生错误: {str(e)}")
+        return None
+
+def get_journal_path(filepath):
+    """获取xlsx文件对应的CSV日志文件路径"""
+    return os.path.splitext(filepath)[0] + '.journal.csv'
+
+def open_journal(path):
+    """
+    以追加方式打开日志文件并加排他锁，写入器关闭前一直持有，表示日志仍在写入
+    加锁前文件可能已被其他进程恢复并删除，此时重新创建
+    :param path: 日志文件路径
+    :return: 文件对象
+    """
+    while True:
+        file = open(path, 'a', newline='', encoding='utf-8-sig')
+        if fcntl is None:
+            return file
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        try:
+            if os.path.samestat(os.fstat(file.fileno()), os.stat(path)):
+                return file
+        except FileNotFoundError:
+            pass
+        file.close()
+
+def lock_orphan_journal(path):
+    """
+    锁定遗留的日志文件，仍有进程在写入（持有锁）或文件已被处理时返回None
+    :param path: 日志文件路径
+    :return: 已加锁的文件对象，处理完成后由调用方关闭以释放锁
+    """
+    try:
+        file = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+    if fcntl is None:
+        return file
+    try:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        if os.path.samestat(os.fstat(file.fileno()), os.stat(path)):
+            return file
+    except (BlockingIOError, FileNotFoundError):
+        pass
+    file.close()
+    return None
+
+def finalize_journal(journal_path, filepath):
+    """
+    将CSV日志文件合并到xlsx文件中
+    新文件先写入临时文件再替换，合并成功后删除日志文件；
+    失败时保留日志文件，数据不会丢失
+    :param journal_path: CSV日志文件路径
+    :param filepath: 目标xlsx文件路径
+    :return: xlsx文件路径，失败时返回None
+    """
+    try:
+        new_df = normalize_frame(
+            pd.read_csv(journal_path, dtype=str, keep_default_na=False, encoding='utf-8-sig'),
+            missing=MISSING_TEXT, keep_unparsed=True
+        )
+        if os.path.exists(filepath):
+            existing_df = pd.read_excel(filepath)
+            new_df = pd.concat([existing_df, new_df], ignore_index=True)
+
+        _write_atomic(new_df, filepath)
+        os.remove(journal_path)
+        return filepath
+
+    except Exception as e:
+        logging.error(f"生成Excel文件时发生错误，数据保留在 {journal_path}: {str(e)}")
+        return None
+
+def recover_journals(output_dir=os.path.join("data", "output")):
+    """
+    合并异常中断后遗留的CSV日志文件，跳过其他进程仍在写入的日志
+    :param output_dir: 输出目录
+    :return: 成功恢复的xlsx文件路径列表
+    """
+    recovered = []
+    if not os.path.isdir(output_dir):
+        return recovered
+    for name in sorted(os.listdir(output_dir)):
+        if name.endswith('.journal.csv'):
+            journal_path = os.path.join(output_dir, name)
+            filepath = journal_path[:-len('.journal.csv')] + '.xlsx'
+            lock = lock_orphan_journal(journal_path)
+            if lock is None:
+                continue
+            try:
+                if finalize_journal(journal_path, filepath):
+                    logging.info(f"已从中断的日志恢复数据到 {filepath}")
+                    recovered.append(filepath)
+            finally:
+                lock.close()
+    return recovered
+
+def is_missing(value):
+    """单元格是否为空（None、NaN、空字符串）或为"未知"，按缺失处理"""
+    return value is None or pd.isna(value) or str(value).strip() in MISSING_VALUES
+
+def iter_pending_companies(filename, chunk_size=1000):
+    """
+    以只读模式逐行读取Excel文件，按块返回缺少营业额的公司，不把整个工作簿加载为DataFrame
+    :param filename: Excel文件路径
+    :param chunk_size: 每块的行数
+    :return: 生成器，每次产生一个 [{'公司名称', '近3年营业额'}] 列表
+    """
+    from openpyxl import load_workbook
+    workbook = load_workbook(filename, read_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        name_index = header.index('公司名称')
+        revenue_index = header.index('近3年营业额')
+
+        chunk = []
+        for row in rows:
+            name, revenue = row[name_index], row[revenue_index]
+            if is_missing(name) or not is_missing(revenue):
+                continue
+            chunk.append({'公司名称': name, '近3年营业额': revenue})
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        workbook.close()
@@ -0,0 +1,135 @@
+"""
+网页获取模块
+使用共享的 requests 会话获取网页内容，复用连接，并按网址缓存网页内容
+"""
+
+import logging
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from src.config.settings import config
+from src.utils.cache import get_cache
+from src.utils.concurrency import fetch_slot
+from src.utils.html_cleaner import clean_html
+from src.utils.metrics import timer
+from src.utils.rate_limiter import call_with_retry, host_endpoint
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+}
+
+# 同时保持连接的主机数
+FETCH_POOL_HOSTS = 100
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+def create_session(pool_size, pool_hosts=1, headers=None):
+    """
+    创建使用长连接池的HTTP会话
+    :param pool_size: 每个主机的最大连接数，应不小于同时使用该会话的线程数
+    :param pool_hosts: 同时保持连接池的主机数
+    :param headers: 默认请求头
+    :return: requests.Session
+    """
+    adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=max(1, pool_size))
+    session = requests.Session()
+    if headers:
+        session.headers.update(headers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def get_session():
+    """
+    获取进程内共享的网页获取会话，连接池大小与获取并发数一致（LLM接口使用单独的会话）
+    子进程中会重新创建会话，避免与父进程共用连接
+    """
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            # 每个主机保持一个长连接池，最多缓存 FETCH_POOL_HOSTS 个主机的连接池
+            _session = create_session(config.scraper.fetch_concurrency, FETCH_POOL_HOSTS, DEFAULT_HEADERS)
+            _session_pid = os.getpid()
+        return _session
+
+def get_page_cache():
+    """获取进程内共享的网页内容缓存"""
+    return get_cache('pages', ttl=config.cache.page_ttl, max_entries=config.cache.page_max_entries)
+
+def _get(url, headers):
+    """发送请求，429和5xx响应作为异常抛出，交给调度器降速重试"""
+    response = get_session().get(url, headers=headers, timeout=config.scraper.fetch_timeout)
+    if response.status_code == 429 or response.status_code >= 500:
+        response.raise_for_status()
+    return response
+
+def fetch_page(url):
+    """
+    获取网页HTML
+    缓存未过期时直接返回缓存内容；过期后携带 ETag/Last-Modified 重新验证，
+    服务器返回304时继续使用缓存内容；请求按主机限流，被限流或超时时退避重试
+    :param url: 网址
+    :return: HTML文本，获取失败时返回None
+    """
+    cached = get_page_cache().get(url) if config.cache.enabled else None
+    if cached and time.time() - cached['fetched_at'] <= config.cache.page_fresh_ttl:
+        return cached['content']
+
+    headers = {}
+    if cached:
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+
+    try:
+        with timer('fetch'):
+            response = call_with_retry(host_endpoint(url), _get, url, headers)
+        if cached and response.status_code == 304:
+            cached['fetched_at'] = time.time()
+            get_page_cache().set(url, cached)
+            return cached['content']
+
+        response.raise_for_status()
+        content_type = response.headers.get('Content-Type', '')
+        if 'html' not in content_type.lower():
+            logging.warning(f"网址 {url} 返回的内容不是HTML: {content_type}")
+            return None
+
+        if config.cache.enabled:
+            get_page_cache().set(url, {
+                'content': response.text,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched_at': time.time(),
+            })
+        return response.text
+    except Exception as e:
+        logging.warning(f"获取网页 {url} 失败: {str(e)}")
+        return None
+
+def fetch_clean_page(url, sections=True):
+    """
+    获取网页并精简内容，作为LLM提取前的独立阶段
+    :param url: 网址
+    :param sections: 是否只保留候选区域（见 clean_html）
+    :return: 精简后的HTML，获取失败时返回None
+    """
+    with fetch_slot():
+        html = fetch_page(url)
+    if not html or not config.scraper.html_trim:
+        return html
+    try:
+        with timer('clean'):
+            return clean_html(html, config.scraper.html_max_chars, sections=sections)
+    except Exception as e:
+        logging.warning(f"精简网页 {url} 失败，使用原始内容: {str(e)}")
+        return html
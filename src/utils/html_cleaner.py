@@ -0,0 +1,86 @@
+"""
+网页预处理模块
+在交给LLM之前去掉脚本、样式、导航等无关内容，只保留可能包含公司信息的部分，减少LLM输入
+"""
+
+import re
+from bs4 import BeautifulSoup, Comment
+
+# 直接删除的标签
+BOILERPLATE_TAGS = ['script', 'style', 'noscript', 'svg', 'iframe', 'template', 'canvas', 'nav', 'aside', 'button', 'select', 'option', 'link', 'meta']
+
+# 保留的属性，链接地址中常包含邮箱、电话、社交媒体和地图信息
+KEEP_ATTRS = {'href'}
+
+# id/class/链接文本命中以下关键词的元素视为候选区域
+SECTION_PATTERN = re.compile(
+    r'contact|about|footer|investor|company|imprint|impressum|address|profile|team|management|'
+    r'联系|关于|简介|投资者|地址|团队',
+    re.IGNORECASE
+)
+
+# 候选区域内容过少时退回使用整个页面正文
+MIN_SECTION_CHARS = 200
+
+def _strip_boilerplate(soup):
+    """删除无关标签、注释和多余属性"""
+    for tag in soup(BOILERPLATE_TAGS):
+        tag.decompose()
+    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
+    for tag in soup.find_all(True):
+        tag.attrs = {key: value for key, value in tag.attrs.items() if key in KEEP_ATTRS}
+
+def _is_candidate(tag):
+    """判断元素是否为候选区域"""
+    if tag.name in ('footer', 'address'):
+        return True
+    marker = ' '.join([tag.get('id') or ''] + (tag.get('class') or []))
+    return bool(marker) and bool(SECTION_PATTERN.search(marker))
+
+def _collapse(html):
+    """压缩空白字符"""
+    return re.sub(r'\s+', ' ', html).strip()
+
+def clean_html(html, max_chars=20000, sections=True):
+    """
+    精简网页内容
+    :param html: 原始HTML
+    :param max_chars: 返回内容的最大字符数
+    :param sections: 是否只保留候选区域（联系方式、关于我们、页脚、投资者关系等）
+    :return: 精简后的HTML
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # 候选区域需要根据 id/class 判断，先记录再清理属性
+    candidates = []
+    if sections:
+        candidate_ids = set()
+        for tag in soup.find_all(_is_candidate):
+            # 跳过已被包含在其他候选区域中的元素
+            if not any(id(parent) in candidate_ids for parent in tag.parents):
+                candidates.append(tag)
+                candidate_ids.add(id(tag))
+
+    title = soup.title.get_text(strip=True) if soup.title else ''
+    description_tag = soup.find('meta', attrs={'name': 'description'})
+    description = description_tag.get('content', '') if description_tag else ''
+
+    _strip_boilerplate(soup)
+
+    parts = []
+    if title:
+        parts.append(f"<title>{title}</title>")
+    if description:
+        parts.append(f"<p>{description}</p>")
+
+    # 被当作无关内容删除的候选区域不再保留
+    section_html = ''.join(str(tag) for tag in candidates if tag.parent is not None)
+    if len(BeautifulSoup(section_html, 'html.parser').get_text(strip=True)) >= MIN_SECTION_CHARS:
+        parts.extend(str(h1) for h1 in soup.find_all('h1'))
+        parts.append(section_html)
+    else:
+        body = soup.body or soup
+        parts.append(''.join(str(child) for child in body.children))
+
+    return _collapse(''.join(parts))[:max_chars]
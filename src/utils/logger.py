@@ -5,7 +5,7 @@ from datetime import datetime
 def setup_logging():
     """
     设置日志配置
-    按天生成日志文件，存放在 data/logs 目录下
+    按天生成日志文件，存放在 data/logs 目录下，日志级别由环境变量 LOG_LEVEL 指定（默认INFO）
     """
     # 确保日志目录存在
     log_dir = os.path.join("data", "logs")
@@ -17,7 +17,7 @@ def setup_logging():
     
     # 配置日志
     logging.basicConfig(
-        level=logging.INFO,
+        level=os.getenv('LOG_LEVEL', 'INFO').upper(),
         format='%(asctime)s - %(levelname)s - %(message)s',
         handlers=[
             # 文件处理器 - 按天生成日志文件
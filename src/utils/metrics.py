@@ -0,0 +1,243 @@
+"""
+运行指标模块
+记录各阶段（搜索、获取、LLM、校验、存储）的耗时、token用量、重试次数和队列深度，
+运行结束时输出JSON/CSV汇总，并可写入 Prometheus textfile
+"""
+
+import csv
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from src.config.settings import config
+from src.utils.cache import cache_report
+
+# Prometheus 指标名前缀
+PROMETHEUS_PREFIX = 'company_scraper'
+
+# 每个阶段保留的耗时样本数，超出后按蓄水池抽样替换，用于估算分位数
+SAMPLE_LIMIT = 2048
+
+def percentile(samples, q):
+    """
+    计算分位数（最近秩法）
+    :param samples: 数值列表
+    :param q: 0到100之间的百分位
+    :return: 分位数，样本为空时返回0.0
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+class MetricsRegistry:
+    """进程内的指标记录器，可在多线程间共享"""
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self._start = time.monotonic()
+        self._stages = {}
+        self._counters = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        """
+        记录一次阶段耗时
+        :param stage: 阶段名称
+        :param seconds: 耗时秒数
+        """
+        with self._lock:
+            stats = self._stages.setdefault(stage, {'count': 0, 'total': 0.0, 'max': 0.0, 'samples': []})
+            stats['count'] += 1
+            stats['total'] += seconds
+            stats['max'] = max(stats['max'], seconds)
+            if len(stats['samples']) < SAMPLE_LIMIT:
+                stats['samples'].append(seconds)
+            else:
+                position = random.randrange(stats['count'])
+                if position < SAMPLE_LIMIT:
+                    stats['samples'][position] = seconds
+
+    def incr(self, name, value=1):
+        """累加计数器"""
+        if not value:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def gauge_add(self, name, delta):
+        """调整当前值（如队列深度），同时记录峰值"""
+        with self._lock:
+            gauge = self._gauges.setdefault(name, {'current': 0, 'max': 0})
+            gauge['current'] += delta
+            gauge['max'] = max(gauge['max'], gauge['current'])
+
+    def snapshot(self):
+        """
+        汇总当前指标
+        :return: {'started_at', 'elapsed_seconds', 'stages', 'counters', 'gauges', 'caches'}
+        """
+        elapsed = time.monotonic() - self._start
+        with self._lock:
+            stages = {
+                stage: {
+                    'count': stats['count'],
+                    'total_seconds': round(stats['total'], 3),
+                    'avg_seconds': round(stats['total'] / stats['count'], 3),
+                    'p50_seconds': round(percentile(stats['samples'], 50), 3),
+                    'p95_seconds': round(percentile(stats['samples'], 95), 3),
+                    'max_seconds': round(stats['max'], 3),
+                    'per_second': round(stats['count'] / elapsed, 3) if elapsed else 0.0,
+                }
+                for stage, stats in self._stages.items()
+            }
+            counters = dict(self._counters)
+            gauges = {name: dict(gauge) for name, gauge in self._gauges.items()}
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'elapsed_seconds': round(elapsed, 3),
+            'stages': stages,
+            'counters': counters,
+            'gauges': gauges,
+            'caches': cache_report(),
+        }
+
+_registry = None
+_registry_pid = None
+_registry_lock = threading.Lock()
+
+def get_metrics():
+    """获取进程内共享的指标记录器，子进程中重新创建，不继承父进程的计数"""
+    global _registry, _registry_pid
+    with _registry_lock:
+        if _registry is None or _registry_pid != os.getpid():
+            _registry = MetricsRegistry()
+            _registry_pid = os.getpid()
+        return _registry
+
+def reset_metrics():
+    """清空共享记录器，重新开始计时"""
+    global _registry, _registry_pid
+    with _registry_lock:
+        _registry = MetricsRegistry()
+        _registry_pid = os.getpid()
+        return _registry
+
+@contextmanager
+def timer(stage):
+    """记录代码块的耗时，抛出异常时同样记录"""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        get_metrics().observe(stage, time.monotonic() - start)
+
+def timed(stage):
+    """记录函数耗时的装饰器"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def incr(name, value=1):
+    """累加共享记录器的计数器"""
+    get_metrics().incr(name, value)
+
+def gauge_add(name, delta):
+    """调整共享记录器的当前值"""
+    get_metrics().gauge_add(name, delta)
+
+def record_tokens(usage):
+    """
+    累加LLM的token用量
+    :param usage: 含 prompt_tokens/completion_tokens/total_tokens 的字典
+    """
+    if not usage:
+        return
+    for key in ('prompt_tokens', 'completion_tokens', 'total_tokens'):
+        value = usage.get(key)
+        if isinstance(value, (int, float)):
+            incr(f"llm_{key}", value)
+
+def _rows(summary):
+    """将汇总展开为 (分类, 名称, 指标, 值) 行"""
+    for stage, stats in summary['stages'].items():
+        for metric, value in stats.items():
+            yield 'stage', stage, metric, value
+    for name, value in summary['counters'].items():
+        yield 'counter', name, 'value', value
+    for name, gauge in summary['gauges'].items():
+        for metric, value in gauge.items():
+            yield 'gauge', name, metric, value
+    for name, stats in summary['caches'].items():
+        for metric, value in stats.items():
+            yield 'cache', name, metric, value
+
+def _prometheus_lines(summary, label):
+    """按 Prometheus 文本格式生成指标行"""
+    run = f'run="{label}"'
+    lines = [f"{PROMETHEUS_PREFIX}_run_duration_seconds{{{run}}} {summary['elapsed_seconds']}"]
+    for stage, stats in summary['stages'].items():
+        labels = f'{run},stage="{stage}"'
+        lines.append(f"{PROMETHEUS_PREFIX}_stage_seconds_total{{{labels}}} {stats['total_seconds']}")
+        lines.append(f"{PROMETHEUS_PREFIX}_stage_count{{{labels}}} {stats['count']}")
+        lines.append(f"{PROMETHEUS_PREFIX}_stage_max_seconds{{{labels}}} {stats['max_seconds']}")
+    for name, value in summary['counters'].items():
+        lines.append(f"{PROMETHEUS_PREFIX}_{name}_total{{{run}}} {value}")
+    for name, gauge in summary['gauges'].items():
+        lines.append(f"{PROMETHEUS_PREFIX}_{name}_max{{{run}}} {gauge['max']}")
+    for name, stats in summary['caches'].items():
+        labels = f'{run},cache="{name}"'
+        lines.append(f"{PROMETHEUS_PREFIX}_cache_hits_total{{{labels}}} {stats['hits']}")
+        lines.append(f"{PROMETHEUS_PREFIX}_cache_misses_total{{{labels}}} {stats['misses']}")
+    return lines
+
+def write_prometheus(summary, label, path):
+    """先写临时文件再替换，textfile collector 不会读到写了一半的文件"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(_prometheus_lines(summary, label)) + '\n')
+    os.replace(tmp_path, path)
+
+def write_run_summary(label='run', prometheus=True):
+    """
+    输出本次运行的指标汇总
+    :param label: 运行标识，如命令名或分片任务ID，用于文件名和 Prometheus 标签
+    :param prometheus: 是否写入 Prometheus textfile（多个工作进程时只由协调进程写入）
+    :return: 汇总字典，未启用指标时返回None
+    """
+    settings = config.metrics
+    if not settings.enabled:
+        return None
+
+    summary = dict(get_metrics().snapshot(), label=label, pid=os.getpid())
+    logging.info(f"运行指标: {json.dumps(summary['stages'], ensure_ascii=False)}")
+    try:
+        os.makedirs(settings.output_dir, exist_ok=True)
+        stem = os.path.join(settings.output_dir, f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{label}_{os.getpid()}")
+        formats = {fmt.strip().lower() for fmt in settings.formats.split(',') if fmt.strip()}
+        if 'json' in formats:
+            with open(stem + '.json', 'w', encoding='utf-8') as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+        if 'csv' in formats:
+            with open(stem + '.csv', 'w', newline='', encoding='utf-8-sig') as f:
+                writer = csv.writer(f)
+                writer.writerow(['section', 'name', 'metric', 'value'])
+                writer.writerows(_rows(summary))
+        if prometheus and settings.prometheus_file:
+            write_prometheus(summary, label, settings.prometheus_file)
+    except Exception as e:
+        logging.error(f"输出运行指标时发生错误: {str(e)}")
+    return summary
@@ -0,0 +1,89 @@
+"""
+数据规范化模块
+以整列为单位规范化成立时间和员工人数，MySQL、Excel和Parquet存储写入前共用
+"""
+
+import re
+import pandas as pd
+from src.config.settings import FIELDS
+from src.utils.records import MISSING_VALUES, RecordBatch
+
+# 成立时间：年[-/.年]月[-/.月]日[日]，月和日可省略
+DATE_RE = re.compile(
+    r'^\s*(?P<year>\d{4})\s*(?:[-/.年]\s*(?P<month>\d{1,2})\s*(?:[-/.月]\s*(?P<day>\d{1,2})\s*日?)?\s*月?)?\s*年?\s*$'
+)
+
+# 员工人数：取第一个数字（范围如"500-1000"取下限），支持千分位和 k/thousand/千/万/m/million/亿 单位
+COUNT_RE = re.compile(
+    r'(?P<number>\d+(?:,\d{3})*(?:\.\d+)?)\s*'
+    r'(?P<unit>(?i:thousands?|millions?|billions?)(?![A-Za-z])|[kKmM](?![A-Za-z])|千|万|亿)?'
+)
+# 单位按小写查找
+COUNT_UNITS = {
+    'k': 1e3, 'thousand': 1e3, 'thousands': 1e3, '千': 1e3, '万': 1e4,
+    'm': 1e6, 'million': 1e6, 'millions': 1e6, '亿': 1e8, 'billion': 1e9, 'billions': 1e9,
+}
+
+def _text(series):
+    """转换为去除首尾空白的字符串列（全部缺失时 .str 仍可用），缺失值保持为NA"""
+    text = series.astype(object).where(series.notna()).map(lambda value: str(value).strip(), na_action='ignore')
+    return text.astype('string')
+
+def normalize_establish_time(series):
+    """
+    规范化成立时间为 YYYY-MM-DD，只有年份或年月时补全为当年1月1日或当月1日
+    :param series: 成立时间列
+    :return: 规范化后的字符串列，无法解析的为NaN
+    """
+    parts = _text(series).str.extract(DATE_RE)
+    dates = pd.to_datetime(
+        pd.DataFrame({
+            'year': pd.to_numeric(parts['year']).astype(float),
+            'month': pd.to_numeric(parts['month']).astype(float).fillna(1),
+            'day': pd.to_numeric(parts['day']).astype(float).fillna(1),
+        }),
+        errors='coerce'
+    )
+    return dates.dt.strftime('%Y-%m-%d').where(dates.notna())
+
+def normalize_employee_count(series):
+    """
+    规范化员工人数为整数，如"约500人"为500，"500-1000"为500，"1.2k"为1200，"3万"为30000，"2 million"为2000000
+    :param series: 员工人数列
+    :return: Int64 列，无法解析的为缺失值
+    """
+    parts = _text(series).str.extract(COUNT_RE)
+    numbers = pd.to_numeric(parts['number'].str.replace(',', '', regex=False))
+    multipliers = parts['unit'].str.lower().map(COUNT_UNITS).fillna(1)
+    return (numbers * multipliers).round().astype('Int64')
+
+def normalize_frame(df, missing=None, keep_unparsed=False):
+    """
+    批量规范化公司数据
+    :param df: 公司数据 DataFrame，缺少的字段按缺失处理
+    :param missing: 缺失值的填充值，数据库写入使用None，文件写入使用"未知"
+    :param keep_unparsed: 成立时间、员工人数无法解析时是否保留原文（文件写入时保留，数据库写入时置空）
+    :return: 按 FIELDS 排列的新 DataFrame，列为 object 类型
+    """
+    df = df.reindex(columns=FIELDS).astype(object)
+    df = df.where(df.notna() & ~df.isin(MISSING_VALUES))
+
+    for field, normalize in (('成立时间', normalize_establish_time), ('员工人数', normalize_employee_count)):
+        normalized = normalize(df[field]).astype(object)
+        if keep_unparsed:
+            normalized = normalized.where(normalized.notna(), df[field])
+        df[field] = normalized
+
+    return df.where(df.notna(), missing)
+
+def normalize_records(records, missing=None, keep_unparsed=False):
+    """
+    批量规范化公司数据，参数见 normalize_frame
+    :param records: 一条或多条数据（CompanyRecord、字典或按 FIELDS 顺序的序列），或 RecordBatch
+    :return: 规范化后的 DataFrame
+    """
+    return normalize_frame(
+        RecordBatch.from_records(records).to_frame(),
+        missing=missing,
+        keep_unparsed=keep_unparsed
+    )
@@ -0,0 +1,268 @@
+"""
+Parquet存储模块
+公司数据按任务类型和日期分区写入Parquet数据集，每次运行追加新的分片文件，不改写已有文件；
+财务数据更新同样追加写入，读取时按公司名称合并最新的更新结果。Excel仅作为导出格式
+"""
+
+import glob
+import logging
+import os
+import uuid
+from datetime import datetime
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from src.config.settings import config, FIELDS
+from src.utils.excel_handler import ExcelAppendWriter, get_output_filepath, lock_orphan_journal
+from src.utils.normalizer import normalize_frame, normalize_records
+from src.utils.records import MISSING_TEXT, MISSING_VALUES, RecordBatch
+
+# 财务数据更新记录的字段
+FINANCIAL_FIELDS = ["公司名称", "近3年营业额", "更新时间"]
+
+JOURNAL_SUFFIX = '.journal.csv'
+
+def _schema(fields):
+    """所有字段按字符串存储，各分片文件结构一致"""
+    return pa.schema([(field, pa.string()) for field in fields])
+
+def get_dataset_dir(task_type='search'):
+    """获取任务类型对应的数据集目录"""
+    return os.path.join(config.parquet.dataset_dir, task_type or 'search')
+
+def new_part_path(task_type='search'):
+    """
+    生成新的分片文件路径：<数据集目录>/<任务类型>/date=YYYY-MM-DD/part-<时间>-<随机串>.parquet
+    """
+    now = datetime.now()
+    partition_dir = os.path.join(get_dataset_dir(task_type), f"date={now.strftime('%Y-%m-%d')}")
+    os.makedirs(partition_dir, exist_ok=True)
+    return os.path.join(partition_dir, f"part-{now.strftime('%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet")
+
+def _hidden_path(filepath, suffix):
+    """同目录下以.开头的辅助文件，读取数据集时会被忽略"""
+    directory, name = os.path.split(filepath)
+    return os.path.join(directory, '.' + os.path.splitext(name)[0] + suffix)
+
+def _company_table(frame):
+    """将规范化后的公司数据转换为Arrow表，缺失值保存为"未知"（与CSV日志一致）"""
+    return RecordBatch.from_frame(frame).to_arrow(missing=MISSING_TEXT)
+
+def write_parquet(tables, filepath, fields=FIELDS):
+    """
+    分块写入Parquet文件，每块作为一个行组；先写临时文件再替换
+    :param tables: Arrow 表的可迭代对象，列为 fields 且均为字符串类型
+    :param filepath: 目标文件路径
+    :param fields: 字段列表
+    :return: 写入的行数
+    """
+    schema = _schema(fields)
+    tmp_path = _hidden_path(filepath, '.tmp.parquet')
+    rows = 0
+    with pq.ParquetWriter(tmp_path, schema, compression=config.parquet.compression) as writer:
+        for table in tables:
+            writer.write_table(table)
+            rows += table.num_rows
+    if rows:
+        os.replace(tmp_path, filepath)
+    else:
+        os.remove(tmp_path)
+    return rows
+
+def finalize_parquet_journal(journal_path, filepath):
+    """
+    将CSV日志文件转换为Parquet分片文件，成功后删除日志文件；失败时保留日志文件
+    :return: 分片文件路径，失败或没有数据时返回None
+    """
+    try:
+        chunks = pd.read_csv(
+            journal_path, dtype=str, keep_default_na=False, encoding='utf-8-sig',
+            chunksize=config.parquet.row_group_size
+        )
+        rows = write_parquet(
+            (_company_table(normalize_frame(chunk, keep_unparsed=True)) for chunk in chunks), filepath
+        )
+        os.remove(journal_path)
+        return filepath if rows else None
+    except Exception as e:
+        logging.error(f"生成Parquet文件时发生错误，数据保留在 {journal_path}: {str(e)}")
+        return None
+
+class ParquetAppendWriter(ExcelAppendWriter):
+    """
+    Parquet增量写入器
+    运行期间与Excel模式一样逐条写入CSV日志文件并立即落盘，结束时生成一个新的分片文件
+    """
+
+    def __init__(self, task_type=None, filename=None):
+        """
+        :param task_type: 任务类型（'search' 或 'financial'）
+        :param filename: 不使用，每次运行都写入新的分片文件
+        """
+        super().__init__(task_type, filename)
+        self.filepath = new_part_path(task_type)
+        self.journal_path = _hidden_path(self.filepath, JOURNAL_SUFFIX)
+
+    def _finalize(self):
+        """将日志文件转换为Parquet分片文件"""
+        return finalize_parquet_journal(self.journal_path, self.filepath)
+
+def save_to_parquet(data, task_type='search'):
+    """
+    保存数据到新的分片文件
+    :param data: 字典或字典列表
+    :return: 分片文件路径，失败时返回None
+    """
+    try:
+        filepath = new_part_path(task_type)
+        table = _company_table(normalize_records(data, keep_unparsed=True))
+        return filepath if write_parquet([table], filepath) else None
+    except Exception as e:
+        logging.error(f"保存Parquet文件时发生错误: {str(e)}")
+        return None
+
+def save_financial_updates(data):
+    """
+    追加财务数据更新记录
+    :param data: {公司名称: 营业额}
+    :return: 分片文件路径，失败时返回None
+    """
+    try:
+        updated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        table = pa.Table.from_arrays([
+            pa.array([str(name) for name in data], type=pa.string()),
+            pa.array([None if revenue is None else str(revenue) for revenue in data.values()], type=pa.string()),
+            pa.array([updated_at] * len(data), type=pa.string()),
+        ], schema=_schema(FINANCIAL_FIELDS))
+        filepath = new_part_path('financial')
+        return filepath if write_parquet([table], filepath, FINANCIAL_FIELDS) else None
+    except Exception as e:
+        logging.error(f"保存财务数据更新时发生错误: {str(e)}")
+        return None
+
+def recover_parquet_journals():
+    """
+    将异常中断后遗留的CSV日志文件转换为分片文件，跳过其他进程仍在写入的日志
+    :return: 成功恢复的分片文件路径列表
+    """
+    recovered = []
+    pattern = os.path.join(config.parquet.dataset_dir, '*', '*', '.*' + JOURNAL_SUFFIX)
+    for journal_path in sorted(glob.glob(pattern)):
+        directory, name = os.path.split(journal_path)
+        filepath = os.path.join(directory, name[1:-len(JOURNAL_SUFFIX)] + '.parquet')
+        lock = lock_orphan_journal(journal_path)
+        if lock is None:
+            continue
+        try:
+            if finalize_parquet_journal(journal_path, filepath):
+                logging.info(f"已从中断的日志恢复数据到 {filepath}")
+                recovered.append(filepath)
+        finally:
+            lock.close()
+    return recovered
+
+def _fields(task_type):
+    """任务类型对应的字段列表"""
+    return FINANCIAL_FIELDS if task_type == 'financial' else FIELDS
+
+def open_dataset(task_type='search'):
+    """
+    打开数据集
+    :return: pyarrow.dataset.Dataset，数据集不存在时返回None
+    """
+    directory = get_dataset_dir(task_type)
+    if not glob.glob(os.path.join(directory, '*', '*.parquet')):
+        return None
+    schema = _schema(_fields(task_type)).append(pa.field('date', pa.string()))
+    return ds.dataset(directory, format='parquet', partitioning='hive', schema=schema)
+
+def read_dataset(task_type='search', columns=None, filters=None):
+    """
+    读取数据集
+    :param task_type: 任务类型
+    :param columns: 可选的字段列表，只读取这些列
+    :param filters: 可选的 pyarrow.dataset 过滤表达式
+    :return: DataFrame，数据集不存在时返回空表
+    """
+    columns = list(columns or _fields(task_type))
+    dataset = open_dataset(task_type)
+    if dataset is None:
+        return pd.DataFrame(columns=columns)
+    return dataset.to_table(columns=columns, filter=filters).to_pandas()
+
+def apply_financial_updates(frame):
+    """按公司名称用最新的财务数据更新记录覆盖"近3年营业额"字段"""
+    updates = read_dataset('financial')
+    if updates.empty or frame.empty:
+        return frame
+    latest = updates.sort_values('更新时间').drop_duplicates('公司名称', keep='last')
+    revenue = frame['公司名称'].map(latest.set_index('公司名称')['近3年营业额'])
+    frame['近3年营业额'] = revenue.where(revenue.notna(), frame['近3年营业额'])
+    return frame
+
+def read_companies(columns=None, filters=None):
+    """
+    读取公司数据，并合并财务数据更新记录
+    :param columns: 可选的字段列表
+    :param filters: 可选的 pyarrow.dataset 过滤表达式
+    :return: DataFrame
+    """
+    read_columns = None
+    if columns is not None:
+        read_columns = list(dict.fromkeys(list(columns) + ['公司名称', '近3年营业额']))
+    frame = apply_financial_updates(read_dataset('search', read_columns, filters))
+    return frame[list(columns)] if columns is not None else frame
+
+def _missing(field):
+    """字段为空、空字符串或"未知"的过滤表达式"""
+    column = ds.field(field)
+    return column.is_null() | column.isin(list(MISSING_VALUES))
+
+def iter_pending_companies(chunk_size=None):
+    """
+    按批读取缺少营业额的公司，筛选条件下推到数据集扫描中；已有财务数据更新记录的公司不再返回
+    :param chunk_size: 每批的行数，默认使用配置 ENRICH_CHUNK_SIZE
+    :return: 生成器，每次产生一个 [{'公司名称', '近3年营业额'}] 列表
+    """
+    dataset = open_dataset('search')
+    if dataset is None:
+        return
+    updated = set(read_dataset('financial', columns=['公司名称'])['公司名称'])
+    scanner = dataset.scanner(
+        columns=['公司名称', '近3年营业额'],
+        filter=~_missing('公司名称') & _missing('近3年营业额'),
+        batch_size=chunk_size or config.scraper.enrich_chunk_size
+    )
+    for batch in scanner.to_batches():
+        rows = [row for row in batch.to_pylist() if row['公司名称'] not in updated]
+        if rows:
+            yield rows
+
+def get_data_sources():
+    """获取已保存的数据来源，包括运行中尚未生成分片文件的日志"""
+    sources = read_dataset('search', columns=['数据来源'])['数据来源'].dropna().tolist()
+    pattern = os.path.join(get_dataset_dir('search'), '*', '.*' + JOURNAL_SUFFIX)
+    for journal_path in glob.glob(pattern):
+        try:
+            journal = pd.read_csv(journal_path, usecols=['数据来源'], dtype=str, encoding='utf-8-sig')
+            sources.extend(journal['数据来源'].dropna().tolist())
+        except Exception as e:
+            logging.warning(f"读取 {journal_path} 的数据来源失败: {str(e)}")
+    return sources
+
+def export_to_excel(filename=None):
+    """
+    将数据集（已合并财务数据更新）导出为Excel文件
+    :param filename: 可选的输出文件名，默认按时间生成
+    :return: 导出的文件路径，失败时返回None
+    """
+    try:
+        filepath = get_output_filepath('search', filename)
+        frame = read_companies()
+        frame.to_excel(filepath, index=False)
+        logging.info(f"已导出 {len(frame)} 条数据到 {filepath}")
+        return filepath
+    except Exception as e:
+        logging.error(f"导出Excel文件时发生错误: {str(e)}")
+        return None
@@ -0,0 +1,276 @@
+"""
+限流与重试模块
+按端点（搜索、各网站主机、LLM接口）分别进行令牌桶限流，遇到429/5xx/超时时按AIMD方式降低速率，
+并在重试额度内带随机抖动地指数退避重试
+"""
+
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import urllib.error
+from urllib.parse import urlsplit
+import requests
+from src.config.settings import config
+from src.utils.metrics import incr
+
+# 视为服务端过载、需要降速的HTTP状态码
+THROTTLE_STATUS = {429, 500, 502, 503, 504}
+
+# 重试额度最多积累为最低额度的倍数
+RETRY_BUDGET_CAP_FACTOR = 10
+
+class AdaptiveRateLimiter:
+    """令牌桶限流器，成功时线性提高速率，被限流时按比例降低速率（AIMD）"""
+
+    def __init__(self, name, rate, burst=1, min_rate_ratio=0.05, decrease_factor=0.5, increase_ratio=0.05):
+        """
+        :param name: 端点名称（仅用于日志）
+        :param rate: 最大速率（每秒请求数），0或负数表示不限流
+        :param burst: 令牌桶容量
+        :param min_rate_ratio: 最低速率占最大速率的比例
+        :param decrease_factor: 被限流时速率乘以的系数
+        :param increase_ratio: 每次成功时速率增加最大速率的比例
+        """
+        self.name = name
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = rate * min_rate_ratio
+        self.burst = max(1, burst)
+        self.decrease_factor = decrease_factor
+        self.increase = rate * increase_ratio
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """获取一个令牌，令牌不足时等待"""
+        if self.max_rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self.blocked_until:
+                    self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                else:
+                    wait = self.blocked_until - now
+            time.sleep(wait)
+
+    def on_success(self):
+        """请求成功，线性提高速率"""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after=None):
+        """
+        请求被限流或服务端过载，按比例降低速率
+        :param retry_after: 服务端要求的等待秒数，在此期间暂停发放令牌
+        """
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self.tokens = min(self.tokens, 0.0)
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+        logging.warning(f"端点 {self.name} 被限流，速率降至 {self.rate:.2f} 次/秒")
+
+class RetryBudget:
+    """重试额度，每次请求积累一定比例的额度，每次重试消耗1，避免故障时重试放大请求量"""
+
+    def __init__(self, ratio, minimum):
+        """
+        :param ratio: 每次请求积累的额度
+        :param minimum: 初始额度
+        """
+        self.ratio = ratio
+        self.cap = max(1, minimum) * RETRY_BUDGET_CAP_FACTOR
+        self.balance = float(minimum)
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        """记录一次请求"""
+        with self._lock:
+            self.balance = min(self.cap, self.balance + self.ratio)
+
+    def try_spend(self):
+        """
+        尝试消耗一次重试额度
+        :return: 额度足够时返回True
+        """
+        with self._lock:
+            if self.balance >= 1:
+                self.balance -= 1
+                return True
+            return False
+
+def _status_code(error):
+    """从各类异常中取出HTTP状态码"""
+    response = getattr(error, 'response', None)
+    if response is not None and getattr(response, 'status_code', None) is not None:
+        return response.status_code
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code
+    status = getattr(error, 'status_code', None) or getattr(error, 'status', None)
+    return status if isinstance(status, int) else None
+
+def _retry_after(error):
+    """读取 Retry-After 响应头（秒数格式）"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) if response is not None else getattr(error, 'headers', None)
+    value = headers.get('Retry-After') if headers is not None else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def classify_error(error):
+    """
+    判断异常是否可以重试
+    :param error: 异常
+    :return: (是否可以重试, 是否需要降速, 服务端要求的等待秒数)
+    """
+    status = _status_code(error)
+    if status is not None:
+        throttled = status in THROTTLE_STATUS
+        return throttled, throttled, _retry_after(error) if throttled else None
+
+    if isinstance(error, (requests.Timeout, requests.ConnectionError, socket.timeout, TimeoutError, ConnectionError)):
+        return True, True, None
+
+    # LLM客户端的超时、连接和限流异常类型各不相同，按类名和消息判断
+    name = type(error).__name__.lower()
+    message = str(error).lower()
+    if 'timeout' in name or 'connection' in name or 'ratelimit' in name or 'rate limit' in message or '429' in message:
+        return True, True, None
+    return False, False, None
+
+class RequestScheduler:
+    """按端点管理限流器和重试额度，统一执行带限流和重试的请求"""
+
+    def __init__(self, settings):
+        """
+        :param settings: RateLimitConfig
+        """
+        self.settings = settings
+        self._limiters = {}
+        self._budgets = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _endpoint_rate(self, endpoint):
+        """按端点类型取最大速率"""
+        if endpoint == 'search':
+            return self.settings.search_rate
+        if endpoint == 'llm':
+            return self.settings.llm_rate
+        return self.settings.host_rate
+
+    def _get(self, endpoint):
+        """获取端点的限流器和重试额度，首次使用时创建"""
+        with self._lock:
+            if endpoint not in self._limiters:
+                self._limiters[endpoint] = AdaptiveRateLimiter(
+                    endpoint,
+                    self._endpoint_rate(endpoint),
+                    burst=self.settings.burst,
+                    min_rate_ratio=self.settings.min_rate_ratio,
+                    decrease_factor=self.settings.decrease_factor,
+                    increase_ratio=self.settings.increase_ratio
+                )
+                self._budgets[endpoint] = RetryBudget(self.settings.retry_budget_ratio, self.settings.retry_budget_min)
+                self._stats[endpoint] = {'requests': 0, 'throttled': 0, 'retries': 0}
+            return self._limiters[endpoint], self._budgets[endpoint], self._stats[endpoint]
+
+    def _backoff(self, attempt):
+        """带完全随机抖动的指数退避时间"""
+        ceiling = min(self.settings.retry_max_delay, self.settings.retry_base_delay * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def call(self, endpoint, fn, *args, **kwargs):
+        """
+        在端点限流下执行请求，可重试的异常在重试次数和额度内退避后重试
+        :param endpoint: 端点名称，如 'search'、'llm' 或 host_endpoint(url)
+        :param fn: 请求函数
+        :return: 请求函数的返回值
+        :raises Exception: 不可重试的异常，或重试次数/额度用完后的最后一次异常
+        """
+        limiter, budget, stats = self._get(endpoint)
+        budget.record_request()
+        attempt = 0
+        while True:
+            limiter.acquire()
+            with self._lock:
+                stats['requests'] += 1
+            incr(f"requests_{endpoint_kind(endpoint)}")
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                retryable, throttled, retry_after = classify_error(e)
+                if throttled:
+                    limiter.on_throttle(retry_after)
+                    with self._lock:
+                        stats['throttled'] += 1
+                    incr(f"throttled_{endpoint_kind(endpoint)}")
+                if not retryable or attempt >= self.settings.max_retries or not budget.try_spend():
+                    raise
+                attempt += 1
+                delay = retry_after or self._backoff(attempt)
+                with self._lock:
+                    stats['retries'] += 1
+                incr(f"retries_{endpoint_kind(endpoint)}")
+                logging.warning(f"请求 {endpoint} 失败，{delay:.1f} 秒后第 {attempt} 次重试: {str(e)}")
+                time.sleep(delay)
+                continue
+            limiter.on_success()
+            return result
+
+    def report(self):
+        """
+        返回发生过限流或重试的端点统计
+        :return: {端点: {'requests', 'throttled', 'retries', 'rate'}}
+        """
+        with self._lock:
+            return {
+                endpoint: dict(stats, rate=round(self._limiters[endpoint].rate, 3))
+                for endpoint, stats in self._stats.items()
+                if stats['throttled'] or stats['retries']
+            }
+
+_scheduler = None
+_scheduler_pid = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler():
+    """
+    获取进程内共享的请求调度器
+    限流状态只在进程内共享，子进程中会按当时的 config.rate_limit 重新创建
+    """
+    global _scheduler, _scheduler_pid
+    with _scheduler_lock:
+        if _scheduler is None or _scheduler_pid != os.getpid():
+            _scheduler = RequestScheduler(config.rate_limit)
+            _scheduler_pid = os.getpid()
+        return _scheduler
+
+def host_endpoint(url):
+    """网址所在主机对应的端点名称"""
+    return f"host:{urlsplit(url).netloc.lower()}"
+
+def endpoint_kind(endpoint):
+    """端点类型（'search'、'llm' 或 'host'），汇总指标时不按主机区分"""
+    return endpoint.split(':', 1)[0]
+
+def call_with_retry(endpoint, fn, *args, **kwargs):
+    """在共享调度器中执行带限流和重试的请求，参数见 RequestScheduler.call"""
+    return get_scheduler().call(endpoint, fn, *args, **kwargs)
+
+def rate_limit_report():
+    """返回共享调度器的限流统计"""
+    return get_scheduler().report()
@@ -0,0 +1,193 @@
+"""
+公司数据模型
+所有存储共用一套字段定义：FIELDS 为中文字段名（Excel、CSV日志和Parquet的列名），DB_COLUMNS 为对应的数据库列名，
+两者顺序一致，字段位置和中英文列名的映射在导入时计算一次
+CompanyRecord 用 __slots__ 保存一家公司的数据，RecordBatch 按列保存一批公司数据，整批转换为 DataFrame、Arrow 表或数据库行
+"""
+
+from operator import attrgetter
+from src.config.settings import FIELDS, FIELD_MAPPING
+
+# 数据库列名，与 FIELDS 顺序一致
+DB_COLUMNS = tuple(FIELD_MAPPING[field] for field in FIELDS)
+
+# 数据库列名到中文字段名
+FIELD_BY_COLUMN = {column: field for field, column in FIELD_MAPPING.items()}
+
+# 中文字段名和数据库列名到字段位置
+FIELD_POSITIONS = {
+    **{field: position for position, field in enumerate(FIELDS)},
+    **{column: position for position, column in enumerate(DB_COLUMNS)},
+}
+
+# 文件存储中缺失值的填充文字
+MISSING_TEXT = '未知'
+
+# 视为缺失的字符串值
+MISSING_VALUES = ('', MISSING_TEXT)
+
+# 按 DB_COLUMNS 顺序读取 CompanyRecord 的全部字段
+_get_values = attrgetter(*DB_COLUMNS)
+
+def _is_missing(value):
+    """None、NaN、空字符串、空列表或"未知"按缺失处理"""
+    if isinstance(value, str):
+        return value.strip() in MISSING_VALUES
+    if isinstance(value, float):
+        return value != value
+    return value is None or (isinstance(value, (list, dict)) and not value)
+
+def _row(record):
+    """
+    将一条数据转换为按 FIELDS 顺序的元组
+    :param record: CompanyRecord、以中文字段名为键的字典，或按 FIELDS 顺序的序列
+    """
+    if isinstance(record, CompanyRecord):
+        return record.values()
+    if isinstance(record, dict):
+        return tuple(map(record.get, FIELDS))
+    values = tuple(record)
+    return values + (None,) * (len(FIELDS) - len(values))
+
+class CompanyRecord:
+    """
+    一家公司的数据，字段按 DB_COLUMNS 保存在 __slots__ 中，缺失的字段为None
+    可以按数据库列名访问属性（record.company_name），或按中文字段名读写（record['公司名称']）
+    """
+
+    __slots__ = DB_COLUMNS
+
+    def __init__(self, values=()):
+        """
+        :param values: 按 FIELDS 顺序的字段值，不足的字段为None，None、空值和"未知"按缺失保存为None
+        """
+        values = tuple(values)
+        for position, column in enumerate(DB_COLUMNS):
+            value = values[position] if position < len(values) else None
+            setattr(self, column, None if _is_missing(value) else value)
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        从字典创建，键为中文字段名，其他键忽略
+        :param data: 字典
+        :return: CompanyRecord
+        """
+        return cls(_row(data))
+
+    def __getitem__(self, field):
+        return getattr(self, DB_COLUMNS[FIELD_POSITIONS[field]])
+
+    def __setitem__(self, field, value):
+        setattr(self, DB_COLUMNS[FIELD_POSITIONS[field]], None if _is_missing(value) else value)
+
+    def get(self, field, default=None):
+        """按中文字段名或数据库列名读取，缺失时返回 default"""
+        position = FIELD_POSITIONS.get(field)
+        value = getattr(self, DB_COLUMNS[position]) if position is not None else None
+        return default if value is None else value
+
+    def update(self, data):
+        """用字典中非缺失的值覆盖对应字段，未知的键忽略"""
+        for key, value in data.items():
+            position = FIELD_POSITIONS.get(key)
+            if position is not None and not _is_missing(value):
+                setattr(self, DB_COLUMNS[position], value)
+
+    def values(self):
+        """按 FIELDS 顺序的字段值元组"""
+        return _get_values(self)
+
+    def to_dict(self, missing=None):
+        """
+        转换为以中文字段名为键的字典
+        :param missing: 缺失字段的填充值
+        """
+        return {field: missing if value is None else value for field, value in zip(FIELDS, self.values())}
+
+    def __eq__(self, other):
+        return isinstance(other, CompanyRecord) and self.values() == other.values()
+
+    def __repr__(self):
+        return f"CompanyRecord({self.company_name!r}, {self.company_website!r})"
+
+class RecordBatch:
+    """
+    按列保存的一批公司数据，columns[i] 为字段 FIELDS[i] 的值列表
+    整批转换时按列构建 DataFrame 或 Arrow 数组，不为每行创建字典，也不逐行查找字段名
+    """
+
+    __slots__ = ('columns',)
+
+    def __init__(self, columns=None):
+        """
+        :param columns: 与 FIELDS 一一对应的值列表，默认为空批次
+        """
+        self.columns = columns if columns is not None else [[] for _ in FIELDS]
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        :param records: 一条或多条数据，每条为 CompanyRecord、字典或按 FIELDS 顺序的序列；也可以是 RecordBatch
+        :return: RecordBatch
+        """
+        if isinstance(records, RecordBatch):
+            return records
+        if isinstance(records, (dict, CompanyRecord)):
+            records = [records]
+        rows = [_row(record) for record in records]
+        if not rows:
+            return cls()
+        return cls([list(column) for column in zip(*rows)])
+
+    @classmethod
+    def from_frame(cls, frame):
+        """
+        从以 FIELDS 为列的 DataFrame 按列创建，缺少的列按缺失处理
+        :param frame: pandas.DataFrame
+        :return: RecordBatch
+        """
+        return cls([frame[field].tolist() if field in frame else [None] * len(frame) for field in FIELDS])
+
+    def __len__(self):
+        return len(self.columns[0])
+
+    def __iter__(self):
+        """逐条产生 CompanyRecord"""
+        for row in zip(*self.columns):
+            yield CompanyRecord(row)
+
+    def append(self, record):
+        """追加一条数据"""
+        for column, value in zip(self.columns, _row(record)):
+            column.append(value)
+
+    def rows(self, missing=None):
+        """
+        按 FIELDS 顺序的行元组列表（CSV日志、数据库写入使用）
+        :param missing: None的填充值
+        """
+        if missing is None:
+            return list(zip(*self.columns))
+        return [tuple(missing if value is None else value for value in row) for row in zip(*self.columns)]
+
+    def to_frame(self):
+        """
+        转换为以 FIELDS 为列的 DataFrame（object 类型），各列直接引用已有的值对象
+        :return: pandas.DataFrame
+        """
+        import pandas as pd
+        return pd.DataFrame(dict(zip(FIELDS, self.columns)), columns=FIELDS, dtype=object)
+
+    def to_arrow(self, missing=None):
+        """
+        转换为以 FIELDS 为列的 Arrow 表，各列为字符串类型（与Parquet数据集一致）
+        :param missing: 缺失值（含"未知"）的填充值，默认为null
+        :return: pyarrow.Table
+        """
+        import pyarrow as pa
+        arrays = [
+            pa.array([missing if _is_missing(value) else str(value) for value in column], type=pa.string())
+            for column in self.columns
+        ]
+        return pa.Table.from_arrays(arrays, names=list(FIELDS))
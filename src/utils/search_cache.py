@@ -0,0 +1,76 @@
+"""
+搜索结果缓存模块
+按搜索服务和查询条件缓存搜索结果，重复运行同一关键词时不再重新搜索；多个关键词可以并发搜索
+"""
+
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from src.config.settings import config
+from src.utils.cache import get_cache
+from src.utils.metrics import timer
+from src.utils.search_providers import GoogleSearchProvider, get_search_provider
+
+def get_search_cache():
+    """获取进程内共享的搜索结果缓存"""
+    return get_cache('search_results', ttl=config.cache.search_ttl, max_entries=config.cache.search_max_entries)
+
+def search_cache_key(provider, query, num, stop):
+    """缓存键，googlesearch 沿用原有的格式，已缓存的结果继续有效"""
+    if provider.name == GoogleSearchProvider.name:
+        return json.dumps([query, num, stop], ensure_ascii=False)
+    return json.dumps([provider.name, query, num, stop], ensure_ascii=False)
+
+def _search(provider, query, num, stop):
+    """调用搜索服务（限流和重试由各服务按请求处理）"""
+    with timer('search'):
+        return provider.search(query, num=num, stop=stop)
+
+def cached_search(query, num=10, stop=None):
+    """
+    带缓存的搜索，使用配置 SEARCH_PROVIDER 指定的搜索服务
+    :param query: 搜索关键词
+    :param num: 每页结果数
+    :param stop: 结果数量上限，None表示不限制
+    :return: 网址列表
+    """
+    provider = get_search_provider()
+    if not config.cache.enabled:
+        return _search(provider, query, num, stop)
+
+    cache = get_search_cache()
+    key = search_cache_key(provider, query, num, stop)
+    urls = cache.get(key)
+    if urls is not None:
+        logging.info(f"使用缓存的搜索结果: {query}（{len(urls)} 个）")
+        return urls
+
+    urls = _search(provider, query, num, stop)
+    # 空结果通常是被限流，不写入缓存
+    if urls:
+        cache.set(key, urls)
+    return urls
+
+def search_many(queries, num=10, stop=None, max_workers=None):
+    """
+    并发搜索多个关键词，总请求速率仍受搜索端点的限流控制
+    :param queries: 关键词列表
+    :param num: 每页结果数
+    :param stop: 每个关键词的结果数量上限
+    :param max_workers: 同时搜索的关键词数，默认使用配置 SEARCH_CONCURRENCY
+    :return: {关键词: 网址列表}，搜索失败的关键词为None
+    """
+    queries = list(dict.fromkeys(queries))
+    if not queries:
+        return {}
+    max_workers = max(1, min(len(queries), max_workers or config.search.concurrency))
+
+    def run(query):
+        try:
+            return cached_search(query, num=num, stop=stop)
+        except Exception as e:
+            logging.error(f"搜索关键词 {query} 时发生错误: {str(e)}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='search') as executor:
+        return dict(zip(queries, executor.map(run, queries)))
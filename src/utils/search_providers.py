@@ -0,0 +1,160 @@
+"""
+搜索服务模块
+统一的搜索接口，支持 googlesearch、SearxNG（自建元搜索）和本地文件三种实现，
+由配置 SEARCH_PROVIDER 选择；支持并行翻页的服务会同时请求多页结果
+"""
+
+import json
+import logging
+import math
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from src.config.settings import config
+from src.utils.fetcher import get_session
+from src.utils.rate_limiter import call_with_retry
+
+def merge_urls(url_lists, limit=None):
+    """
+    按顺序合并多组网址并去重
+    :param url_lists: 网址列表的可迭代对象
+    :param limit: 结果数量上限，None表示不限制
+    :return: 网址列表
+    """
+    merged = list(dict.fromkeys(url for urls in url_lists for url in urls if url))
+    return merged if limit is None else merged[:limit]
+
+class SearchProvider(ABC):
+    """搜索服务接口，子类需要实现 search"""
+
+    name = ''
+
+    @abstractmethod
+    def search(self, query, num=10, stop=None):
+        """
+        搜索关键词
+        :param query: 搜索关键词
+        :param num: 每页结果数（服务支持时使用）
+        :param stop: 结果数量上限，None表示不限制（由各服务决定最多取多少页）
+        :return: 网址列表
+        """
+
+class GoogleSearchProvider(SearchProvider):
+    """googlesearch：只能按顺序翻页，翻页之间按 SEARCH_PAUSE 间隔"""
+
+    name = 'google'
+
+    def search(self, query, num=10, stop=None):
+        from googlesearch import search as google_search
+        pause = config.rate_limit.search_pause
+        return call_with_retry('search', lambda: list(google_search(query, num=num, stop=stop, pause=pause)))
+
+class SearxNGProvider(SearchProvider):
+    """SearxNG JSON接口（需要在实例的 settings.yml 中启用 json 格式），各页并行请求"""
+
+    name = 'searxng'
+
+    def __init__(self, base_url, page_size=10, max_pages=5, engines='', timeout=30):
+        """
+        :param base_url: SearxNG 地址
+        :param page_size: 每页的结果数（用于计算需要请求的页数）
+        :param max_pages: 最多请求的页数
+        :param engines: 可选的搜索引擎列表，逗号分隔
+        :param timeout: 请求超时秒数
+        """
+        self.base_url = base_url.rstrip('/')
+        self.page_size = max(1, page_size)
+        self.max_pages = max(1, max_pages)
+        self.engines = engines
+        self.timeout = timeout
+
+    def _get_page(self, query, page):
+        """请求一页结果"""
+        params = {'q': query, 'format': 'json', 'pageno': page}
+        if self.engines:
+            params['engines'] = self.engines
+        response = get_session().get(f"{self.base_url}/search", params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return [item.get('url') for item in response.json().get('results', [])]
+
+    def fetch_page(self, query, page):
+        """在搜索端点的限流下请求一页结果，被限流时退避重试"""
+        return call_with_retry('search', self._get_page, query, page)
+
+    def search(self, query, num=10, stop=None):
+        if stop is not None and stop <= 0:
+            return []
+        pages = self.max_pages if stop is None else min(self.max_pages, math.ceil(stop / self.page_size))
+        with ThreadPoolExecutor(max_workers=pages, thread_name_prefix='searxng') as executor:
+            results = list(executor.map(lambda page: self.fetch_page(query, page), range(1, pages + 1)))
+        return merge_urls(results, stop)
+
+class FileSearchProvider(SearchProvider):
+    """
+    本地文件：JSON对象，键为搜索关键词，值为网址列表；键 "*" 为未列出的关键词的默认结果
+    用于离线运行、重放已有的搜索结果或导入其他工具的搜索结果
+    """
+
+    name = 'file'
+
+    def __init__(self, path):
+        """
+        :param path: JSON文件路径
+        """
+        self.path = path
+        self._results = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._results is None:
+                with open(self.path, encoding='utf-8-sig') as f:
+                    self._results = json.load(f)
+            return self._results
+
+    def search(self, query, num=10, stop=None):
+        results = self._load()
+        urls = results.get(query, results.get('*', []))
+        if query not in results:
+            logging.warning(f"搜索结果文件 {self.path} 中没有关键词: {query}")
+        return merge_urls([urls], stop)
+
+def create_search_provider(name=None):
+    """
+    按名称创建搜索服务
+    :param name: 'google'、'searxng' 或 'file'，默认使用配置 SEARCH_PROVIDER
+    :return: SearchProvider
+    :raises ValueError: 无效的名称
+    """
+    settings = config.search
+    name = (name or settings.provider).lower()
+    if name == GoogleSearchProvider.name:
+        return GoogleSearchProvider()
+    if name == SearxNGProvider.name:
+        return SearxNGProvider(
+            settings.searxng_url,
+            page_size=settings.searxng_page_size,
+            max_pages=settings.searxng_max_pages,
+            engines=settings.searxng_engines,
+            timeout=settings.timeout
+        )
+    if name == FileSearchProvider.name:
+        return FileSearchProvider(settings.results_file)
+    raise ValueError(f"无效的搜索服务: {name}，可选值: google, searxng, file")
+
+_provider = None
+_provider_lock = threading.Lock()
+
+def get_search_provider():
+    """获取进程内共享的搜索服务，首次调用时按配置创建"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = create_search_provider()
+        return _provider
+
+def set_search_provider(provider):
+    """替换进程内共享的搜索服务（如命令行指定或离线测试时），传入None时下次按配置重新创建"""
+    global _provider
+    with _provider_lock:
+        _provider = provider
@@ -1,9 +1,51 @@
+"""
+存储工厂模块
+按存储模式分派到 Excel、MySQL 或 Parquet 处理模块；各处理模块及其依赖（pandas、openpyxl、pymysql、pyarrow）
+在首次使用时才导入，只用到一种存储模式的运行不需要加载其他模式的依赖
+"""
+
+import logging
 from src.config.settings import config, StorageMode
-from src.utils.excel_handler import save_to_excel
-from src.utils.db_handler import DatabaseHandler
+from src.utils.metrics import timed
+from src.utils.records import RecordBatch
+
+class DatabaseWriter:
+    """数据库增量写入器，与 ExcelAppendWriter 接口一致"""
+
+    def __init__(self, task_type=None):
+        self.task_type = task_type
+        self.row_count = 0
+        self.result = None
+
+    @timed('storage')
+    def write(self, data):
+        """
+        写入数据
+        :param data: 一条或多条数据（CompanyRecord、字典或按 FIELDS 顺序的序列），或 RecordBatch
+        :return: 是否写入成功
+        """
+        from src.utils.db_handler import DatabaseHandler
+        batch = RecordBatch.from_records(data)
+        success = DatabaseHandler().save_data(batch, self.task_type)
+        if success:
+            self.row_count += len(batch)
+            self.result = True
+        return success
+
+    def close(self):
+        """关闭写入器"""
+        return self.result
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
 
 class StorageFactory:
     @staticmethod
+    @timed('storage')
     def save_data(data, task_type=None, filename=None, is_append=False):
         """
         根据配置选择存储方式保存数据
@@ -11,28 +53,102 @@ class StorageFactory:
         :param task_type: 任务类型
         :param filename: 文件名（仅Excel模式使用）
         :param is_append: 是否追加（仅Excel模式使用）
-        :return: 存储结果（Excel模式返回文件路径，MySQL模式返回是否成功）
+        :return: 存储结果（Excel/Parquet模式返回文件路径，MySQL模式返回是否成功）
         """
         if config.is_mysql_mode:
+            from src.utils.db_handler import DatabaseHandler
             db = DatabaseHandler()
             return db.save_data(data, task_type)
+        elif config.is_parquet_mode:
+            from src.utils.parquet_handler import save_to_parquet
+            return save_to_parquet(data, task_type or 'search')
         else:  # Excel模式
+            from src.utils.excel_handler import save_to_excel
             return save_to_excel(data, task_type, filename, is_append)
 
     @staticmethod
+    def open_writer(task_type=None, filename=None):
+        """
+        打开增量写入器，用于在一次运行中逐条保存数据
+        :param task_type: 任务类型
+        :param filename: 文件名（仅Excel模式使用）
+        :return: 写入器，支持 write()/close() 及 with 语句，close() 后 result 为存储结果
+        """
+        if config.is_mysql_mode:
+            return DatabaseWriter(task_type)
+        elif config.is_parquet_mode:
+            from src.utils.parquet_handler import ParquetAppendWriter
+            return ParquetAppendWriter(task_type, filename)
+        else:  # Excel模式
+            from src.utils.excel_handler import ExcelAppendWriter
+            return ExcelAppendWriter(task_type, filename)
+
+    @staticmethod
+    @timed('storage')
     def update_financial_data(data, filename=None):
         """
         更新财务数据
         :param data: 要更新的数据
-        :param filename: 文件名（仅Excel模式使用）
+        :param filename: 源文件名（仅Excel模式使用，更新结果按公司名称合并回该文件）
         :return: 更新结果
         """
         if config.is_mysql_mode:
-            db = DatabaseHandler()
-            success = True
-            for company_name, financial_data in data.items():
-                if not db.update_financial_data(company_name, financial_data):
-                    success = False
-            return success
+            from src.utils.db_handler import DatabaseHandler
+            match_counts = DatabaseHandler().bulk_update_financial_data(data)
+            if match_counts is None:
+                return False
+            return all(match_counts.values())
+        elif config.is_parquet_mode:
+            # 追加写入更新记录，读取时按公司名称合并
+            from src.utils.parquet_handler import save_financial_updates
+            return save_financial_updates(data)
         else:  # Excel模式
-            return save_to_excel(data, task_type='financial', filename=filename) 
\ No newline at end of file
+            if filename is None:
+                logging.error("Excel模式下更新财务数据必须指定源文件")
+                return None
+            # 按公司名称合并回源文件，而不是另存一份只有更新数据的文件
+            from src.utils.excel_handler import merge_financial_updates
+            return merge_financial_updates(filename, data)
+
+    @staticmethod
+    def iter_pending_companies(filename=None, chunk_size=None):
+        """
+        分块读取缺少营业额的公司，"公司名称已知"和"缺少营业额"两个条件在查询或读取时完成
+        :param filename: 输入文件名（仅Excel模式使用）
+        :param chunk_size: 每块的行数，默认使用配置 ENRICH_CHUNK_SIZE
+        :return: 生成器，每次产生一个 [{'公司名称', '近3年营业额'}] 列表
+        :raises ValueError: Excel模式下未指定输入文件名
+        """
+        chunk_size = chunk_size or config.scraper.enrich_chunk_size
+        if config.is_mysql_mode:
+            from src.utils.db_handler import DatabaseHandler
+            return DatabaseHandler().iter_pending_companies(chunk_size)
+        elif config.is_parquet_mode:
+            from src.utils.parquet_handler import iter_pending_companies
+            return iter_pending_companies(chunk_size)
+        else:  # Excel模式
+            if filename is None:
+                raise ValueError("Excel模式下必须指定输入文件名")
+            from src.utils.excel_handler import iter_pending_companies
+            return iter_pending_companies(filename, chunk_size)
+
+    @staticmethod
+    def import_excel_to_database(filename, upsert_key=None):
+        """
+        将Excel文件中的公司数据批量导入数据库
+        :param filename: Excel文件路径
+        :param upsert_key: 去重字段，默认使用配置 MYSQL_UPSERT_KEY
+        :return: 是否导入成功
+        """
+        import pandas as pd
+        from src.utils.db_handler import DatabaseHandler
+        try:
+            df = pd.read_excel(filename)
+        except Exception as e:
+            logging.error(f"读取Excel文件 {filename} 失败: {str(e)}")
+            return False
+
+        # 空单元格转换为None，保存时按"未知"处理
+        records = df.astype(object).where(df.notna(), None).to_dict('records')
+        logging.info(f"开始导入 {len(records)} 条数据到数据库")
+        return DatabaseHandler().save_data(records, upsert_key=upsert_key)
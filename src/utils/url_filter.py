@@ -0,0 +1,163 @@
+"""
+网址过滤模块
+爬取前对搜索结果做规范化、按域名合并，并跳过已保存过的数据来源
+"""
+
+import glob
+import logging
+import os
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from src.config.settings import config
+
+# 需要去除的跟踪参数（精确匹配或前缀匹配）
+TRACKING_PARAMS = {'gclid', 'fbclid', 'msclkid', 'yclid', 'dclid', 'mc_cid', 'mc_eid', 'ref', 'ref_src', 'spm', '_ga', '_gl'}
+TRACKING_PREFIXES = ('utm_', 'hsa_', 'pk_')
+
+# 常见的多级公共后缀，其下一级才是可注册域名
+MULTI_PART_SUFFIXES = {
+    'com.cn', 'net.cn', 'org.cn', 'gov.cn', 'edu.cn', 'ac.cn',
+    'com.hk', 'com.tw', 'com.sg', 'com.my', 'com.au', 'net.au', 'org.au',
+    'co.uk', 'org.uk', 'ac.uk', 'gov.uk', 'co.jp', 'ne.jp', 'or.jp',
+    'co.kr', 'or.kr', 'co.in', 'net.in', 'co.nz', 'co.za', 'com.br',
+    'com.mx', 'com.ar', 'com.tr', 'com.vn', 'co.id', 'co.th', 'com.ph',
+}
+
+# 域名合并策略：first 每个域名只保留第一个网址，all 保留全部网址
+DOMAIN_POLICIES = ('first', 'all')
+# 已保存数据的跳过策略：url 跳过相同网址，domain 跳过相同域名，none 不跳过
+SKIP_KNOWN_POLICIES = ('url', 'domain', 'none')
+
+def canonicalize_url(url):
+    """
+    规范化网址：统一协议和大小写，去掉 www、默认端口、锚点、跟踪参数和末尾斜杠，查询参数排序
+    :param url: 原始网址
+    :return: 规范化后的网址
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit(('https', host, path, urlencode(query), ''))
+
+def registrable_domain(url):
+    """
+    获取网址的可注册域名，如 https://www.shop.example.com.cn/a -> example.com.cn
+    :param url: 网址
+    :return: 可注册域名
+    """
+    host = (urlsplit(url.strip()).hostname or '').lower().rstrip('.')
+    labels = host.split('.')
+    if len(labels) >= 3 and '.'.join(labels[-2:]) in MULTI_PART_SUFFIXES:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+class KnownSourceIndex:
+    """已保存数据来源的索引，按规范化网址和可注册域名存储，一次加载后在内存中查询"""
+
+    def __init__(self, sources=()):
+        self.urls = set()
+        self.domains = set()
+        self._lock = threading.Lock()
+        for source in sources:
+            self.add(source)
+
+    def add(self, source):
+        """加入一个数据来源网址"""
+        if not isinstance(source, str) or not source.startswith('http'):
+            return
+        with self._lock:
+            self.urls.add(canonicalize_url(source))
+            self.domains.add(registrable_domain(source))
+
+    def contains(self, url, policy='domain'):
+        """
+        判断网址是否已保存过
+        :param url: 网址
+        :param policy: 'url' 按网址判断，'domain' 按域名判断，'none' 总是返回False
+        """
+        if policy == 'url':
+            return canonicalize_url(url) in self.urls
+        if policy == 'domain':
+            return registrable_domain(url) in self.domains
+        return False
+
+    def __len__(self):
+        return len(self.urls)
+
+    @classmethod
+    def load(cls):
+        """
+        从当前存储模式中加载已保存的数据来源
+        MySQL模式读取 data_source 字段，Parquet模式读取数据集的"数据来源"列，
+        Excel模式读取输出目录中所有结果文件的"数据来源"列
+        """
+        # 只导入当前存储模式需要的模块
+        if config.is_mysql_mode:
+            from src.utils.db_handler import DatabaseHandler
+            sources = DatabaseHandler().get_data_sources()
+        elif config.is_parquet_mode:
+            from src.utils.parquet_handler import get_data_sources
+            sources = get_data_sources()
+        else:
+            import pandas as pd
+            sources = []
+            output_dir = os.path.join("data", "output")
+            for path in glob.glob(os.path.join(output_dir, '*.xlsx')) + glob.glob(os.path.join(output_dir, '*.journal.csv')):
+                try:
+                    if path.endswith('.csv'):
+                        df = pd.read_csv(path, usecols=['数据来源'], dtype=str, encoding='utf-8-sig')
+                    else:
+                        df = pd.read_excel(path, usecols=['数据来源'])
+                    sources.extend(df['数据来源'].dropna().tolist())
+                except Exception as e:
+                    logging.warning(f"读取 {path} 的数据来源失败: {str(e)}")
+        index = cls(sources)
+        logging.info(f"已加载 {len(index)} 个已保存的数据来源，涉及 {len(index.domains)} 个域名")
+        return index
+
+def filter_urls(urls, known_index=None, domain_policy=None, skip_known=None):
+    """
+    爬取前过滤网址
+    :param urls: 搜索结果网址列表
+    :param known_index: 已保存数据来源的索引，为None时不检查
+    :param domain_policy: 域名合并策略，默认使用配置 URL_DOMAIN_POLICY
+    :param skip_known: 已保存数据的跳过策略，默认使用配置 URL_SKIP_KNOWN
+    :return: 过滤后的网址列表，保持原有顺序
+    """
+    domain_policy = domain_policy or config.scraper.domain_policy
+    skip_known = skip_known or config.scraper.skip_known
+    if domain_policy not in DOMAIN_POLICIES:
+        raise ValueError(f"无效的域名合并策略: {domain_policy}")
+    if skip_known not in SKIP_KNOWN_POLICIES:
+        raise ValueError(f"无效的跳过策略: {skip_known}")
+
+    seen_urls = set()
+    seen_domains = set()
+    filtered = []
+    skipped_known = 0
+    for url in urls:
+        canonical = canonicalize_url(url)
+        domain = registrable_domain(url)
+        if canonical in seen_urls or (domain_policy == 'first' and domain in seen_domains):
+            continue
+        seen_urls.add(canonical)
+        seen_domains.add(domain)
+        if known_index is not None and known_index.contains(url, skip_known):
+            skipped_known += 1
+            continue
+        filtered.append(url)
+
+    logging.info(
+        f"网址过滤：共 {len(urls)} 个，重复或同域名 {len(urls) - len(seen_urls)} 个，"
+        f"已保存过 {skipped_known} 个，待爬取 {len(filtered)} 个"
+    )
+    return filtered
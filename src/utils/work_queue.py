@@ -0,0 +1,219 @@
+"""
+工作队列模块
+基于SQLite的分片任务队列，协调进程写入分片，本机或其他节点上的工作进程领取分片并回写结果；
+领取的分片带有租约，工作进程异常退出后租约到期的分片会被重新领取
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+# 分片状态
+SHARD_PENDING = 'pending'
+SHARD_RUNNING = 'running'
+SHARD_DONE = 'done'
+SHARD_FAILED = 'failed'
+
+class WorkQueue:
+    """SQLite分片任务队列，可在多线程、多进程及共享同一文件的多个节点间使用"""
+
+    def __init__(self, path):
+        """
+        :param path: SQLite文件路径
+        """
+        self.path = path
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        """获取数据库连接，子进程中重新打开"""
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                params TEXT NOT NULL,
+                merged INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL
+            )
+            """)
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS shards (
+                job_id TEXT NOT NULL,
+                shard_no INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                worker TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                PRIMARY KEY (job_id, shard_no)
+            )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_shards_status ON shards (job_id, status)")
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def create_job(self, kind, params, shards):
+        """
+        创建分片任务
+        :param kind: 任务类型（'search' 或 'financial'）
+        :param params: 任务参数，合并结果时使用
+        :param shards: 分片的可迭代对象，每个分片为可JSON序列化的对象，按需读取
+        :return: 任务ID
+        """
+        job_id = f"{kind}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT INTO jobs (job_id, kind, params, created_at) VALUES (?, ?, ?, ?)",
+                    (job_id, kind, json.dumps(params, ensure_ascii=False), datetime.now().isoformat(timespec='seconds'))
+                )
+                conn.executemany(
+                    "INSERT INTO shards (job_id, shard_no, payload, status) VALUES (?, ?, ?, ?)",
+                    ((job_id, shard_no, json.dumps(shard, ensure_ascii=False), SHARD_PENDING)
+                     for shard_no, shard in enumerate(shards))
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def get_job(self, job_id):
+        """
+        读取任务信息
+        :return: {'job_id', 'kind', 'params', 'merged'}，任务不存在时返回None
+        """
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT kind, params, merged FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'job_id': job_id, 'kind': row[0], 'params': json.loads(row[1]), 'merged': bool(row[2])}
+
+    def claim(self, job_id, worker, lease_seconds, max_attempts):
+        """
+        领取一个待处理或租约已到期的分片
+        :param job_id: 任务ID
+        :param worker: 工作进程标识
+        :param lease_seconds: 租约秒数
+        :param max_attempts: 最大尝试次数，租约到期且已达到次数的分片标记为失败
+        :return: (分片编号, 分片内容)，没有可领取的分片时返回None
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "UPDATE shards SET status = ?, error = ? "
+                    "WHERE job_id = ? AND status = ? AND lease_until < ? AND attempts >= ?",
+                    (SHARD_FAILED, '租约到期', job_id, SHARD_RUNNING, now, max_attempts)
+                )
+                row = conn.execute(
+                    "SELECT shard_no, payload FROM shards "
+                    "WHERE job_id = ? AND (status = ? OR (status = ? AND lease_until < ?)) "
+                    "ORDER BY shard_no LIMIT 1",
+                    (job_id, SHARD_PENDING, SHARD_RUNNING, now)
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE shards SET status = ?, worker = ?, lease_until = ?, attempts = attempts + 1 "
+                        "WHERE job_id = ? AND shard_no = ?",
+                        (SHARD_RUNNING, worker, now + lease_seconds, job_id, row[0])
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return (row[0], json.loads(row[1])) if row is not None else None
+
+    def renew(self, job_id, shard_no, worker, lease_seconds):
+        """延长分片租约"""
+        with self._lock:
+            self._connection().execute(
+                "UPDATE shards SET lease_until = ? WHERE job_id = ? AND shard_no = ? AND status = ? AND worker = ?",
+                (time.time() + lease_seconds, job_id, shard_no, SHARD_RUNNING, worker)
+            )
+
+    def complete(self, job_id, shard_no, result):
+        """
+        记录分片处理结果
+        :param result: 可JSON序列化的处理结果
+        """
+        with self._lock:
+            self._connection().execute(
+                "UPDATE shards SET status = ?, result = ?, error = NULL, lease_until = NULL "
+                "WHERE job_id = ? AND shard_no = ? AND status != ?",
+                (SHARD_DONE, json.dumps(result, ensure_ascii=False), job_id, shard_no, SHARD_DONE)
+            )
+
+    def fail(self, job_id, shard_no, error, max_attempts):
+        """
+        记录分片处理失败，未达到最大尝试次数时放回队列
+        :param error: 错误信息
+        """
+        with self._lock:
+            self._connection().execute(
+                "UPDATE shards SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "error = ?, lease_until = NULL WHERE job_id = ? AND shard_no = ? AND status = ?",
+                (max_attempts, SHARD_FAILED, SHARD_PENDING, error, job_id, shard_no, SHARD_RUNNING)
+            )
+
+    def progress(self, job_id):
+        """
+        统计各状态的分片数
+        :return: {状态: 分片数}
+        """
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT status, COUNT(*) FROM shards WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def has_claimable(self, job_id):
+        """是否有待处理或租约已到期的分片（没有工作进程在处理）"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT 1 FROM shards WHERE job_id = ? AND (status = ? OR (status = ? AND lease_until < ?)) LIMIT 1",
+                (job_id, SHARD_PENDING, SHARD_RUNNING, time.time())
+            ).fetchone()
+        return row is not None
+
+    def is_finished(self, job_id):
+        """所有分片是否都已完成或失败"""
+        progress = self.progress(job_id)
+        return not progress.get(SHARD_PENDING) and not progress.get(SHARD_RUNNING)
+
+    def results(self, job_id):
+        """
+        按分片编号读取已完成分片的结果
+        :return: 结果列表
+        """
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT result FROM shards WHERE job_id = ? AND status = ? ORDER BY shard_no",
+                (job_id, SHARD_DONE)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def mark_merged(self, job_id):
+        """标记任务结果已合并到存储"""
+        with self._lock:
+            self._connection().execute("UPDATE jobs SET merged = 1 WHERE job_id = ?", (job_id,))